@@ -0,0 +1,52 @@
+# staff_app/authentication.py
+from django.contrib.auth.models import User
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .models import StaffProfile
+
+
+class StaffJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication for staff and admin users.
+    Loads the User together with its StaffProfile in one joined query, so
+    get_staff_profile() and the serializers never query for the profile again.
+    """
+
+    def get_user(self, validated_token):
+        # simplejwt's get_user() with the profile joined; every check it
+        # makes still runs on each request (nothing is cached between them)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        try:
+            user = User.objects.select_related('staff_profile').get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False):
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+        return user
+
+
+def get_staff_profile(user):
+    """Get staff profile if user is an active staff member"""
+    try:
+        staff_profile = user.staff_profile
+    except (StaffProfile.DoesNotExist, AttributeError):
+        # No profile, or not a Django user at all (anonymous / student)
+        return None
+    if not staff_profile.is_active:
+        return None
+    return staff_profile
@@ -0,0 +1,182 @@
+# staff_app/compression.py
+"""
+Negotiated response compression (brotli or gzip).
+
+CompressionMiddleware compresses JSON, CSV and other text responses of
+at least RESPONSE_COMPRESSION_MIN_SIZE bytes, streamed ones included,
+in the best encoding the client accepts: br when the brotli package is
+installed, else gzip. Already-compressed formats (XLSX exports, files)
+are left alone.
+
+Bodies shared by every client and identified by an ETag (the form
+options) can go through cached_json_response() instead: the rendered and
+compressed body is kept in the cache under that ETag at the highest
+compression level, so the compression cost is paid once per content
+version and repeat requests are answered straight from the cache.
+Per-student bodies (my_course_detail) change with every progress write,
+so they are left to the middleware's per-request levels rather than
+filling the cache with one max-level body per student version.
+"""
+import gzip
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+from rest_framework.response import Response
+
+from .conditional import with_etag
+from .renderers import dumps
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESPONSE_COMPRESSION_MIN_SIZE = getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+COMPRESSED_RESPONSE_CACHE_TIMEOUT = getattr(settings, 'COMPRESSED_RESPONSE_CACHE_TIMEOUT', 60 * 60)
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml')
+
+# Random gzip header padding against BREACH, as Django's GZipMiddleware does
+GZIP_MAX_RANDOM_BYTES = 100
+
+# Per-request compression favours speed, cached bodies favour size
+BROTLI_QUALITY = 4
+CACHED_BROTLI_QUALITY = 11
+CACHED_GZIP_LEVEL = 9
+
+
+def accepted_encodings(request):
+    """{coding: q} from Accept-Encoding"""
+    accepted = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(request):
+    """'br', 'gzip' or None, by the client's preference (br on a tie)"""
+    accepted = accepted_encodings(request)
+    wildcard = accepted.get('*', 0.0)
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '')
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not response.has_header('Content-Encoding')
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+def compress_stream(chunks, encoding):
+    if encoding == 'gzip':
+        yield from compress_sequence(chunks, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+        return
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def weaken_etag(response):
+    # The encoded body differs from the identity one (RFC 9110 8.8.1);
+    # etag_matches() ignores W/, so conditional requests still match
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """GZipMiddleware with brotli, a size threshold and a content-type check"""
+
+    def process_response(self, request, response):
+        if not is_compressible(response):
+            return response
+        if not response.streaming and len(response.content) < RESPONSE_COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            # The compressed size is only known once everything is sent
+            del response['Content-Length']
+        else:
+            content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        weaken_etag(response)
+        response['Content-Encoding'] = encoding
+        return response
+
+
+def compress_for_cache(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=CACHED_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=CACHED_GZIP_LEVEL, mtime=0)
+
+
+def cached_json_response(request, etag, build):
+    """
+    JSON response for a payload fully identified by etag and shared by all
+    clients; not for per-user bodies. build() is only called when the compressed body is not cached yet.
+    Clients that take no compression (or want the browsable API) get a
+    normal DRF Response.
+    """
+    encoding = choose_encoding(request)
+    renderer = getattr(request, 'accepted_renderer', None)
+    if encoding is None or (renderer is not None and renderer.format != 'json'):
+        return with_etag(Response(build()), etag)
+
+    key = f'compressed_response:{encoding}:{etag}'
+    body = cache.get(key)
+    if body is None:
+        content = dumps(build())
+        if len(content) >= RESPONSE_COMPRESSION_MIN_SIZE:
+            body = (encoding, compress_for_cache(content, encoding))
+        else:
+            body = (None, content)
+        cache.set(key, body, COMPRESSED_RESPONSE_CACHE_TIMEOUT)
+
+    content_encoding, content = body
+    response = with_etag(HttpResponse(content, content_type='application/json'), etag)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if content_encoding is not None:
+        weaken_etag(response)
+        response['Content-Encoding'] = content_encoding
+    return response
@@ -0,0 +1,35 @@
+# staff_app/conditional.py
+"""
+ETag helpers for conditional GET, shared by the staff and LMS APIs.
+"""
+import hashlib
+
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    """True when the client's If-None-Match already names this ETag"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    candidates = [candidate.removeprefix('W/') for candidate in parse_etags(header)]
+    return '*' in candidates or etag in candidates
+
+
+def with_etag(response, etag):
+    """Attach the validator; private, no-cache makes clients revalidate every time"""
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified(etag):
+    return with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
@@ -0,0 +1,257 @@
+# staff_app/exports.py
+"""
+Streaming CSV / XLSX exports of enquiries, registrations and payments.
+
+Rows are read with values_list().iterator(chunk_size=EXPORT_CHUNK_SIZE)
+and written to the response as they arrive, so memory use does not grow
+with the number of rows. XLSX files are produced with the standard
+library: a zip archive written to an unseekable buffer (entries use data
+descriptors) holding one worksheet of inline strings.
+"""
+import csv
+import datetime
+import io
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def choice_label(choices):
+    labels = dict(choices)
+    return lambda value: labels.get(value, value)
+
+
+def get_export_columns(name):
+    """[(header, field path, formatter or None)] for one export"""
+    from .models import PaymentTransaction, StudentRegistration, Student_api
+
+    if name == 'students':
+        return [
+            ('Username', 'username', None),
+            ('Student Name', 'student_name', None),
+            ('Mobile', 'mobile', None),
+            ('Email', 'email', None),
+            ('Qualification', 'qualification', None),
+            ('Centre', 'centre', choice_label(Student_api.CENTRE_CHOICES)),
+            ('Trade', 'trade', choice_label(Student_api.TRADE_CHOICES)),
+            ('Course Interested', 'course_interested', None),
+            ('Enquiry Source', 'enquiry_source', choice_label(Student_api.ENQUIRY_SOURCE_CHOICES)),
+            ('Enquiry Status', 'enquiry_status', choice_label(Student_api.ENQUIRY_STATUS)),
+            ('Enquiry Date', 'enquiry_date', None),
+            ('Next Follow Up', 'next_follow_up_date', None),
+            ('Course Fee Offer', 'course_fee_offer', None),
+            ('Enquiry Taken By', 'enquiry_taken_by__user__username', None),
+            ('Assigned To', 'assign_enquiry__user__username', None),
+            ('Created At', 'created_at', None),
+        ]
+    if name == 'registrations':
+        return [
+            ('Registration Number', 'registration_number', None),
+            ('Student Name', 'student_name', None),
+            ('Father Name', 'father_name', None),
+            ('Branch', 'branch', choice_label(StudentRegistration.CENTRE_CHOICES)),
+            ('Joining Date', 'joining_date', None),
+            ('Phone', 'phone_no', None),
+            ('Email', 'email', None),
+            ('Course Type', 'course_type__name', None),
+            ('Course', 'course__name', None),
+            ('Total Course Fee', 'total_course_fee', None),
+            ('Paid Fee', 'paid_fee', None),
+            ('Fee Balance', 'fee_balance', None),
+            ('Course Completion Date', 'course_completion_date', None),
+            ('Certificate Issued', 'certificate_issued', None),
+            ('Certificate Number', 'certificate_number', None),
+            ('Created By', 'created_by__user__username', None),
+            ('Created At', 'created_at', None),
+        ]
+    if name == 'payments':
+        return [
+            ('Registration Number', 'student_registration__registration_number', None),
+            ('Student Name', 'student_registration__student_name', None),
+            ('Branch', 'student_registration__branch', choice_label(StudentRegistration.CENTRE_CHOICES)),
+            ('Installment', 'installment_number', None),
+            ('Amount', 'amount', None),
+            ('Payment Date', 'payment_date', None),
+            ('Payment Mode', 'payment_mode', choice_label(PaymentTransaction.PAYMENT_MODES)),
+            ('Transaction ID', 'transaction_id', None),
+            ('Received By', 'received_by__user__username', None),
+            ('Remark', 'remark', None),
+        ]
+    raise ValueError(f'Unknown export {name}')
+
+
+def iter_export_rows(queryset, columns):
+    """Formatted rows, fetched EXPORT_CHUNK_SIZE at a time"""
+    fields = [field for header, field, formatter in columns]
+    formatters = [formatter for header, field, formatter in columns]
+    for row in queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            formatter(value) if formatter else value
+            for value, formatter in zip(row, formatters)
+        ]
+
+
+def format_datetime(value):
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class Echo:
+    """File-like object whose write() hands the written text back"""
+
+    def write(self, value):
+        return value
+
+
+def csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return format_datetime(value)
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        # Keep spreadsheet apps from evaluating user input as a formula
+        return "'" + value
+    return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    # BOM so Excel opens the UTF-8 file with the right encoding
+    yield '\ufeff' + writer.writerow(header)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow([csv_cell(value) for value in row]))
+        if len(batch) == 500:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+class ChunkBuffer(io.RawIOBase):
+    """Unseekable sink for ZipFile; drain() returns what was written since the last call"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+
+# Characters XML 1.0 does not allow, even escaped
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, datetime.datetime):
+        value = format_datetime(value)
+    text = escape(ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_row(values):
+    return '<row>' + ''.join(xlsx_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(header, rows, sheet_name):
+    buffer = ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for part, content in XLSX_PARTS.items():
+            archive.writestr(part, content)
+        archive.writestr('xl/workbook.xml', WORKBOOK_XML.format(name=escape(sheet_name[:31])))
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + xlsx_row(header)
+            ).encode())
+            batch = []
+            for row in rows:
+                batch.append(xlsx_row(row))
+                if len(batch) == 500:
+                    sheet.write(''.join(batch).encode())
+                    batch = []
+                    yield buffer.drain()
+            sheet.write((''.join(batch) + '</sheetData></worksheet>').encode())
+    # Closing the archive writes the central directory
+    yield buffer.drain()
+
+
+def export_response(queryset, name, file_format):
+    """StreamingHttpResponse with the export as an attachment"""
+    columns = get_export_columns(name)
+    header = [header for header, field, formatter in columns]
+    rows = iter_export_rows(queryset, columns)
+    if file_format == 'xlsx':
+        content = stream_xlsx(header, rows, name.title())
+    else:
+        content = stream_csv(header, rows)
+
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[file_format])
+    filename = f'{name}-{timezone.localdate():%Y%m%d}.{file_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,137 @@
+# staff_app/fieldsets.py
+"""
+Sparse fieldsets: ?fields=id,student_name,branch or ?exclude=contact_address
+
+A Fieldset picks which top-level fields of a response item are sent.
+Serializers using SparseFieldsMixin drop the others before rendering, so
+unrequested SerializerMethodFields never run, and narrow_queryset() turns
+the same selection into an only() projection so unused columns (address
+and other text blobs) are not read either.
+
+The columns behind a field come from its source (course.name becomes
+course__name). Fields backed by model or serializer methods declare
+theirs in Meta.fieldset_columns; a selected field with no known columns
+leaves the queryset unnarrowed rather than risking a query per row.
+Unknown names are ignored.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def split_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class Fieldset:
+    def __init__(self, fields=None, exclude=()):
+        self.fields = set(fields) if fields is not None else None
+        self.exclude = set(exclude)
+
+    def includes(self, name):
+        if self.fields is not None and name not in self.fields:
+            return False
+        return name not in self.exclude
+
+    def select(self, names):
+        """names that are sent, in their original order"""
+        return [name for name in names if self.includes(name)]
+
+    def cache_key(self):
+        """Stable text for ETags of responses that depend on the selection"""
+        fields = ','.join(sorted(self.fields)) if self.fields is not None else '*'
+        return f"{fields}-{','.join(sorted(self.exclude))}"
+
+
+def get_fieldset(request):
+    """Fieldset from ?fields= / ?exclude=, or None when neither is given"""
+    fields = request.GET.get('fields')
+    exclude = request.GET.get('exclude')
+    if fields is None and not exclude:
+        return None
+    return Fieldset(
+        fields=split_names(fields) if fields is not None else None,
+        exclude=split_names(exclude or ''),
+    )
+
+
+def fieldset_key(fieldset):
+    return fieldset.cache_key() if fieldset is not None else '*'
+
+
+class SparseFieldsMixin:
+    """
+    Drops the fields not selected by context['fieldset'].
+    Only the top-level serializer (or the child of a top-level many=True
+    list) is narrowed; nested serializers keep all their fields.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None or not self.is_top_level():
+            return fields
+        for name in list(fields):
+            if not fieldset.includes(name):
+                del fields[name]
+        return fields
+
+    def is_top_level(self):
+        parent = self.parent
+        if parent is None:
+            return True
+        return isinstance(parent, serializers.ListSerializer) and parent.parent is None
+
+
+def source_columns(model, field):
+    """Column paths read by a serializer field, or None if they cannot be told"""
+    if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+        return None
+    path = []
+    for attr in field.source.split('.'):
+        if model is None:
+            return None
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        path.append(attr)
+        model = model_field.related_model if model_field.is_relation else None
+    return ('__'.join(path),)
+
+
+def serializer_columns(serializer_class, fieldset):
+    """Columns needed for the selected fields of a ModelSerializer, or None"""
+    meta = serializer_class.Meta
+    declared = getattr(meta, 'fieldset_columns', {})
+    columns = []
+    for name, field in serializer_class().fields.items():
+        if not fieldset.includes(name):
+            continue
+        field_columns = declared[name] if name in declared else source_columns(meta.model, field)
+        if field_columns is None:
+            return None
+        columns.extend(field_columns)
+    return columns
+
+
+def narrow_queryset(queryset, serializer_class, fieldset, extra=()):
+    """
+    only() the columns the selected fields need, plus extra (columns the view
+    itself reads, such as created_at for the pagination cursor). Relations
+    are joined with select_related when one of their columns is needed.
+    """
+    if fieldset is None:
+        return queryset
+    columns = serializer_columns(serializer_class, fieldset)
+    if columns is None:
+        return queryset
+    columns = list(dict.fromkeys([*columns, *extra]))
+    relations = set()
+    for column in columns:
+        parts = column.split('__')[:-1]
+        for depth in range(1, len(parts) + 1):
+            relations.add('__'.join(parts[:depth]))
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*sorted(relations))
+    return queryset.only(*columns)
@@ -0,0 +1,49 @@
+# staff_app/filters.py
+"""
+Query-string filters shared by the list endpoints and the exports, so an
+export always contains exactly the rows the matching list would page
+through.
+"""
+
+
+def filter_students(students, params):
+    """?enquiry_status= &trade= &centre="""
+    enquiry_status = params.get('enquiry_status')
+    trade = params.get('trade')
+    centre = params.get('centre')
+    
+    if enquiry_status:
+        students = students.filter(enquiry_status=enquiry_status)
+    if trade:
+        students = students.filter(trade=trade)
+    if centre:
+        students = students.filter(centre=centre)
+    return students
+
+
+def filter_registrations(registrations, params):
+    """?branch= &course_type="""
+    branch = params.get('branch')
+    if branch:
+        registrations = registrations.filter(branch=branch)
+    
+    course_type = params.get('course_type')
+    if course_type:
+        registrations = registrations.filter(course_type_id=course_type)
+    return registrations
+
+
+def filter_payments(payments, params):
+    """Registration filters applied through the payment's registration, plus ?payment_mode="""
+    branch = params.get('branch')
+    if branch:
+        payments = payments.filter(student_registration__branch=branch)
+    
+    course_type = params.get('course_type')
+    if course_type:
+        payments = payments.filter(student_registration__course_type_id=course_type)
+    
+    payment_mode = params.get('payment_mode')
+    if payment_mode:
+        payments = payments.filter(payment_mode=payment_mode)
+    return payments
@@ -0,0 +1,128 @@
+# staff_app/form_options.py
+"""
+Dropdown options for the enquiry and registration forms.
+
+The payloads only change when staff, course types or courses change, so
+each one is built once per version and kept in process memory, for at
+most FORM_OPTIONS_LOCAL_TIMEOUT seconds, together with a strong ETag (a
+hash of its JSON). The version lives in the shared cache and is bumped by
+the StaffProfile, User, CourseType and Course signals in models.py, so
+every worker rebuilds after a change.
+"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .conditional import make_etag
+
+VERSION_KEY = 'form_options_version'
+
+FORM_OPTIONS_LOCAL_TIMEOUT = getattr(settings, 'FORM_OPTIONS_LOCAL_TIMEOUT', 60)
+
+_local_options = {}
+_local_lock = threading.Lock()
+
+
+def get_form_options_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version key never resurrects old payloads
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_form_options_version():
+    # A new clock value, not incr: incr is not atomic across processes
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def build_student_options():
+    from .models import StaffProfile, Student_api
+
+    staff_members = StaffProfile.objects.filter(is_active=True).select_related('user').order_by('id')
+    return {
+        'centre_choices': Student_api.CENTRE_CHOICES,
+        'trade_choices': Student_api.TRADE_CHOICES,
+        'enquiry_source_choices': Student_api.ENQUIRY_SOURCE_CHOICES,
+        'enquiry_status_choices': Student_api.ENQUIRY_STATUS,
+        'staff_options': [
+            {'id': staff.id, 'name': staff.user.get_full_name() or staff.user.username}
+            for staff in staff_members
+        ],
+    }
+
+
+def build_registration_options():
+    from .models import Course, CourseType, StudentRegistration
+    from .serializers import CourseTypeSerializer
+
+    return {
+        'course_types': CourseTypeSerializer(
+            CourseType.objects.filter(is_active=True).order_by('id'), many=True
+        ).data,
+        'duration_choices': [
+            {'value': value, 'label': label}
+            for value, label in Course.DURATION_CHOICES
+        ],
+        'branch_choices': StudentRegistration.CENTRE_CHOICES,
+    }
+
+
+def build_courses_by_type():
+    """{course_type_id: [active courses]} in one query"""
+    from .models import Course
+    from .serializers import CourseSerializer
+
+    grouped = {}
+    courses = Course.objects.filter(is_active=True).select_related('course_type')
+    for course in CourseSerializer(courses, many=True).data:
+        grouped.setdefault(course['course_type'], []).append(course)
+    return grouped
+
+
+def build_form_bootstrap():
+    return {
+        'student_options': get_options('student')[0],
+        'registration_options': get_options('registration')[0],
+        'courses_by_type': {
+            str(course_type_id): courses
+            for course_type_id, courses in get_options('courses_by_type')[0].items()
+        },
+    }
+
+
+BUILDERS = {
+    'student': build_student_options,
+    'registration': build_registration_options,
+    'courses_by_type': build_courses_by_type,
+    'bootstrap': build_form_bootstrap,
+}
+
+
+def get_options(name):
+    """(payload, etag) for one option set, rebuilt when the version moved"""
+    version = get_form_options_version()
+    now = time.monotonic()
+    entry = _local_options.get(name)
+    if entry is not None and entry[0] == version and entry[3] > now:
+        return entry[1], entry[2]
+
+    payload = BUILDERS[name]()
+    # Plain data from here on: JSON round trip turns choice tuples into lists
+    payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+    etag = make_etag(name, json.dumps(payload, sort_keys=True))
+    with _local_lock:
+        _local_options[name] = (version, payload, etag, now + FORM_OPTIONS_LOCAL_TIMEOUT)
+    return payload, etag
+
+
+def get_courses_for_type(course_type_id):
+    """(courses, etag) for one course type"""
+    grouped, etag = get_options('courses_by_type')
+    return grouped.get(str(course_type_id), []), make_etag(etag, course_type_id)
@@ -0,0 +1,187 @@
+# staff_app/list_rows.py
+"""
+Fast read path for the registration list endpoints.
+
+StudentRegistrationSerializer builds a model instance per row and walks
+source chains and model methods for every computed field. For lists the
+same JSON is produced here from values() rows: only the needed columns
+are selected, choice labels come from dicts built once, and the date
+fields are computed against a single "today" per request. With a
+?fields= selection (fieldsets.py) only the columns behind the selected
+fields are read.
+
+Plain columns still go through the serializer's own field instances, so
+dates, datetimes and decimals are formatted exactly as before.
+benchmark_registration_list compares both paths and checks they agree.
+"""
+import datetime
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Course, StudentRegistration
+
+BRANCH_LABELS = dict(StudentRegistration.CENTRE_CHOICES)
+DURATION_LABELS = dict(Course.DURATION_CHOICES)
+
+# Fields whose to_representation() returns the database value unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+)
+
+_plain_fields = None
+
+
+def get_plain_fields():
+    """{name: (column, converter or None)} for the serializer's model-backed fields"""
+    global _plain_fields
+    if _plain_fields is None:
+        from .serializers import StudentRegistrationSerializer
+
+        computed = StudentRegistrationSerializer.Meta.fieldset_columns
+        plain_fields = {}
+        for name, field in StudentRegistrationSerializer().fields.items():
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                plain_fields[name] = (f'{name}_id', None)
+            elif field.source == name and name not in computed:
+                converter = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+                plain_fields[name] = (name, converter)
+        _plain_fields = plain_fields
+    return _plain_fields
+
+
+_field_columns = None
+
+
+def get_field_columns(fieldset=None):
+    """{field name: columns it reads} for the fields sent, in serializer order"""
+    global _field_columns
+    if _field_columns is None:
+        from .fieldsets import source_columns
+        from .serializers import StudentRegistrationSerializer
+
+        declared = StudentRegistrationSerializer.Meta.fieldset_columns
+        plain_fields = get_plain_fields()
+        field_columns = {}
+        for name, field in StudentRegistrationSerializer().fields.items():
+            if name in plain_fields:
+                field_columns[name] = (plain_fields[name][0],)
+            elif name in declared:
+                field_columns[name] = declared[name]
+            else:
+                field_columns[name] = source_columns(StudentRegistration, field)
+        _field_columns = field_columns
+    if fieldset is None:
+        return _field_columns
+    return {name: columns for name, columns in _field_columns.items() if fieldset.includes(name)}
+
+
+def registration_values(queryset, fieldset=None):
+    """values() queryset with the columns RegistrationListRows needs for fieldset"""
+    columns = {'id', 'created_at'}  # Always there for the pagination cursor
+    for field_columns in get_field_columns(fieldset).values():
+        columns.update(field_columns)
+    return queryset.values(*sorted(columns))
+
+
+def list_context(fieldset=None):
+    """Dates (and the fieldset) for one request, shared by every chunk of a streamed list"""
+    # The model methods mix the local date (datetime.now()) and the UTC date
+    return {
+        'today': datetime.datetime.now().date(),
+        'utc_today': timezone.now().date(),
+        'fieldset': fieldset,
+    }
+
+
+class RegistrationListRows:
+    """
+    Stand-in for StudentRegistrationSerializer(rows, many=True) taking rows
+    from registration_values(). A context from list_context() keeps every
+    chunk of a streamed response on the same date.
+    """
+
+    def __init__(self, rows, many=True, context=None):
+        self.rows = rows
+        if not context or 'today' not in context:
+            context = list_context()
+        self.today = context['today']
+        self.utc_today = context['utc_today']
+        plain_fields = get_plain_fields()
+        # (name, column, converter) for plain fields, (name, None, method) for computed ones
+        self.fields = [
+            (name, *plain_fields[name]) if name in plain_fields else (name, None, getattr(self, name))
+            for name in get_field_columns(context.get('fieldset'))
+        ]
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, converter in self.fields:
+            if column is None:
+                data[name] = converter(row)
+            else:
+                value = row[column]
+                data[name] = converter(value) if converter is not None and value is not None else value
+        return data
+
+    def course_type_name(self, row):
+        return row['course_type__name']
+
+    def course_name(self, row):
+        return row['course__name']
+
+    def branch_display(self, row):
+        return BRANCH_LABELS.get(row['branch'], row['branch'])
+
+    def duration_months_display(self, row):
+        return DURATION_LABELS.get(row['duration_months'], row['duration_months'])
+
+    def created_by_name(self, row):
+        """User.get_full_name"""
+        return f"{row['created_by__user__first_name']} {row['created_by__user__last_name']}".strip()
+
+    def is_eligible_for_certificate(self, row):
+        """StudentRegistration.is_eligible_for_certificate"""
+        completion_date = row['course_completion_date']
+        return row['paid_fee'] >= row['total_course_fee'] and (
+            completion_date and self.utc_today >= completion_date
+        )
+
+    def days_remaining_to_complete(self, row):
+        """StudentRegistration.get_days_remaining"""
+        joining_date = row['joining_date']
+        completion_date = row['course_completion_date']
+        if not completion_date:
+            return None
+        if self.today < joining_date:
+            return (completion_date - joining_date).days
+        if self.today <= completion_date:
+            return (completion_date - self.today).days
+        return 0
+
+    def total_course_days(self, row):
+        """StudentRegistration.get_total_course_days"""
+        joining_date = row['joining_date']
+        completion_date = row['course_completion_date']
+        if joining_date and completion_date:
+            return (completion_date - joining_date).days
+        return None
+
+    def course_status(self, row):
+        """StudentRegistration.get_course_status"""
+        joining_date = row['joining_date']
+        completion_date = row['course_completion_date']
+        if self.today < joining_date:
+            return 'not_started'
+        if completion_date is None:
+            # The model method raises here; save() always sets the date
+            return None
+        if self.today <= completion_date:
+            return 'ongoing'
+        return 'completed'
@@ -0,0 +1,77 @@
+# staff_app/management/commands/benchmark_json_renderer.py
+#  python manage.py benchmark_json_renderer --sizes 200 5000 50000
+# Renders the registration list payload with DRF's JSONRenderer and with
+# FastJSONRenderer (and parses it back with both parsers), checks the bytes
+# are identical and prints the timings. Synthetic registrations are inserted
+# inside a transaction that is rolled back at the end.
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from staff_app import renderers
+from staff_app.list_rows import RegistrationListRows, list_context, registration_values
+from staff_app.models import StudentRegistration
+
+from .benchmark_registration_list import Rollback, create_fixtures, insert_registrations
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON rendering and parsing (stdlib json vs orjson) on the registration list payload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[200, 5000, 50000])
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per implementation')
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError('orjson is not installed; FastJSONRenderer is using the stdlib fallback')
+        try:
+            with transaction.atomic():
+                self.run(sorted(options['sizes']), options['repeat'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def run(self, sizes, repeat):
+        fixtures = create_fixtures('benchmark-json-staff')
+        self.stdout.write(
+            f"{'rows':>10} {'KB':>8} {'render ms':>10} {'fast ms':>8} {'speedup':>8} "
+            f"{'parse ms':>9} {'fast ms':>8} {'speedup':>8}"
+        )
+        inserted = 0
+        for size in sizes:
+            insert_registrations(fixtures, inserted, size)
+            inserted = size
+
+            rows = registration_values(StudentRegistration.objects.order_by('-created_at', '-id'))
+            payload = {
+                'count': size,
+                'next_cursor': None,
+                'registrations': RegistrationListRows(rows, many=True, context=list_context()).data,
+            }
+            content = JSONRenderer().render(payload)
+            if renderers.FastJSONRenderer().render(payload) != content:
+                raise CommandError(f'The two renderers disagree at {size} rows')
+
+            render = self.time(lambda: JSONRenderer().render(payload), repeat)
+            fast_render = self.time(lambda: renderers.FastJSONRenderer().render(payload), repeat)
+            parse = self.time(lambda: JSONParser().parse(io.BytesIO(content), parser_context={}), repeat)
+            fast_parse = self.time(
+                lambda: renderers.FastJSONParser().parse(io.BytesIO(content), parser_context={}), repeat
+            )
+            self.stdout.write(
+                f"{size:>10} {len(content) / 1024:>8.0f} {render * 1000:>10.1f} {fast_render * 1000:>8.1f} "
+                f"{render / fast_render:>7.1f}x {parse * 1000:>9.1f} {fast_parse * 1000:>8.1f} "
+                f"{parse / fast_parse:>7.1f}x"
+            )
+
+    def time(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,131 @@
+# staff_app/management/commands/benchmark_registration_list.py
+#  python manage.py benchmark_registration_list --sizes 1000 10000 50000
+# Serializes every registration with StudentRegistrationSerializer and with
+# the values() read path (list_rows.py), checks the two agree row for row
+# and prints the timings. Synthetic registrations are inserted inside a
+# transaction that is rolled back at the end, so the database is untouched.
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from staff_app.list_rows import RegistrationListRows, list_context, registration_values
+from staff_app.models import Course, CourseType, StaffProfile, StudentRegistration
+from staff_app.serializers import StudentRegistrationSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+def serializer_rows(registrations):
+    queryset = registrations.select_related('course_type', 'course', 'created_by__user')
+    return StudentRegistrationSerializer(queryset, many=True).data
+
+
+def values_rows(registrations):
+    return RegistrationListRows(registration_values(registrations), many=True, context=list_context()).data
+
+
+def create_fixtures(username):
+    """Staff member, course type and course the synthetic registrations point at"""
+    user = User.objects.create_user(username=username, first_name='Benchmark', last_name='Staff')
+    course_type = CourseType.objects.create(name='Benchmark')
+    return {
+        'staff': StaffProfile.objects.create(user=user, role='manager'),
+        'course_type': course_type,
+        'course': Course.objects.create(
+            course_type=course_type,
+            name='Benchmark Course',
+            duration_months='3_months',
+            duration_hours=120,
+            course_fee=Decimal('20000'),
+        ),
+        'rng': random.Random(42),
+    }
+
+
+def insert_registrations(fixtures, start, stop):
+    """bulk_create registrations numbered start..stop-1"""
+    rng = fixtures['rng']
+    branches = [value for value, label in StudentRegistration.CENTRE_CHOICES]
+    durations = [value for value, label in Course.DURATION_CHOICES]
+    today = datetime.date.today()
+    # bulk_create skips save(), so the derived fields are filled here
+    batch = []
+    for number in range(start, stop):
+        joining_date = today - datetime.timedelta(days=rng.randint(-30, 400))
+        registration = StudentRegistration(
+            registration_number=f'BENCH/{number}',
+            branch=rng.choice(branches),
+            joining_date=joining_date,
+            student_name=f'Benchmark {number}',
+            father_name='Benchmark',
+            date_of_birth=datetime.date(2000, 1, 1),
+            email=f'benchmark{number}@example.com',
+            qualification='12th',
+            work_college='Benchmark',
+            contact_address='Benchmark',
+            phone_no='9876543210',
+            course_type=fixtures['course_type'],
+            course=fixtures['course'],
+            duration_months=rng.choice(durations),
+            duration_hours=120,
+            username=f'benchmark{number}',
+            password='benchmark',
+            created_by=fixtures['staff'],
+            total_course_fee=Decimal('20000'),
+            paid_fee=Decimal(rng.choice([5000, 20000])),
+        )
+        registration.fee_balance = registration.total_course_fee - registration.paid_fee
+        registration.course_completion_date = registration.calculate_completion_date()
+        batch.append(registration)
+        if len(batch) == 5000:
+            StudentRegistration.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        StudentRegistration.objects.bulk_create(batch)
+
+
+class Command(BaseCommand):
+    help = 'Compare registration list serialization (model serializer vs values() rows) at several table sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 50000])
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per implementation')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(sorted(options['sizes']), options['repeat'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def run(self, sizes, repeat):
+        fixtures = create_fixtures('benchmark-list-staff')
+        self.stdout.write(f"{'rows':>10} {'serializer ms':>14} {'values ms':>10} {'speedup':>8}")
+        inserted = 0
+        for size in sizes:
+            insert_registrations(fixtures, inserted, size)
+            inserted = size
+
+            registrations = StudentRegistration.objects.order_by('-created_at', '-id')
+            if serializer_rows(registrations) != values_rows(registrations):
+                raise CommandError(f'The two read paths disagree at {size} rows')
+            slow = self.time(serializer_rows, registrations, repeat)
+            fast = self.time(values_rows, registrations, repeat)
+            self.stdout.write(
+                f"{size:>10} {slow * 1000:>14.1f} {fast * 1000:>10.1f} {slow / fast:>7.1f}x"
+            )
+
+    def time(self, function, registrations, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function(registrations)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
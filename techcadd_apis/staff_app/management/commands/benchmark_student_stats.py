@@ -0,0 +1,102 @@
+# staff_app/management/commands/benchmark_student_stats.py
+#  python manage.py benchmark_student_stats --sizes 10000 100000 1000000
+# Inserts synthetic enquiries inside a transaction that is rolled back at the
+# end, so it leaves the database untouched. Run it against a scratch copy of
+# the database anyway: large sizes hold the write lock for a while.
+import datetime
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from staff_app.models import StaffProfile, Student_api
+from staff_app.stats import enquiry_stats
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_stats(students):
+    """The six-query implementation student_stats used before enquiry_stats()"""
+    status_counts = {}
+    for stat in students.values('enquiry_status').annotate(count=Count('id')):
+        status_counts[stat['enquiry_status']] = stat['count']
+    return {
+        'total_students': students.count(),
+        'new_enquiries': students.filter(enquiry_status='new').count(),
+        'converted_students': students.filter(enquiry_status='admission_done').count(),
+        'trade_distribution': list(students.values('trade').annotate(count=Count('id'))),
+        'status_counts': status_counts,
+        'centre_distribution': list(students.values('centre').annotate(count=Count('id'))),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare student_stats latency (legacy six queries vs one grouped pass) at several table sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000])
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per implementation')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(sorted(options['sizes']), options['repeat'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def run(self, sizes, repeat):
+        user = User.objects.create_user(username='benchmark-stats-staff')
+        staff = StaffProfile.objects.create(user=user, role='manager')
+        rng = random.Random(42)
+        statuses = [value for value, label in Student_api.ENQUIRY_STATUS] + ['new']
+        trades = [value for value, label in Student_api.TRADE_CHOICES]
+        centres = [value for value, label in Student_api.CENTRE_CHOICES]
+        sources = [value for value, label in Student_api.ENQUIRY_SOURCE_CHOICES]
+
+        self.stdout.write(f"{'rows':>10} {'legacy ms':>10} {'grouped ms':>11} {'speedup':>8}")
+        inserted = 0
+        for size in sizes:
+            # bulk_create skips save(), so usernames/passwords are filled here
+            batch = []
+            for number in range(inserted, size):
+                batch.append(Student_api(
+                    student_name=f'Benchmark {number}',
+                    date_of_birth=datetime.date(2000, 1, 1),
+                    qualification='12th',
+                    mobile='9876543210',
+                    email=f'benchmark{number}@example.com',
+                    address='Benchmark',
+                    centre=rng.choice(centres),
+                    enquiry_taken_by=staff,
+                    trade=rng.choice(trades),
+                    enquiry_source=rng.choice(sources),
+                    enquiry_status=rng.choice(statuses),
+                    username=f'benchmark{number}',
+                    password='benchmark',
+                ))
+                if len(batch) == 5000:
+                    Student_api.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                Student_api.objects.bulk_create(batch)
+            inserted = size
+
+            students = Student_api.objects.all()
+            legacy = self.time(legacy_stats, students, repeat)
+            grouped = self.time(enquiry_stats, students, repeat)
+            self.stdout.write(
+                f"{size:>10} {legacy * 1000:>10.1f} {grouped * 1000:>11.1f} {legacy / grouped:>7.1f}x"
+            )
+
+    def time(self, function, students, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function(students)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,12 @@
+# staff_app/management/commands/rebuild_dashboard_rollups.py
+#  python manage.py rebuild_dashboard_rollups
+from django.core.management.base import BaseCommand
+from staff_app.models import DashboardRollup, PaymentTransaction, StudentRegistration, Student_api
+from staff_app.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Recompute the per branch, per day dashboard rollups from enquiries, registrations and payments'
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild_rollups(Student_api, StudentRegistration, PaymentTransaction, DashboardRollup)
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {rows} dashboard rollup rows'))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0008_paymenttransaction'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student_api',
+            index=models.Index(fields=['created_at', 'id'], name='students_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentregistration',
+            index=models.Index(fields=['created_at', 'id'], name='registrations_created_id_idx'),
+        ),
+    ]
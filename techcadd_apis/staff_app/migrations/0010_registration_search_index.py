@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:40
+
+from django.db import migrations
+
+from staff_app.search import create_search_index, drop_search_index
+
+
+def forwards(apps, schema_editor):
+    create_search_index(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0009_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+from staff_app.rollups import rebuild_rollups
+
+
+def backfill_rollups(apps, schema_editor):
+    rebuild_rollups(
+        apps.get_model('staff_app', 'Student_api'),
+        apps.get_model('staff_app', 'StudentRegistration'),
+        apps.get_model('staff_app', 'PaymentTransaction'),
+        apps.get_model('staff_app', 'DashboardRollup'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0010_registration_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch', models.CharField(choices=[('jalandhar1', 'Jalandhar 1'), ('jalandhar2', 'Jalandhar 2'), ('maqsudan', 'Maqsudan'), ('ludhiana', 'Ludhiana'), ('hoshiarpur', 'Hoshiarpur'), ('mohali', 'Mohali'), ('phagwara', 'Phagwara')], max_length=20)),
+                ('day', models.DateField()),
+                ('enquiries', models.IntegerField(default=0)),
+                ('registrations', models.IntegerField(default=0)),
+                ('fee_balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('certificates_issued', models.IntegerField(default=0)),
+                ('fees_collected', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'db_table': 'dashboard_rollups',
+                'indexes': [models.Index(fields=['day'], name='dashboard_rollups_day_idx')],
+                'unique_together': {('branch', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
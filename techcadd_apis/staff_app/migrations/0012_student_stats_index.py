@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0011_dashboard_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student_api',
+            index=models.Index(fields=['trade', 'enquiry_status', 'centre'], name='students_stats_idx'),
+        ),
+    ]
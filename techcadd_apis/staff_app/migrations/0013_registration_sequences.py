@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:32
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    StudentRegistration = apps.get_model('staff_app', 'StudentRegistration')
+    RegistrationSequence = apps.get_model('staff_app', 'RegistrationSequence')
+    last_numbers = {}
+    numbers = StudentRegistration.objects.filter(
+        registration_number__startswith='TCD/'
+    ).values_list('registration_number', flat=True)
+    for registration_number in numbers.iterator():
+        try:
+            _, branch_code, number = registration_number.split('/')
+            number = int(number)
+        except ValueError:
+            continue
+        last_numbers[branch_code] = max(last_numbers.get(branch_code, 0), number)
+    RegistrationSequence.objects.bulk_create([
+        RegistrationSequence(branch_code=branch_code, last_number=last_number)
+        for branch_code, last_number in last_numbers.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0012_student_stats_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch_code', models.CharField(max_length=10, unique=True)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'registration_sequences',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
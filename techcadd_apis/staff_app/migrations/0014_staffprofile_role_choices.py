@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0013_registration_sequences'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='staffprofile',
+            name='role',
+            field=models.CharField(choices=[('trainer', 'Trainer'), ('counselor', 'Counselor'), ('manager', 'Manager')], default='support', max_length=20),
+        ),
+    ]
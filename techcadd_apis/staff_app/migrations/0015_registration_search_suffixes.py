@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:10
+
+from django.db import migrations
+
+from staff_app.search import create_search_index, drop_search_index
+
+
+def rebuild_search_index(apps, schema_editor):
+    # Recreate the FTS table with the number_suffixes column
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_index(schema_editor)
+        create_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0014_staffprofile_role_choices'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, rebuild_search_index),
+    ]
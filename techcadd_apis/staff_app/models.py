@@ -4,9 +4,12 @@ from dateutil.relativedelta import relativedelta
 from django.utils import timezone
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 import datetime
+from .utils import allocate_username, save_with_allocated_username
 class StaffProfile(models.Model):
     STAFF_ROLES = [
         ('trainer', 'Trainer'),
@@ -126,21 +129,21 @@ class Student_api(models.Model):
     class Meta:
         db_table = 'students'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination in list_students walks (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='students_created_id_idx'),
+            # Covering index for the single grouped pass in student_stats
+            models.Index(fields=['trade', 'enquiry_status', 'centre'], name='students_stats_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student_name} ({self.username})"
     
     def save(self, *args, **kwargs):
         # Auto-generate username if not provided
-        if not self.username:
-            base_username = self.student_name.lower().replace(' ', '')
-            username = base_username
-            counter = 1
-            # FIX: Use Student_api instead of Student
-            while Student_api.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
-            self.username = username
+        username_allocated = not self.username
+        if username_allocated:
+            self.username = allocate_username(Student_api, self.student_name)
         
         # Auto-generate password if not provided
         if not self.password:
@@ -149,7 +152,12 @@ class Student_api(models.Model):
             alphabet = string.ascii_letters + string.digits
             self.password = ''.join(secrets.choice(alphabet) for i in range(8))
         
-        super().save(*args, **kwargs)
+        # Atomic so the dashboard rollup update (post_save) commits with the row
+        with transaction.atomic():
+            if username_allocated:
+                save_with_allocated_username(self, super().save, *args, **kwargs)
+            else:
+                super().save(*args, **kwargs)
 
 
 # staff_app/models.py - Add these models
@@ -195,6 +203,56 @@ class Course(models.Model):
     def __str__(self):
         return f"{self.name} - {self.course_type}"
 
+class RegistrationSequence(models.Model):
+    """Last registration number issued per branch code"""
+    branch_code = models.CharField(max_length=10, unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'registration_sequences'
+    
+    def __str__(self):
+        return f"TCD/{self.branch_code}/{self.last_number}"
+    
+    @staticmethod
+    def last_issued_number(branch_code, registrations=None):
+        """Highest number already issued for a branch (seeds a new sequence row)"""
+        if registrations is None:
+            registrations = StudentRegistration.objects
+        last_number = 0
+        prefix = f"TCD/{branch_code}/"
+        numbers = registrations.filter(
+            registration_number__startswith=prefix
+        ).values_list('registration_number', flat=True)
+        for registration_number in numbers.iterator():
+            try:
+                last_number = max(last_number, int(registration_number.split('/')[-1]))
+            except (ValueError, IndexError):
+                continue
+        return last_number
+    
+    @classmethod
+    def allocate(cls, branch_code):
+        """
+        Atomically take the next number for a branch.
+        The F() increment locks the sequence row until the surrounding
+        transaction ends, so concurrent saves get distinct numbers.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(branch_code=branch_code).update(last_number=F('last_number') + 1)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(
+                            branch_code=branch_code,
+                            last_number=cls.last_issued_number(branch_code) + 1
+                        )
+                except IntegrityError:
+                    # Another save created the row first
+                    cls.objects.filter(branch_code=branch_code).update(last_number=F('last_number') + 1)
+            return cls.objects.filter(branch_code=branch_code).values_list('last_number', flat=True).get()
+
+
 class StudentRegistration(models.Model):
     CENTRE_CHOICES = [
         ('jalandhar1', 'Jalandhar 1'),
@@ -250,11 +308,21 @@ class StudentRegistration(models.Model):
     class Meta:
         db_table = 'student_registrations'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination in list_student_registrations walks (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='registrations_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student_name} - {self.course.name}"
     
     def save(self, *args, **kwargs):
+        # The registration number comes from a locked sequence row, so it is
+        # allocated inside the same transaction as the insert
+        with transaction.atomic():
+            self.save_registration(*args, **kwargs)
+
+    def save_registration(self, *args, **kwargs):
         if not self.registration_number:
             self.registration_number = self.generate_registration_number()
         self.fee_balance = self.total_course_fee - self.paid_fee
@@ -264,14 +332,9 @@ class StudentRegistration(models.Model):
             self.course_completion_date = self.calculate_completion_date()
         
         # Auto-generate username if not provided
-        if not self.username:
-            base_username = self.student_name.lower().replace(' ', '')
-            username = base_username
-            counter = 1
-            while StudentRegistration.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
-            self.username = username
+        username_allocated = not self.username
+        if username_allocated:
+            self.username = allocate_username(StudentRegistration, self.student_name)
         
         # Auto-generate password if not provided
         if not self.password:
@@ -280,22 +343,14 @@ class StudentRegistration(models.Model):
             alphabet = string.ascii_letters + string.digits
             self.password = ''.join(secrets.choice(alphabet) for i in range(8))
         
-        super().save(*args, **kwargs)
+        if username_allocated:
+            save_with_allocated_username(self, super().save, *args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
     def generate_registration_number(self):
+        """Next TCD/{branch_code}/NNNN number; call inside a transaction"""
         branch_code = self.BRANCH_CODES.get(self.branch, '4000')
-        last_reg = StudentRegistration.objects.filter(
-            registration_number__startswith=f"TCD/{branch_code}/"
-        ).order_by('-id').first()
-        
-        if last_reg and last_reg.registration_number:
-            try:
-                last_number = int(last_reg.registration_number.split('/')[-1])
-                sequential_number = last_number + 1
-            except (ValueError, IndexError):
-                sequential_number = 1
-        else:
-            sequential_number = 1
-        
+        sequential_number = RegistrationSequence.allocate(branch_code)
         sequential_str = str(sequential_number).zfill(4)
         return f"TCD/{branch_code}/{sequential_str}"
     
@@ -375,6 +430,19 @@ class StudentRegistration(models.Model):
         return None
 
 
+# Keep the registration search index in sync
+@receiver(post_save, sender=StudentRegistration)
+def update_registration_search_index(sender, instance, **kwargs):
+    from .search import index_registration
+    index_registration(instance)
+
+
+@receiver(post_delete, sender=StudentRegistration)
+def remove_registration_search_index(sender, instance, **kwargs):
+    from .search import unindex_registration
+    unindex_registration(instance.pk)
+
+
 # staff_app/models.py - Add this model
 
 class PaymentTransaction(models.Model):
@@ -401,4 +469,80 @@ class PaymentTransaction(models.Model):
         ordering = ['installment_number']
     
     def __str__(self):
-        return f"Installment #{self.installment_number} - {self.amount} for {self.student_registration.registration_number}"
\ No newline at end of file
+        return f"Installment #{self.installment_number} - {self.amount} for {self.student_registration.registration_number}"
+
+    def save(self, *args, **kwargs):
+        # Atomic so the dashboard rollup update (post_save) commits with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class DashboardRollup(models.Model):
+    """
+    Per branch, per day counters for staff_dashboard.
+    Maintained on every enquiry/registration/payment write (see rollups.py);
+    rebuild with: python manage.py rebuild_dashboard_rollups
+    """
+    branch = models.CharField(max_length=20, choices=StudentRegistration.CENTRE_CHOICES)
+    day = models.DateField()
+    enquiries = models.IntegerField(default=0)
+    registrations = models.IntegerField(default=0)
+    fee_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    certificates_issued = models.IntegerField(default=0)
+    fees_collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'dashboard_rollups'
+        unique_together = ('branch', 'day')
+        indexes = [
+            models.Index(fields=['day'], name='dashboard_rollups_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.branch} {self.day}"
+
+
+# Keep dashboard rollups in step with the source tables
+@receiver(pre_save, sender=Student_api)
+@receiver(pre_save, sender=StudentRegistration)
+@receiver(pre_save, sender=PaymentTransaction)
+def remember_dashboard_rollup_contribution(sender, instance, **kwargs):
+    from .rollups import remember_previous_contribution
+    remember_previous_contribution(instance)
+
+
+@receiver(post_save, sender=Student_api)
+@receiver(post_save, sender=StudentRegistration)
+@receiver(post_save, sender=PaymentTransaction)
+def update_dashboard_rollup(sender, instance, **kwargs):
+    from .rollups import record_save
+    record_save(instance)
+
+
+@receiver(post_delete, sender=Student_api)
+@receiver(post_delete, sender=StudentRegistration)
+@receiver(post_delete, sender=PaymentTransaction)
+def remove_dashboard_rollup(sender, instance, **kwargs):
+    from .rollups import record_delete
+    record_delete(instance)
+
+
+# Dropdown payloads (see form_options.py) are rebuilt after these change
+@receiver(post_save, sender=StaffProfile)
+@receiver(post_delete, sender=StaffProfile)
+@receiver(post_save, sender=CourseType)
+@receiver(post_delete, sender=CourseType)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_form_options(sender, instance, **kwargs):
+    from .form_options import bump_form_options_version
+    bump_form_options_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_form_options_for_user(sender, instance, update_fields=None, **kwargs):
+    # Staff names come from User; login only touches last_login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    from .form_options import bump_form_options_version
+    bump_form_options_version()
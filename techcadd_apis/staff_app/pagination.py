@@ -0,0 +1,101 @@
+# staff_app/pagination.py
+import base64
+import binascii
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a next_cursor token cannot be decoded"""
+
+
+def encode_cursor(obj):
+    """Encode the (created_at, id) position of a row (instance or values() dict) as an opaque token"""
+    if isinstance(obj, dict):
+        raw = f"{obj['created_at'].isoformat()}|{obj['id']}"
+    else:
+        raw = f"{obj.created_at.isoformat()}|{obj.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token produced by encode_cursor back to (created_at, id)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, row_id = raw.rsplit('|', 1)
+        created_at = parse_datetime(created_at)
+        row_id = int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+    if created_at is None:
+        raise InvalidCursor('Invalid cursor')
+    return created_at, row_id
+
+
+def get_page_size(request):
+    """Read ?page_size= from the request, capped at MAX_PAGE_SIZE"""
+    try:
+        page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        page_size = DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def wants_all(request):
+    """?page_size=all asks for every row at once (served as a streamed response)"""
+    return request.GET.get('page_size', '').lower() == 'all'
+
+
+def wants_total(request):
+    """Totals are opt-in (?include_total=true) because they cost a table scan"""
+    return request.GET.get('include_total', '').lower() in ('1', 'true', 'yes')
+
+
+def approximate_count(queryset):
+    """
+    Cheap row estimate for a list queryset.
+    On PostgreSQL an unfiltered queryset is answered from the planner
+    statistics; everything else falls back to an exact count().
+    """
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    return queryset.count()
+
+
+def paginate_by_created_at(queryset, request):
+    """
+    Keyset pagination on (created_at, id), newest first.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Raises InvalidCursor for a malformed ?cursor= value.
+    """
+    page_size = get_page_size(request)
+    queryset = queryset.order_by('-created_at', '-id')
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) |
+            Q(created_at=created_at, id__lt=row_id)
+        )
+
+    # Fetch one extra row to know whether another page exists without a count()
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1])
+    return rows, next_cursor
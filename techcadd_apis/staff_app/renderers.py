@@ -0,0 +1,105 @@
+# staff_app/renderers.py
+"""
+JSON renderer and parser backed by orjson when it is installed.
+
+orjson encodes dicts, lists, strings, numbers, dates and datetimes in C,
+several times faster than the stdlib json module DRF uses. Everything
+else it cannot encode (Decimal, UUID, lazy strings, querysets...) goes
+through DRF's own JSONEncoder.default, so the output is the bytes
+JSONRenderer produces, with two known differences for floats:
+
+* exponents have no "+" (1e16, where JSONRenderer writes 1e+16), which
+  decodes to the same value;
+* NaN and Infinity are written as null, where JSONRenderer (STRICT_JSON)
+  raises ValueError.
+
+Without orjson, or for anything orjson rejects (integers over 64 bits,
+indented output for the browsable API), both classes fall back to DRF's
+stdlib implementation. The parser also falls back for bodies orjson
+cannot decode (lone surrogate escapes, which the stdlib accepts) and for
+integers longer than 19 digits, which orjson would turn into floats.
+
+Enabled in REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] and
+['DEFAULT_PARSER_CLASSES']; benchmark_json_renderer compares the two
+renderers on the registration list payload.
+"""
+import codecs
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Types orjson does not know are converted exactly as DRF converts them
+encoder_default = JSONEncoder().default
+
+# Possibly an integer orjson cannot hold in 64 bits
+LONG_INTEGER = re.compile(rb'\d{20}')
+
+if orjson is not None:
+    # UTC datetimes end in "Z" and non-string keys become strings, as in DRF
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data):
+    """data as compact UTF-8 JSON bytes, as JSONRenderer renders it (see above for floats)"""
+    if orjson is not None:
+        try:
+            content = orjson.dumps(data, default=encoder_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+        else:
+            # JSONRenderer escapes these for embedding in JavaScript
+            if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+                content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+            return content
+    return JSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer with the same output, produced by orjson when available"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or not self.is_default_format(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+    def is_default_format(self, accepted_media_type, renderer_context):
+        """True when JSONRenderer would write compact, unicode, strict output"""
+        return (
+            self.get_indent(accepted_media_type, renderer_context) is None
+            and api_settings.COMPACT_JSON
+            and api_settings.UNICODE_JSON
+            and api_settings.STRICT_JSON
+            and self.encoder_class is JSONEncoder
+        )
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding UTF-8 bodies with orjson when available"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        if not LONG_INTEGER.search(content):
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass
+        # The stdlib parser decides: it keeps big integers exact, accepts
+        # what only orjson rejects and raises ParseError for invalid JSON
+        # (NaN and Infinity included when STRICT_JSON is on)
+        return super().parse(io.BytesIO(content), media_type, parser_context)
@@ -0,0 +1,154 @@
+# staff_app/rollups.py
+"""
+Per branch, per day counters behind staff_dashboard.
+
+Each enquiry, registration and payment contributes a few numbers to one
+DashboardRollup row. On every write the old contribution (read in
+pre_save) is subtracted and the new one added with F() updates, inside
+the same transaction as the write itself. rebuild_dashboard_rollups
+recomputes the table from scratch.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def get_contribution(instance):
+    """Return ((branch, day), {counter: value}) for one row, or None"""
+    from .models import PaymentTransaction, StudentRegistration, Student_api
+
+    if isinstance(instance, Student_api):
+        if not instance.created_at:
+            return None
+        return (instance.centre, timezone.localdate(instance.created_at)), {
+            'enquiries': 1,
+        }
+
+    if isinstance(instance, StudentRegistration):
+        if not instance.created_at:
+            return None
+        return (instance.branch, timezone.localdate(instance.created_at)), {
+            'registrations': 1,
+            'fee_balance': instance.fee_balance or Decimal('0'),
+            'certificates_issued': 1 if instance.certificate_issued else 0,
+        }
+
+    if isinstance(instance, PaymentTransaction):
+        branch = StudentRegistration.objects.filter(
+            pk=instance.student_registration_id
+        ).values_list('branch', flat=True).first()
+        if branch is None or not instance.payment_date:
+            return None
+        return (branch, instance.payment_date), {
+            'fees_collected': instance.amount or Decimal('0'),
+        }
+
+    return None
+
+
+def remember_previous_contribution(instance):
+    """pre_save: keep the contribution of the row as currently stored"""
+    instance._rollup_previous = None
+    if instance.pk is None or instance._state.adding:
+        return
+    previous = type(instance).objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._rollup_previous = get_contribution(previous)
+
+
+def apply_contribution(contribution, sign):
+    from .models import DashboardRollup
+
+    if contribution is None:
+        return
+    (branch, day), counters = contribution
+    changes = {name: value for name, value in counters.items() if value}
+    if not changes:
+        return
+    rollup, created = DashboardRollup.objects.get_or_create(branch=branch, day=day)
+    DashboardRollup.objects.filter(pk=rollup.pk).update(**{
+        name: F(name) + (value if sign > 0 else -value)
+        for name, value in changes.items()
+    })
+
+
+def move_payment_contributions(registration, old_branch, new_branch):
+    """Move the fees collected on a registration's payments to its new branch"""
+    from .models import PaymentTransaction
+
+    payments = PaymentTransaction.objects.filter(
+        student_registration_id=registration.pk
+    ).values('payment_date').annotate(collected=Sum('amount')).order_by()
+    for row in payments:
+        counters = {'fees_collected': row['collected'] or Decimal('0')}
+        apply_contribution(((old_branch, row['payment_date']), counters), -1)
+        apply_contribution(((new_branch, row['payment_date']), counters), 1)
+
+
+def record_save(instance):
+    """post_save: move the row's contribution from its old bucket to its new one"""
+    from .models import StudentRegistration
+
+    previous = getattr(instance, '_rollup_previous', None)
+    with transaction.atomic():
+        apply_contribution(previous, -1)
+        apply_contribution(get_contribution(instance), 1)
+        # Payments are bucketed under their registration's branch
+        if isinstance(instance, StudentRegistration) and previous is not None:
+            (old_branch, day), counters = previous
+            if old_branch != instance.branch:
+                move_payment_contributions(instance, old_branch, instance.branch)
+    instance._rollup_previous = None
+
+
+def record_delete(instance):
+    """post_delete: remove the row's contribution"""
+    with transaction.atomic():
+        apply_contribution(get_contribution(instance), -1)
+
+
+def rebuild_rollups(Student_api, StudentRegistration, PaymentTransaction, DashboardRollup):
+    """
+    Recompute every rollup row from the source tables.
+    Takes the model classes so data migrations can pass historical models.
+    """
+    totals = defaultdict(lambda: defaultdict(int))
+
+    enquiries = Student_api.objects.annotate(
+        day=TruncDate('created_at')
+    ).values('centre', 'day').annotate(total=Count('id')).order_by()
+    for row in enquiries:
+        totals[(row['centre'], row['day'])]['enquiries'] = row['total']
+
+    registrations = StudentRegistration.objects.annotate(
+        day=TruncDate('created_at')
+    ).values('branch', 'day').annotate(
+        total=Count('id'),
+        balance=Sum('fee_balance'),
+        certificates=Count('id', filter=Q(certificate_issued=True)),
+    ).order_by()
+    for row in registrations:
+        counters = totals[(row['branch'], row['day'])]
+        counters['registrations'] = row['total']
+        counters['fee_balance'] = row['balance'] or Decimal('0')
+        counters['certificates_issued'] = row['certificates']
+
+    payments = PaymentTransaction.objects.values(
+        'student_registration__branch', 'payment_date'
+    ).annotate(collected=Sum('amount')).order_by()
+    for row in payments:
+        key = (row['student_registration__branch'], row['payment_date'])
+        totals[key]['fees_collected'] = row['collected'] or Decimal('0')
+
+    with transaction.atomic():
+        DashboardRollup.objects.all().delete()
+        DashboardRollup.objects.bulk_create([
+            DashboardRollup(branch=branch, day=day, **counters)
+            for (branch, day), counters in totals.items()
+            if day is not None
+        ], batch_size=500)
+    return len(totals)
@@ -0,0 +1,161 @@
+# staff_app/search.py
+import logging
+import re
+
+from django.db import DatabaseError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Columns of student_registrations covered by the search index
+SEARCH_FIELDS = ('registration_number', 'student_name', 'email', 'phone_no', 'father_name')
+
+FTS_TABLE = 'student_registrations_fts'
+
+# FTS5 only matches token prefixes. The suffixes of these fields' tokens go in
+# an extra column, so a prefix match on a suffix finds any part of a phone or
+# registration number ("3210", "0012") from the index
+SUFFIX_FIELDS = ('registration_number', 'phone_no')
+SUFFIX_COLUMN = 'number_suffixes'
+INDEX_COLUMNS = SEARCH_FIELDS + (SUFFIX_COLUMN,)
+
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def number_suffixes(values):
+    """Proper suffixes (2+ characters) of every token in values"""
+    suffixes = []
+    for value in values:
+        for token in _TOKEN_RE.findall(value or ''):
+            suffixes += [token[start:] for start in range(1, len(token) - 1)]
+    return ' '.join(suffixes)
+
+
+def index_row(values):
+    """FTS row for the SEARCH_FIELDS values of one registration"""
+    values = [value or '' for value in values]
+    fields = dict(zip(SEARCH_FIELDS, values))
+    return values + [number_suffixes(fields[field] for field in SUFFIX_FIELDS)]
+
+
+def create_search_index(schema_editor):
+    """Create the backend specific search structures (used by the migrations)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        columns = ', '.join(INDEX_COLUMNS)
+        placeholders = ', '.join(['%s'] * len(INDEX_COLUMNS))
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{columns}, tokenize='unicode61', prefix='2 3')"
+        )
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"SELECT id, {', '.join(SEARCH_FIELDS)} FROM student_registrations")
+            rows = [[row[0]] + index_row(row[1:]) for row in cursor.fetchall()]
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (%s, {placeholders})", rows
+            )
+    elif vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS student_registrations_{field}_trgm "
+                f"ON student_registrations USING gin (UPPER({field}) gin_trgm_ops)"
+            )
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS student_registrations_{field}_trgm")
+
+
+def index_registration(registration):
+    """Insert or refresh one registration in the SQLite FTS table"""
+    if connection.vendor != 'sqlite':
+        # PostgreSQL trigram indexes are maintained by the database itself
+        return
+    columns = ', '.join(INDEX_COLUMNS)
+    placeholders = ', '.join(['%s'] * len(INDEX_COLUMNS))
+    values = index_row([getattr(registration, field) for field in SEARCH_FIELDS])
+    try:
+        # Savepoint, so a missing index never fails the registration save itself
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [registration.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (%s, {placeholders})",
+                [registration.pk] + values
+            )
+    except DatabaseError:
+        logger.exception('Could not index registration %s for search', registration.pk)
+
+
+def unindex_registration(registration_id):
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [registration_id])
+    except DatabaseError:
+        logger.exception('Could not remove registration %s from the search index', registration_id)
+
+
+def build_match_query(search_query):
+    """
+    Turn free text into an FTS5 MATCH expression.
+    Every whitespace separated term must match; inside a term the tokens
+    form a phrase whose last token is prefix matched, so "TCD/4006/00"
+    finds "TCD/4006/0012" and "aman" finds "Amandeep".
+    """
+    phrases = []
+    for term in search_query.split():
+        tokens = _TOKEN_RE.findall(term)
+        if tokens:
+            phrases.append('"%s"*' % ' '.join(tokens))
+    return ' AND '.join(phrases)
+
+
+def like_pattern(search_query):
+    """%search_query% with LIKE wildcards in the user input escaped"""
+    escaped = search_query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def search_registration_ids(search_query, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Return matching registration ids, best match first.
+    Returns None when no index is available for this backend so the caller
+    can fall back to plain icontains filtering.
+    """
+    if connection.vendor == 'sqlite':
+        match = build_match_query(search_query)
+        if not match:
+            return []
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                    f"ORDER BY rank LIMIT %s",
+                    [match, limit]
+                )
+                return [row[0] for row in cursor.fetchall()]
+        except DatabaseError:
+            return None
+
+    if connection.vendor == 'postgresql':
+        conditions = ' OR '.join(f"UPPER({field}) LIKE UPPER(%s)" for field in SEARCH_FIELDS)
+        similarity = ', '.join(f"similarity({field}, %s)" for field in SEARCH_FIELDS)
+        pattern = like_pattern(search_query)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM student_registrations WHERE {conditions} "
+                f"ORDER BY GREATEST({similarity}) DESC, id DESC LIMIT %s",
+                [pattern] * len(SEARCH_FIELDS) + [search_query] * len(SEARCH_FIELDS) + [limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    return None
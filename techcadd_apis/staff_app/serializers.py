@@ -3,6 +3,8 @@ from django.contrib.auth.models import User
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from .models import *
+from .authentication import get_staff_profile
+from .fieldsets import SparseFieldsMixin
 
 class StaffLoginSerializer(serializers.Serializer):
     username = serializers.CharField()
@@ -93,7 +95,7 @@ class UserSerializer(serializers.ModelSerializer):
 # staff_app/serializers.py - Add these to your existing serializers
 from .models import Student_api
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     enquiry_taken_by_name = serializers.CharField(source='enquiry_taken_by.user.get_full_name', read_only=True)
     assign_enquiry_name = serializers.CharField(source='assign_enquiry.user.get_full_name', read_only=True)
     enquiry_status_display = serializers.CharField(source='get_enquiry_status_display', read_only=True)
@@ -113,6 +115,15 @@ class StudentSerializer(serializers.ModelSerializer):
             'remark', 'next_follow_up_date', 'username', 'password', 'created_at'
         )
         read_only_fields = ('username', 'password', 'created_at', 'updated_at', 'enquiry_taken_by')
+        # Columns behind the method-backed fields, for ?fields= narrowing
+        fieldset_columns = {
+            'enquiry_taken_by_name': ('enquiry_taken_by__user__first_name', 'enquiry_taken_by__user__last_name'),
+            'assign_enquiry_name': ('assign_enquiry__user__first_name', 'assign_enquiry__user__last_name'),
+            'enquiry_status_display': ('enquiry_status',),
+            'trade_display': ('trade',),
+            'centre_display': ('centre',),
+            'enquiry_source_display': ('enquiry_source',),
+        }
 
 # staff_app/serializers.py
 class StudentCredentialsSerializer(serializers.ModelSerializer):
@@ -157,7 +168,7 @@ class CreateStudentSerializer(serializers.ModelSerializer):
         # Get the staff member who is creating the student (from request)
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
-            staff_profile = StaffProfile.objects.get(user=request.user)
+            staff_profile = get_staff_profile(request.user)
             validated_data['enquiry_taken_by'] = staff_profile
             
             # If assign_enquiry is not provided, assign to current staff
@@ -168,7 +179,7 @@ class CreateStudentSerializer(serializers.ModelSerializer):
         student = Student_api.objects.create(**validated_data)
         return student
 
-class StudentListSerializer(serializers.ModelSerializer):
+class StudentListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     enquiry_taken_by_name = serializers.CharField(source='enquiry_taken_by.user.get_full_name', read_only=True)
     enquiry_status_display = serializers.CharField(source='get_enquiry_status_display', read_only=True)
     trade_display = serializers.CharField(source='get_trade_display', read_only=True)
@@ -181,6 +192,13 @@ class StudentListSerializer(serializers.ModelSerializer):
             'enquiry_status', 'enquiry_status_display', 'enquiry_taken_by_name',
             'next_follow_up_date', 'centre', 'centre_display', 'trade', 'trade_display'
         )
+        # Columns behind the method-backed fields, for ?fields= narrowing
+        fieldset_columns = {
+            'enquiry_taken_by_name': ('enquiry_taken_by__user__first_name', 'enquiry_taken_by__user__last_name'),
+            'enquiry_status_display': ('enquiry_status',),
+            'trade_display': ('trade',),
+            'centre_display': ('centre',),
+        }
 
 class UpdateStudentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -240,7 +258,7 @@ class CourseSerializer(serializers.ModelSerializer):
 #             'username', 'password', 'created_at', 'created_by', 'created_by_name'
 #         )
 #         read_only_fields = ('registration_number','username', 'password', 'created_at', 'created_by')
-class StudentRegistrationSerializer(serializers.ModelSerializer):
+class StudentRegistrationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     course_type_name = serializers.CharField(source='course_type.name', read_only=True)
     course_name = serializers.CharField(source='course.name', read_only=True)
     branch_display = serializers.CharField(source='get_branch_display', read_only=True)
@@ -270,6 +288,16 @@ class StudentRegistrationSerializer(serializers.ModelSerializer):
         read_only_fields = ('registration_number', 'username', 'created_at', 'created_by', 
                           'fee_balance', 'course_completion_date', 'is_eligible_for_certificate',
                           'days_remaining_to_complete')
+        # Columns behind the method-backed fields, for ?fields= narrowing
+        fieldset_columns = {
+            'branch_display': ('branch',),
+            'duration_months_display': ('duration_months',),
+            'created_by_name': ('created_by__user__first_name', 'created_by__user__last_name'),
+            'is_eligible_for_certificate': ('paid_fee', 'total_course_fee', 'course_completion_date'),
+            'days_remaining_to_complete': ('joining_date', 'course_completion_date'),
+            'total_course_days': ('joining_date', 'course_completion_date'),
+            'course_status': ('joining_date', 'course_completion_date'),
+        }
     def get_days_remaining_to_complete(self, obj):
             return obj.get_days_remaining()
     
@@ -310,7 +338,7 @@ class CreateStudentRegistrationSerializer(serializers.ModelSerializer):
         # Set the created_by staff
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
-            staff_profile = StaffProfile.objects.get(user=request.user)
+            staff_profile = get_staff_profile(request.user)
             validated_data['created_by'] = staff_profile
         
         # Create registration
@@ -0,0 +1,35 @@
+# staff_app/stats.py
+from django.db.models import Count
+
+
+def enquiry_stats(students):
+    """
+    Statistics for student_stats in one grouped query.
+    Groups the enquiry queryset by (trade, enquiry_status, centre) once and
+    folds the few hundred resulting rows into every total and distribution.
+    """
+    rows = students.order_by().values('trade', 'enquiry_status', 'centre').annotate(count=Count('id'))
+
+    total_students = 0
+    trade_counts = {}
+    status_counts = {}
+    centre_counts = {}
+    for row in rows:
+        count = row['count']
+        total_students += count
+        trade_counts[row['trade']] = trade_counts.get(row['trade'], 0) + count
+        status_counts[row['enquiry_status']] = status_counts.get(row['enquiry_status'], 0) + count
+        centre_counts[row['centre']] = centre_counts.get(row['centre'], 0) + count
+
+    return {
+        'total_students': total_students,
+        'new_enquiries': status_counts.get('new', 0),
+        'converted_students': status_counts.get('admission_done', 0),
+        'trade_distribution': [
+            {'trade': trade, 'count': count} for trade, count in sorted(trade_counts.items())
+        ],
+        'status_counts': status_counts,
+        'centre_distribution': [
+            {'centre': centre, 'count': count} for centre, count in sorted(centre_counts.items())
+        ],
+    }
@@ -0,0 +1,49 @@
+# staff_app/streaming.py
+"""
+Streamed JSON for list endpoints asked for every row (?page_size=all).
+
+Instead of building serializer.data for the whole result and then the
+rendered string (two full copies in memory), rows are read from a
+database iterator, serialized STREAM_CHUNK_SIZE at a time and written to
+a StreamingHttpResponse. Peak memory is bounded by the chunk size.
+
+The body has the same keys as a normal page:
+    {"next_cursor": null, "<key>": [...], "count": <rows>}
+with count last, as it is only known once every row has been sent.
+"""
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+
+STREAM_CHUNK_SIZE = 500
+
+
+def iter_json_list(queryset, serializer_class, key, chunk_size=STREAM_CHUNK_SIZE, context=None):
+    """Yield the encoded response body piece by piece"""
+    yield b'{"next_cursor":null,' + dumps(key) + b':['
+    count = 0
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            yield encode_chunk(serializer_class, chunk, count > 0, context)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        yield encode_chunk(serializer_class, chunk, count > 0, context)
+        count += len(chunk)
+    yield f'],"count":{count}}}'.encode()
+
+
+def encode_chunk(serializer_class, objects, after_rows, context):
+    # The chunk's rows are encoded as one array, then its brackets dropped
+    rows = dumps(serializer_class(objects, many=True, context=context).data)[1:-1]
+    return (b',' if after_rows and rows else b'') + rows
+
+
+def streaming_json_response(queryset, serializer_class, key, chunk_size=STREAM_CHUNK_SIZE, context=None):
+    """context is shared by every chunk's serializer"""
+    return StreamingHttpResponse(
+        iter_json_list(queryset, serializer_class, key, chunk_size, context),
+        content_type='application/json',
+    )
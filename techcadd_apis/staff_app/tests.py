@@ -1,3 +1,661 @@
+import csv
+import datetime
+import gzip
+import io
+import itertools
+import json
+import re
+import time
+import zipfile
+from decimal import Decimal
+from unittest import mock, skipIf
+from xml.etree import ElementTree
+
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import compression, form_options, renderers
+from .models import (
+    Course, CourseType, DashboardRollup, PaymentTransaction, RegistrationSequence, StaffProfile,
+    StudentRegistration, Student_api,
+)
+from .fieldsets import Fieldset
+from .list_rows import RegistrationListRows, list_context, registration_values
+from .pagination import encode_cursor
+from .renderers import FastJSONParser, FastJSONRenderer, dumps
+from .rollups import rebuild_rollups
+from .search import FTS_TABLE, index_registration, like_pattern, search_registration_ids
+from .serializers import StudentRegistrationSerializer
+from .streaming import iter_json_list
+
+
+class StaffTestCase(TestCase):
+    """Logged-in staff member and helpers to create registrations"""
+
+    def setUp(self):
+        # The shared cache outlives the test database
+        cache.clear()
+        user = User.objects.create_user(username='manager', password='secret', first_name='Test', last_name='Manager')
+        self.staff = StaffProfile.objects.create(user=user, role='manager')
+        self.course_type = CourseType.objects.create(name='IT')
+        self.course = Course.objects.create(
+            course_type=self.course_type,
+            name='Python',
+            duration_months='3_months',
+            duration_hours=120,
+            course_fee=15000,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.sequence = itertools.count(1)
+
+    def create_registration(self, **fields):
+        number = next(self.sequence)
+        defaults = {
+            'branch': 'mohali',
+            'joining_date': datetime.date(2025, 1, 1),
+            'student_name': 'Test Student',
+            'father_name': 'Father',
+            'date_of_birth': datetime.date(2000, 1, 1),
+            'email': f'student{number}@example.com',
+            'qualification': 'B.Tech',
+            'work_college': 'College',
+            'contact_address': 'Address',
+            'phone_no': '9876543210',
+            'course_type': self.course_type,
+            'course': self.course,
+            'duration_months': '3_months',
+            'duration_hours': 120,
+            'total_course_fee': 15000,
+            'created_by': self.staff,
+        }
+        defaults.update(fields)
+        return StudentRegistration.objects.create(**defaults)
+
+    def create_enquiry(self, **fields):
+        number = next(self.sequence)
+        defaults = {
+            'student_name': 'Test Enquiry',
+            'date_of_birth': datetime.date(2000, 1, 1),
+            'qualification': 'B.Tech',
+            'mobile': '9876543210',
+            'email': f'enquiry{number}@example.com',
+            'address': 'Address',
+            'centre': 'mohali',
+            'enquiry_taken_by': self.staff,
+            'trade': 'programming',
+            'enquiry_source': 'website',
+            'enquiry_status': 'visited',
+        }
+        defaults.update(fields)
+        return Student_api.objects.create(**defaults)
+
+
+class CursorPaginationTests(StaffTestCase):
+    """Keyset pages cover every row once, newest first, ties broken by id"""
+
+    def walk(self, url, key, **params):
+        ids, cursor = [], None
+        while True:
+            query = {'page_size': 2, **params}
+            if cursor:
+                query['cursor'] = cursor
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [row['id'] for row in response.data[key]]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_row_once(self):
+        registrations = [self.create_registration() for _ in range(5)]
+        # Same created_at for some rows: the id breaks the tie
+        StudentRegistration.objects.filter(pk__in=[r.pk for r in registrations[1:4]]).update(
+            created_at=registrations[0].created_at
+        )
+        expected = list(StudentRegistration.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/staff/registrations/list/', 'registrations'), expected)
+
+        enquiries = [self.create_enquiry(centre=centre) for centre in ['mohali', 'ludhiana', 'mohali']]
+        self.assertEqual(
+            self.walk('/api/staff/students/list/', 'students', centre='mohali'),
+            [enquiries[2].pk, enquiries[0].pk],
+        )
+
+    def test_total_is_opt_in(self):
+        self.create_registration()
+        response = self.client.get('/api/staff/registrations/list/')
+        self.assertNotIn('approximate_total', response.data)
+        response = self.client.get('/api/staff/registrations/list/', {'include_total': 'true'})
+        self.assertEqual(response.data['approximate_total'], 1)
+
+    def test_invalid_cursor(self):
+        for cursor in ['not-base64!', 'bm90IGEgY3Vyc29y', encode_cursor({'created_at': timezone.now(), 'id': 1})[:-3]]:
+            for url in ['/api/staff/registrations/list/', '/api/staff/students/list/']:
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 400, (url, cursor))
+                self.assertEqual(response.data, {'error': 'Invalid cursor'})
+
+
+class StreamedListTests(StaffTestCase):
+    """?page_size=all streams the same body a single page would return"""
+
+    def stream(self, url, **params):
+        response = self.client.get(url, {'page_size': 'all', **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_body_matches_a_single_page(self):
+        for branch in ['mohali', 'ludhiana', 'mohali']:
+            self.create_registration(branch=branch)
+        for url, key, params in [
+            ('/api/staff/registrations/list/', 'registrations', {'branch': 'mohali'}),
+            ('/api/staff/registrations/list/', 'registrations', {'fields': 'id,student_name,course_status'}),
+            ('/api/staff/students/list/', 'students', {}),
+        ]:
+            page = self.client.get(url, {'page_size': 200, **params}).data
+            body = self.stream(url, **params)
+            self.assertEqual(list(body), ['next_cursor', key, 'count'])
+            self.assertEqual(body, json.loads(json.dumps({**page, 'next_cursor': None})))
+
+    def test_chunks_join_into_one_array(self):
+        for _ in range(5):
+            self.create_registration()
+        registrations = registration_values(StudentRegistration.objects.order_by('-created_at', '-id'))
+        expected = RegistrationListRows(registrations).data
+        for chunk_size in [1, 2, 5, 10]:
+            content = b''.join(iter_json_list(registrations, RegistrationListRows, 'rows', chunk_size))
+            self.assertEqual(json.loads(content), json.loads(dumps({'next_cursor': None, 'rows': expected, 'count': 5})))
+        content = b''.join(iter_json_list(registrations.none(), RegistrationListRows, 'rows'))
+        self.assertEqual(content, b'{"next_cursor":null,"rows":[],"count":0}')
+
+
+class RegistrationListRowsTests(StaffTestCase):
+    """The values() read path produces exactly the serializer's output"""
+
+    def test_rows_match_the_serializer(self):
+        today = datetime.date.today()
+        other_course_type = CourseType.objects.create(name='Design')
+        self.create_registration(joining_date=today + datetime.timedelta(days=10))
+        self.create_registration(joining_date=today - datetime.timedelta(days=20), branch='phagwara', paid_fee=3000)
+        self.create_registration(
+            joining_date=today - datetime.timedelta(days=400), duration_months='1_year',
+            paid_fee=15000, certificate_issued=True, certificate_number='CERT-1', course_type=other_course_type,
+        )
+        self.create_registration(joining_date=today - datetime.timedelta(days=400), paid_fee=1000)
+        queryset = StudentRegistration.objects.order_by('-created_at', '-id')
+
+        self.assertEqual(
+            RegistrationListRows(registration_values(queryset)).data,
+            StudentRegistrationSerializer(queryset, many=True).data,
+        )
+        fieldset = Fieldset(fields=['id', 'branch_display', 'fee_balance', 'course_status', 'created_by_name'])
+        rows = RegistrationListRows(registration_values(queryset, fieldset), context=list_context(fieldset)).data
+        self.assertEqual(rows, StudentRegistrationSerializer(queryset, many=True, context={'fieldset': fieldset}).data)
+        self.assertEqual(list(rows[0]), ['id', 'branch_display', 'fee_balance', 'course_status', 'created_by_name'])
+
+
+class StudentStatsTests(StaffTestCase):
+    """student_stats totals and distributions, optionally within an enquiry date window"""
+
+    def test_date_window(self):
+        days = [datetime.date(2026, 3, 1), datetime.date(2026, 3, 15), datetime.date(2026, 3, 31)]
+        for day, trade, status in zip(days, ['programming', 'ielts', 'programming'], ['visited', 'admission_done', 'visited']):
+            enquiry = self.create_enquiry(trade=trade, enquiry_status=status)
+            Student_api.objects.filter(pk=enquiry.pk).update(enquiry_date=day)
+
+        response = self.client.get('/api/staff/students/stats/')
+        self.assertEqual(response.data['total_students'], 3)
+        self.assertEqual(response.data['converted_students'], 1)
+        self.assertEqual(response.data['trade_distribution'], [
+            {'trade': 'ielts', 'count': 1},
+            {'trade': 'programming', 'count': 2},
+        ])
+
+        # Both ends are inclusive
+        response = self.client.get('/api/staff/students/stats/', {'date_from': '2026-03-15', 'date_to': '2026-03-31'})
+        self.assertEqual(response.data['total_students'], 2)
+        self.assertEqual(response.data['status_counts'], {'admission_done': 1, 'visited': 1})
+        response = self.client.get('/api/staff/students/stats/', {'date_to': '2026-03-14'})
+        self.assertEqual(response.data['centre_distribution'], [{'centre': 'mohali', 'count': 1}])
+
+    def test_invalid_dates(self):
+        for params in [{'date_from': '15-03-2026'}, {'date_to': '2026-02-30'}]:
+            response = self.client.get('/api/staff/students/stats/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('YYYY-MM-DD', response.data['error'])
+
+
+class RegistrationNumberTests(StaffTestCase):
+    """Registration numbers come from the per-branch sequence row"""
+
+    def test_numbers_are_sequential_per_branch(self):
+        numbers = [self.create_registration(branch=branch).registration_number
+                   for branch in ['mohali', 'mohali', 'ludhiana', 'mohali']]
+        self.assertEqual(numbers, ['TCD/4006/0001', 'TCD/4006/0002', 'TCD/4004/0001', 'TCD/4006/0003'])
+
+    def test_new_sequence_continues_after_existing_numbers(self):
+        self.create_registration(registration_number='TCD/4006/0041')
+        self.assertEqual(self.create_registration().registration_number, 'TCD/4006/0042')
+
+    def test_sequence_insert_race(self):
+        filter_sequences = RegistrationSequence.objects.filter
+        calls = []
+
+        def first_update_misses(*args, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                # Another save creates the branch's row and takes number 1 first
+                RegistrationSequence.objects.create(branch_code='4006', last_number=1)
+                return filter_sequences(*args, **kwargs).none()
+            return filter_sequences(*args, **kwargs)
+
+        with mock.patch.object(RegistrationSequence.objects, 'filter', side_effect=first_update_misses):
+            self.assertEqual(RegistrationSequence.allocate('4006'), 2)
+        self.assertEqual(RegistrationSequence.objects.get(branch_code='4006').last_number, 2)
+
+
+class UsernameAllocationTests(StaffTestCase):
+    """Usernames get the smallest free numeric suffix, even when a concurrent save takes it"""
+
+    def test_smallest_free_suffix(self):
+        usernames = [self.create_registration(student_name='Amandeep Kaur').username for _ in range(3)]
+        self.assertEqual(usernames, ['amandeepkaur', 'amandeepkaur1', 'amandeepkaur2'])
+        StudentRegistration.objects.filter(username='amandeepkaur1').delete()
+        self.assertEqual(self.create_registration(student_name='Amandeep Kaur').username, 'amandeepkaur1')
+        # Enquiries have their own usernames
+        self.assertEqual(self.create_enquiry(student_name='Amandeep Kaur').username, 'amandeepkaur')
+
+    def test_username_taken_between_allocation_and_insert(self):
+        self.create_registration(student_name='Amandeep Kaur')
+        self.create_enquiry(student_name='Amandeep Kaur')
+        # Allocated before the rows above were committed; the retry allocates again
+        with mock.patch('staff_app.models.allocate_username', return_value='amandeepkaur'):
+            self.assertEqual(self.create_registration(student_name='Amandeep Kaur').username, 'amandeepkaur1')
+            self.assertEqual(self.create_enquiry(student_name='Amandeep Kaur').username, 'amandeepkaur1')
+
+    def test_other_integrity_errors_are_not_retried(self):
+        registration = self.create_registration(student_name='Amandeep Kaur')
+        with self.assertRaises(IntegrityError):
+            self.create_registration(student_name='Amandeep Kaur', email=registration.email)
+
+class ExportTests(StaffTestCase):
+    """Streamed exports hold exactly the rows the list filters select"""
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def csv_rows(self, content):
+        text = content.decode('utf-8')
+        self.assertTrue(text.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(text[1:])))
+
+    def xlsx_rows(self, content):
+        namespace = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        return [
+            [''.join(cell.itertext()) for cell in row.findall('s:c', namespace)]
+            for row in sheet.iterfind('s:sheetData/s:row', namespace)
+        ]
+
+    def test_registration_export_with_filters(self):
+        self.create_registration(student_name='=Mohali Student', paid_fee=5000)
+        self.create_registration(student_name='Ludhiana Student', branch='ludhiana')
+
+        response, content = self.export('/api/staff/registrations/export/', branch='mohali')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="registrations-', response['Content-Disposition'])
+        header, *rows = self.csv_rows(content)
+        self.assertEqual(header[:4], ['Registration Number', 'Student Name', 'Father Name', 'Branch'])
+        self.assertEqual([row[1:4] for row in rows], [["'=Mohali Student", 'Father', 'Mohali']])
+        self.assertEqual(rows[0][header.index('Fee Balance')], '10000.00')
+
+        response, content = self.export('/api/staff/registrations/export/', branch='ludhiana', file_format='xlsx')
+        self.assertTrue(response['Content-Disposition'].endswith('.xlsx"'))
+        header, *rows = self.xlsx_rows(content)
+        self.assertEqual([row[1] for row in rows], ['Ludhiana Student'])
+        self.assertEqual(rows[0][header.index('Certificate Issued')], '0')
+
+    def test_student_and_payment_exports(self):
+        self.create_enquiry(student_name='Programming Enquiry')
+        self.create_enquiry(student_name='IELTS Enquiry', trade='ielts')
+        response, content = self.export('/api/staff/students/export/', trade='ielts')
+        self.assertEqual([row[1] for row in self.csv_rows(content)[1:]], ['IELTS Enquiry'])
+
+        registration = self.create_registration()
+        for mode in ['cash', 'upi', 'upi']:
+            PaymentTransaction.objects.create(
+                student_registration=registration, installment_number=1, amount=1000,
+                payment_mode=mode, received_by=self.staff,
+            )
+        response, content = self.export('/api/staff/registrations/payments/export/', payment_mode='upi', file_format='xlsx')
+        header, *rows = self.xlsx_rows(content)
+        self.assertEqual([row[header.index('Payment Mode')] for row in rows], ['UPI', 'UPI'])
+
+    def test_unknown_format(self):
+        response = self.client.get('/api/staff/registrations/export/', {'file_format': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'file_format must be csv or xlsx'})
+
+
+class RegistrationSearchTests(StaffTestCase):
+    """The FTS5 index follows saves and deletes and ranks the results"""
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != 'sqlite':
+            self.skipTest('The FTS5 index is SQLite only')
+
+    def search(self, query):
+        response = self.client.get('/api/staff/registrations/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['student_name'] for row in response.data['registrations']]
+
+    def test_index_follows_save_and_delete(self):
+        registration = self.create_registration(student_name='Harpreet Kaur')
+        self.assertEqual(search_registration_ids('harpr', 10), [registration.pk])
+
+        registration.student_name = 'Simran Gill'
+        registration.save()
+        self.assertEqual(search_registration_ids('harpreet', 10), [])
+        self.assertEqual(search_registration_ids('simran', 10), [registration.pk])
+
+        registration.delete()
+        self.assertEqual(search_registration_ids('simran', 10), [])
+
+    def test_better_matches_rank_first(self):
+        # Created first, so not simply the newest row
+        self.create_registration(student_name='Aman Verma', email='aman.verma@example.com')
+        self.create_registration(student_name='Ravi Kumar', father_name='Aman Singh')
+        self.assertEqual(self.search('aman'), ['Aman Verma', 'Ravi Kumar'])
+
+    def test_partial_phone_and_registration_number(self):
+        registration = self.create_registration(student_name='Phone Match', phone_no='9812343210')
+        self.create_registration(student_name='Other Student', phone_no='9000000000')
+        self.assertEqual(self.search('3210'), ['Phone Match'])
+
+        number_tail = registration.registration_number.split('/')[-1]
+        self.assertIn('Phone Match', self.search(number_tail))
+        self.assertIn('Phone Match', self.search(number_tail[1:]))
+        self.assertEqual(self.search('23432'), ['Phone Match'])
+
+    def test_number_matches_come_from_the_index(self):
+        registration = self.create_registration(phone_no='9812343210')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(search_registration_ids('3210', 10), [registration.pk])
+        # No scan of student_registrations, only the FTS table
+        tables = re.findall(r'FROM "?(\w+)', ' '.join(query['sql'] for query in queries))
+        self.assertEqual(tables, [FTS_TABLE])
+
+    def test_like_pattern_escapes_wildcards(self):
+        self.assertEqual(like_pattern('50%_off'), '%50\\%\\_off%')
+        self.assertEqual(like_pattern('a\\b'), '%a\\\\b%')
+
+    def test_missing_index_does_not_break_saves(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {FTS_TABLE}')
+        with self.assertLogs('staff_app.search', 'ERROR'):
+            registration = self.create_registration(student_name='No Index')
+        self.assertTrue(StudentRegistration.objects.filter(pk=registration.pk).exists())
+        # Searches fall back to icontains
+        self.assertEqual(self.search('no ind'), ['No Index'])
+        with self.assertLogs('staff_app.search', 'ERROR'):
+            index_registration(registration)
+
+
+class StaffAuthenticationTests(StaffTestCase):
+    """StaffJWTAuthentication keeps simplejwt's user checks"""
+
+    def get_profile(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client.get('/api/staff/profile/')
+
+    def test_deactivation_applies_to_the_next_request(self):
+        user = self.staff.user
+        self.assertEqual(self.get_profile(user).status_code, 200)
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.get_profile(user).status_code, 401)
+
+    def test_inactive_users_follow_check_user_is_active(self):
+        user = self.staff.user
+        user.is_active = False
+        user.save()
+        with mock.patch.object(api_settings, 'CHECK_USER_IS_ACTIVE', False):
+            self.assertEqual(self.get_profile(user).status_code, 200)
+
+
+class DashboardRollupTests(StaffTestCase):
+    """Signal-maintained rollups always equal a rebuild from the source tables"""
+
+    def rollup_totals(self):
+        totals = {}
+        for row in DashboardRollup.objects.all():
+            counters = {
+                'enquiries': row.enquiries,
+                'registrations': row.registrations,
+                'fee_balance': row.fee_balance,
+                'certificates_issued': row.certificates_issued,
+                'fees_collected': row.fees_collected,
+            }
+            if any(counters.values()):
+                totals[(row.branch, row.day)] = counters
+        return totals
+
+    def assertRollupsMatchRebuild(self):
+        maintained = self.rollup_totals()
+        rebuild_rollups(Student_api, StudentRegistration, PaymentTransaction, DashboardRollup)
+        self.assertEqual(maintained, self.rollup_totals())
+
+    def add_payment(self, registration, amount):
+        return PaymentTransaction.objects.create(
+            student_registration=registration,
+            installment_number=registration.payment_transactions.count() + 1,
+            amount=amount,
+            received_by=self.staff,
+        )
+
+    def test_create_update_and_delete(self):
+        self.create_enquiry()
+        registration = self.create_registration(paid_fee=5000)
+        payment = self.add_payment(registration, 2000)
+        today = timezone.localdate()
+        self.assertEqual(self.rollup_totals()[('mohali', today)], {
+            'enquiries': 1,
+            'registrations': 1,
+            'fee_balance': Decimal('10000'),
+            'certificates_issued': 0,
+            'fees_collected': Decimal('2000'),
+        })
+        self.assertRollupsMatchRebuild()
+
+        registration.paid_fee = 15000
+        registration.certificate_issued = True
+        registration.save()
+        payment.amount = 3000
+        payment.save()
+        self.assertRollupsMatchRebuild()
+
+        payment.delete()
+        self.assertRollupsMatchRebuild()
+        registration.delete()
+        self.assertRollupsMatchRebuild()
+
+    def test_branch_move_carries_payments(self):
+        registration = self.create_registration()
+        self.add_payment(registration, 4000)
+        self.add_payment(registration, 1000)
+
+        registration.branch = 'ludhiana'
+        registration.save()
+        today = timezone.localdate()
+        totals = self.rollup_totals()
+        self.assertNotIn(('mohali', today), totals)
+        self.assertEqual(totals[('ludhiana', today)]['fees_collected'], Decimal('5000'))
+        self.assertRollupsMatchRebuild()
+
+    def test_rebuild_command(self):
+        registration = self.create_registration()
+        self.add_payment(registration, 2500)
+        expected = self.rollup_totals()
+        DashboardRollup.objects.update(registrations=0, fees_collected=0)
+
+        out = io.StringIO()
+        call_command('rebuild_dashboard_rollups', stdout=out)
+        self.assertIn('Successfully rebuilt 1 dashboard rollup rows', out.getvalue())
+        self.assertEqual(self.rollup_totals(), expected)
+
+
+class FormOptionsTests(StaffTestCase):
+    """Dropdown payloads are rebuilt only when their version moves"""
+
+    def bootstrap(self, **headers):
+        return self.client.get('/api/staff/forms/bootstrap/', **headers)
+
+    def test_bootstrap_payload(self):
+        response = self.bootstrap()
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['student_options']['staff_options'], [{'id': self.staff.id, 'name': 'Test Manager'}])
+        self.assertEqual([course_type['name'] for course_type in body['registration_options']['course_types']], ['IT'])
+        self.assertEqual(
+            [course['name'] for course in body['courses_by_type'][str(self.course_type.id)]], ['Python']
+        )
+        self.assertEqual(
+            body['courses_by_type'][str(self.course_type.id)],
+            self.client.get(f'/api/staff/registrations/courses/{self.course_type.id}/').json(),
+        )
+
+    def test_etag_and_not_modified(self):
+        etag = self.bootstrap()['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bootstrap(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # The payload is not rebuilt
+        self.assertEqual(len(queries), 0)
+
+        Course.objects.create(
+            course_type=self.course_type, name='Django', duration_months='3_months',
+            duration_hours=120, course_fee=20000,
+        )
+        response = self.bootstrap(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['courses_by_type'][str(self.course_type.id)]), 2)
+
+    def test_saves_bump_the_version(self):
+        user = self.staff.user
+        for instance in [self.staff, self.course, self.course_type, user]:
+            version = form_options.get_form_options_version()
+            instance.save()
+            self.assertNotEqual(form_options.get_form_options_version(), version, instance)
+
+        user.first_name = 'Renamed'
+        user.save()
+        staff_options = self.client.get('/api/staff/students/options/').json()['staff_options']
+        self.assertEqual(staff_options, [{'id': self.staff.id, 'name': 'Renamed Manager'}])
+
+    def test_login_does_not_bump_the_version(self):
+        version = form_options.get_form_options_version()
+        update_last_login(None, self.staff.user)
+        self.assertEqual(form_options.get_form_options_version(), version)
+
+    def test_local_payloads_expire(self):
+        payload, etag = form_options.get_options('student')
+        expired = time.monotonic() + form_options.FORM_OPTIONS_LOCAL_TIMEOUT + 1
+        with mock.patch('staff_app.form_options.time.monotonic', return_value=expired):
+            rebuilt, rebuilt_etag = form_options.get_options('student')
+        self.assertIsNot(rebuilt, payload)
+        self.assertEqual((rebuilt, rebuilt_etag), (payload, etag))
+
+
+class CompressionTests(StaffTestCase):
+    """Shared option bodies are compressed once per version at the highest level"""
+
+    def setUp(self):
+        super().setUp()
+        for number in range(20):
+            Course.objects.create(
+                course_type=self.course_type, name=f'Course {number}', duration_months='3_months',
+                duration_hours=120, course_fee=15000,
+            )
+
+    def fetch(self, encoding):
+        plain = self.client.get('/api/staff/forms/bootstrap/').json()
+        with mock.patch('staff_app.compression.compress_for_cache', wraps=compression.compress_for_cache) as compress:
+            first = self.client.get('/api/staff/forms/bootstrap/', HTTP_ACCEPT_ENCODING=encoding)
+            again = self.client.get('/api/staff/forms/bootstrap/', HTTP_ACCEPT_ENCODING=encoding)
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first['Content-Encoding'], encoding)
+        self.assertEqual(again.content, first.content)
+        self.assertTrue(first['ETag'].startswith('W/'))
+        return plain, first.content
+
+    def test_gzip(self):
+        plain, content = self.fetch('gzip')
+        self.assertEqual(json.loads(gzip.decompress(content)), plain)
+
+    @skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        plain, content = self.fetch('br')
+        self.assertEqual(json.loads(compression.brotli.decompress(content)), plain)
+
+        for _ in range(10):
+            self.create_registration()
+        plain = self.client.get('/api/staff/registrations/list/').json()
+        response = self.client.get('/api/staff/registrations/list/', HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(compression.brotli.decompress(response.content)), plain)
+
+
+class FastJSONTests(StaffTestCase):
+    """FastJSONRenderer / FastJSONParser agree with DRF's stdlib classes"""
+
+    def parse(self, parser, content):
+        return parser.parse(io.BytesIO(content), parser_context={})
+
+    def test_renderers_agree_on_the_registration_list(self):
+        for number in range(3):
+            registration = self.create_registration(student_name=f'Student {number}\u2028', paid_fee=2500)
+        response = self.client.get('/api/staff/registrations/list/')
+        self.assertEqual(response.status_code, 200)
+        detail = self.client.get(f'/api/staff/registrations/{registration.pk}/').data
+        payload = {**response.data, 'detail': detail, 'ratio': 0.1}
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        # Too big for orjson: rendered by the fallback
+        self.assertEqual(FastJSONRenderer().render({'big': 2 ** 70}), JSONRenderer().render({'big': 2 ** 70}))
+
+    def test_float_differences(self):
+        # Documented in renderers.py: exponent formatting and non-finite floats
+        self.assertEqual(json.loads(FastJSONRenderer().render({'value': 1e16})), {'value': 1e16})
+        if renderers.orjson is not None:
+            self.assertEqual(FastJSONRenderer().render({'value': float('nan')}), b'{"value":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'value': float('nan')})
 
-# Create your tests here.
+    def test_parser_falls_back_to_the_stdlib(self):
+        for content in [b'{"id": 18446744073709551617}', b'{"text": "\\ud800"}', b'{"a": [1, 2.5, "x"]}']:
+            self.assertEqual(self.parse(FastJSONParser(), content), self.parse(JSONParser(), content))
+        self.assertEqual(self.parse(FastJSONParser(), b'[18446744073709551617]'), [2 ** 64 + 1])
+        for content in [b'{"a": NaN}', b'{"a": 1,}', b'']:
+            with self.assertRaises(ParseError):
+                self.parse(FastJSONParser(), content)
@@ -23,13 +23,17 @@ urlpatterns = [
     path('students/<int:student_id>/update/', views.update_student, name='update-student'),
     path('students/stats/', views.student_stats, name='student-stats'),
     path('students/options/', views.get_student_options, name='student-options'),  # New endpoint
+    path('students/export/', views.export_students, name='export-students'),
     # Student Registration
     path('registrations/options/', views.get_registration_options, name='registration-options'),
     path('registrations/courses/<int:course_type_id>/', views.get_courses_by_type, name='courses-by-type'),
+    path('forms/bootstrap/', views.get_form_bootstrap, name='form-bootstrap'),
     path('registrations/create/', views.create_student_registration, name='create-registration'),
     path('registrations/list/', views.list_student_registrations, name='list-registrations'),
     path('registrations/<int:registration_id>/', views.get_registration_detail, name='registration-detail'),
     path('registrations/search/', views.search_student_registrations, name='search-registrations'),  # NEW
+    path('registrations/export/', views.export_registrations, name='export-registrations'),
+    path('registrations/payments/export/', views.export_payments, name='export-payments'),
     # Fee Management
     path('registrations/update-fee/', views.update_student_fee, name='update-fee'),
     path('registrations/add-payment/', views.add_payment_installment, name='add-payment'),
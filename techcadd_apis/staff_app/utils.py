@@ -0,0 +1,44 @@
+# staff_app/utils.py
+from django.db import IntegrityError, transaction
+
+# Inserts retried when concurrent saves keep taking the allocated username
+USERNAME_ATTEMPTS = 5
+
+
+def allocate_username(model, student_name):
+    """
+    Pick a free username for a new Student_api / StudentRegistration row.
+    Uses the lowercased name without spaces, adding the smallest numeric
+    suffix (1, 2, ...) not yet taken. All existing usernames sharing the
+    base are fetched in a single query and the suffix is chosen in memory.
+    """
+    base_username = student_name.lower().replace(' ', '')
+    taken = set(
+        model.objects.filter(
+            username__startswith=base_username
+        ).values_list('username', flat=True)
+    )
+    username = base_username
+    counter = 1
+    while username in taken:
+        username = f"{base_username}{counter}"
+        counter += 1
+    return username
+
+
+def save_with_allocated_username(instance, save, *args, **kwargs):
+    """
+    Call save() for a new row whose username came from allocate_username().
+    A concurrent save can take the same username between the allocation
+    and the insert; the next free one is then allocated and the insert retried.
+    """
+    model = type(instance)
+    for attempt in range(USERNAME_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            taken = model.objects.filter(username=instance.username).exists()
+            if not taken or attempt + 1 == USERNAME_ATTEMPTS:
+                raise
+            instance.username = allocate_username(model, instance.student_name)
@@ -10,21 +10,24 @@ from .models import StaffProfile
 from .serializers import *
 from .models import Student_api
 from .serializers import StudentSerializer, CreateStudentSerializer, StudentListSerializer, UpdateStudentSerializer
+from .pagination import InvalidCursor, approximate_count, paginate_by_created_at, wants_all, wants_total
+from .streaming import streaming_json_response
+from .search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, search_registration_ids
+from .authentication import get_staff_profile
+from .stats import enquiry_stats
+from .conditional import etag_matches, not_modified
+from .compression import cached_json_response
+from .filters import filter_payments, filter_registrations, filter_students
+from .exports import EXPORT_FORMATS, export_response
+from .form_options import get_courses_for_type, get_options
+from .list_rows import RegistrationListRows, list_context, registration_values
+from .fieldsets import get_fieldset, narrow_queryset
+from django.utils.dateparse import parse_date
 
 # Helper functions
 def is_staff_user(user):
     """Check if user is an active staff member"""
-    try:
-        return StaffProfile.objects.filter(user=user, is_active=True).exists()
-    except:
-        return False
-
-def get_staff_profile(user):
-    """Get staff profile if user is staff"""
-    try:
-        return StaffProfile.objects.get(user=user, is_active=True)
-    except StaffProfile.DoesNotExist:
-        return None
+    return get_staff_profile(user) is not None
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -125,28 +128,34 @@ def staff_dashboard(request):
     
     # Get current month for new registrations
     from django.utils import timezone
-    from django.db.models import Sum
-    today = timezone.now()
-    first_day_of_month = today.replace(day=1)
+    from django.db.models import Q, Sum
+    first_day_of_month = timezone.localdate().replace(day=1)
+    
+    # One read over the per branch, per day rollups (see rollups.py)
+    rollups = DashboardRollup.objects.all()
+    branch = request.GET.get('branch')
+    if branch:
+        rollups = rollups.filter(branch=branch)
+    
+    totals = rollups.aggregate(
+        total_enquiries=Sum('enquiries'),
+        new_registrations=Sum('registrations', filter=Q(day__gte=first_day_of_month)),
+        pending_fees=Sum('fee_balance'),
+        certificates_generated=Sum('certificates_issued'),
+        fees_collected_this_month=Sum('fees_collected', filter=Q(day__gte=first_day_of_month)),
+    )
     
     # Total enquiries (all enquiries in the system)
-    total_enquiries = Student_api.objects.all().count()
+    total_enquiries = totals['total_enquiries'] or 0
     
     # New registrations (this month) - all registrations
-    new_registrations = StudentRegistration.objects.filter(
-        created_at__gte=first_day_of_month
-    ).count()
+    new_registrations = totals['new_registrations'] or 0
     
     # Pending fees (total due across all students)
-    pending_fees_result = StudentRegistration.objects.aggregate(
-        total_pending=Sum('fee_balance')
-    )
-    pending_fees = pending_fees_result['total_pending'] or 0
+    pending_fees = totals['pending_fees'] or 0
     
     # Certificates generated (all certificates)
-    certificates_generated = StudentRegistration.objects.filter(
-        certificate_issued=True
-    ).count()
+    certificates_generated = totals['certificates_generated'] or 0
     
     dashboard_data = {
         'welcome_message': f'Welcome, {request.user.first_name or request.user.username}!',
@@ -157,6 +166,7 @@ def staff_dashboard(request):
             'new_registrations': new_registrations,
             'pending_fees': float(pending_fees),
             'certificates_generated': certificates_generated,
+            'fees_collected_this_month': float(totals['fees_collected_this_month'] or 0),
         }
     }
     
@@ -203,7 +213,7 @@ def staff_token_refresh(request):
         user_id = refresh['user_id']
         
         # Verify user exists and is still an active staff
-        user = User.objects.get(id=user_id)
+        user = User.objects.select_related('staff_profile').get(id=user_id)
         staff_profile = get_staff_profile(user)
         
         if not staff_profile:
@@ -272,7 +282,7 @@ def create_student(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_students(request):
-    """Staff views all students (with filtering options)"""
+    """Staff views all students (with filtering options), one cursor page at a time"""
     staff_profile = get_staff_profile(request.user)
     
     if not staff_profile:
@@ -280,36 +290,48 @@ def list_students(request):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Get query parameters for filtering
-    enquiry_status = request.GET.get('enquiry_status')
-    trade = request.GET.get('trade')
-    centre = request.GET.get('centre')
-    
-    students = Student_api.objects.all()
      # ALL staff (including counselors) can see ALL enquiries
     students = Student_api.objects.all().select_related(
         'enquiry_taken_by__user', 
         'assign_enquiry__user'
     )
     
-    # Apply filters
-    if enquiry_status:
-        students = students.filter(enquiry_status=enquiry_status)
-    if trade:
-        students = students.filter(trade=trade)
-    if centre:
-        students = students.filter(centre=centre)
+    # Apply ?enquiry_status= &trade= &centre= filters
+    students = filter_students(students, request.GET)
+    
+    # ?fields= / ?exclude= narrow both the JSON and the columns read
+    fieldset = get_fieldset(request)
+    students = narrow_queryset(students, StudentListSerializer, fieldset, extra=('created_at',))
+    context = {'fieldset': fieldset}
+    
+    if wants_all(request):
+        # Every row, streamed in chunks instead of one in-memory list
+        return streaming_json_response(
+            students.order_by('-created_at', '-id'), StudentListSerializer, 'students', context=context
+        )
     
     # If staff is not manager, only show their assigned enquiries
     # if staff_profile.role not in ['manager']:
     #     students = students.filter(assign_enquiry=staff_profile)
     
-    serializer = StudentListSerializer(students, many=True)
+    try:
+        page, next_cursor = paginate_by_created_at(students, request)
+    except InvalidCursor:
+        return Response({
+            'error': 'Invalid cursor'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = StudentListSerializer(page, many=True, context=context)
     
-    return Response({
-        'count': students.count(),
+    response_data = {
+        'count': len(page),
+        'next_cursor': next_cursor,
         'students': serializer.data
-    })
+    }
+    if wants_total(request):
+        response_data['approximate_total'] = approximate_count(students)
+    
+    return Response(response_data)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_student_detail(request, student_id):
@@ -322,15 +344,18 @@ def get_student_detail(request, student_id):
         }, status=status.HTTP_403_FORBIDDEN)
     
     try:
-        student = Student_api.objects.get(id=student_id)
+        fieldset = get_fieldset(request)
+        student = narrow_queryset(
+            Student_api.objects.all(), StudentSerializer, fieldset, extra=('assign_enquiry',)
+        ).get(id=student_id)
         
         # Check if staff has permission to view this student
-        if staff_profile.role not in ['manager'] and student.assign_enquiry != staff_profile:
+        if staff_profile.role not in ['manager'] and student.assign_enquiry_id != staff_profile.id:
             return Response({
                 'error': 'Access denied. You can only view your assigned students.'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        serializer = StudentSerializer(student)
+        serializer = StudentSerializer(student, context={'fieldset': fieldset})
         return Response(serializer.data)
         
     except Student_api.DoesNotExist:
@@ -385,7 +410,7 @@ def update_student(request, student_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def student_stats(request):
-    """Get student statistics for dashboard"""
+    """Get student statistics for dashboard (optionally ?date_from=&date_to=)"""
     staff_profile = get_staff_profile(request.user)
     
     if not staff_profile:
@@ -399,29 +424,22 @@ def student_stats(request):
     else:
         students = Student_api.objects.filter(assign_enquiry=staff_profile)
     
-    total_students = students.count()
-    new_enquiries = students.filter(enquiry_status='new').count()
-    converted_students = students.filter(enquiry_status='admission_done').count()
-    
-    # Trade-wise distribution
-    trade_stats = students.values('trade').annotate(count=Count('id'))
-    
-    # Status-wise distribution
-    status_stats = students.values('enquiry_status').annotate(count=Count('id'))
-    status_counts = {}
-    for stat in status_stats:
-        status_counts[stat['enquiry_status']] = stat['count']
-    # Centre-wise distribution
-    centre_stats = students.values('centre').annotate(count=Count('id'))
-    
-    return Response({
-        'total_students': total_students,
-        'new_enquiries': new_enquiries,
-        'converted_students': converted_students,
-        'trade_distribution': list(trade_stats),
-        'status_counts': status_counts,
-        'centre_distribution': list(centre_stats)
-    })
+    # Optional enquiry date window (YYYY-MM-DD, inclusive)
+    for param, lookup in (('date_from', 'enquiry_date__gte'), ('date_to', 'enquiry_date__lte')):
+        value = request.GET.get(param)
+        if value:
+            try:
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                return Response({
+                    'error': f'{param} must be a date in YYYY-MM-DD format'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            students = students.filter(**{lookup: day})
+    
+    # Totals plus trade/status/centre distributions from one grouped query
+    return Response(enquiry_stats(students))
 
 
 # staff_app/views.py - Add this view
@@ -437,17 +455,11 @@ def get_student_options(request):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Get all staff for assign enquiry dropdown
-    staff_members = StaffProfile.objects.filter(is_active=True).select_related('user')
-    staff_options = [{'id': staff.id, 'name': staff.user.get_full_name() or staff.user.username} for staff in staff_members]
-    
-    return Response({
-        'centre_choices': Student_api.CENTRE_CHOICES,
-        'trade_choices': Student_api.TRADE_CHOICES,
-        'enquiry_source_choices': Student_api.ENQUIRY_SOURCE_CHOICES,
-        'enquiry_status_choices': Student_api.ENQUIRY_STATUS,
-        'staff_options': staff_options
-    })
+    # Built once per options version (see form_options.py)
+    options, etag = get_options('student')
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return cached_json_response(request, etag, lambda: options)
 
 # --------------------registration Views start from here --------------------
 # staff_app/views.py - Add these views
@@ -463,21 +475,10 @@ def get_registration_options(request):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    course_types = CourseType.objects.filter(is_active=True)
-    course_types_serializer = CourseTypeSerializer(course_types, many=True)
-    
-    duration_choices = []
-    for choice in Course.DURATION_CHOICES:
-        duration_choices.append({
-            'value': choice[0],
-            'label': choice[1]
-        })
-    
-    return Response({
-        'course_types': course_types_serializer.data,
-        'duration_choices': duration_choices,
-        'branch_choices': StudentRegistration.CENTRE_CHOICES
-    })
+    options, etag = get_options('registration')
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return cached_json_response(request, etag, lambda: options)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -490,12 +491,31 @@ def get_courses_by_type(request, course_type_id):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    try:
-        courses = Course.objects.filter(course_type_id=course_type_id, is_active=True)
-        serializer = CourseSerializer(courses, many=True)
-        return Response(serializer.data)
-    except Course.DoesNotExist:
-        return Response([])
+    courses, etag = get_courses_for_type(course_type_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return cached_json_response(request, etag, lambda: courses)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_form_bootstrap(request):
+    """
+    Everything the enquiry and registration forms need in one payload:
+    student options, registration options and all active courses grouped
+    by course type id
+    """
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    options, etag = get_options('bootstrap')
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return cached_json_response(request, etag, lambda: options)
 
 # @api_view(['POST'])
 # @permission_classes([IsAuthenticated])
@@ -583,7 +603,7 @@ def create_student_registration(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_student_registrations(request):
-    """List all student registrations"""
+    """List student registrations, one cursor page at a time"""
     staff_profile = get_staff_profile(request.user)
     
     if not staff_profile:
@@ -591,26 +611,40 @@ def list_student_registrations(request):
             'error': 'Access denied. Staff privileges required.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    registrations = StudentRegistration.objects.select_related(
-        'course_type', 'course', 'created_by__user'
-    ).all()
+    registrations = StudentRegistration.objects.all()
     
-    # Filter by branch if provided
-    branch = request.GET.get('branch')
-    if branch:
-        registrations = registrations.filter(branch=branch)
+    # Filter by ?branch= and ?course_type= if provided
+    registrations = filter_registrations(registrations, request.GET)
     
-    # Filter by course type if provided
-    course_type = request.GET.get('course_type')
-    if course_type:
-        registrations = registrations.filter(course_type_id=course_type)
+    # Rows are read with values() and serialized by RegistrationListRows (same JSON);
+    # ?fields= / ?exclude= narrow both the JSON and the columns read
+    fieldset = get_fieldset(request)
+    rows = registration_values(registrations, fieldset)
+    context = list_context(fieldset)
     
-    serializer = StudentRegistrationSerializer(registrations, many=True)
+    if wants_all(request):
+        return streaming_json_response(
+            rows.order_by('-created_at', '-id'), RegistrationListRows, 'registrations', context=context
+        )
     
-    return Response({
-        'count': registrations.count(),
+    try:
+        page, next_cursor = paginate_by_created_at(rows, request)
+    except InvalidCursor:
+        return Response({
+            'error': 'Invalid cursor'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = RegistrationListRows(page, many=True, context=context)
+    
+    response_data = {
+        'count': len(page),
+        'next_cursor': next_cursor,
         'registrations': serializer.data
-    })
+    }
+    if wants_total(request):
+        response_data['approximate_total'] = approximate_count(registrations)
+    
+    return Response(response_data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -624,8 +658,11 @@ def get_registration_detail(request, registration_id):
         }, status=status.HTTP_403_FORBIDDEN)
     
     try:
-        registration = StudentRegistration.objects.get(id=registration_id)
-        serializer = StudentRegistrationSerializer(registration)
+        fieldset = get_fieldset(request)
+        registration = narrow_queryset(
+            StudentRegistration.objects.all(), StudentRegistrationSerializer, fieldset
+        ).get(id=registration_id)
+        serializer = StudentRegistrationSerializer(registration, context={'fieldset': fieldset})
         return Response(serializer.data)
     except StudentRegistration.DoesNotExist:
         return Response({
@@ -635,7 +672,7 @@ def get_registration_detail(request, registration_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def search_student_registrations(request):
-    """Search student registrations - SECURE (no password)"""
+    """Search student registrations (ranked, prefix matching) - SECURE (no password)"""
     staff_profile = get_staff_profile(request.user)
     
     if not staff_profile:
@@ -649,22 +686,35 @@ def search_student_registrations(request):
             'error': 'Search query (q) parameter is required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    registrations = StudentRegistration.objects.select_related(
-        'course_type', 'course', 'created_by__user'
-    ).filter(
-        models.Q(registration_number__icontains=search_query) |
-        models.Q(student_name__icontains=search_query) |
-        models.Q(email__icontains=search_query) |
-        models.Q(phone_no__icontains=search_query) |
-        models.Q(father_name__icontains=search_query)
-    )
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        limit = DEFAULT_SEARCH_LIMIT
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    
+    fieldset = get_fieldset(request)
+    registrations = registration_values(StudentRegistration.objects.all(), fieldset)
+    
+    # Ranked ids from the search index; None means no index on this backend
+    ranked_ids = search_registration_ids(search_query, limit)
+    if ranked_ids is None:
+        registrations = list(registrations.filter(
+            models.Q(registration_number__icontains=search_query) |
+            models.Q(student_name__icontains=search_query) |
+            models.Q(email__icontains=search_query) |
+            models.Q(phone_no__icontains=search_query) |
+            models.Q(father_name__icontains=search_query)
+        )[:limit])
+    else:
+        registrations_by_id = {row['id']: row for row in registrations.filter(id__in=ranked_ids)}
+        registrations = [registrations_by_id[pk] for pk in ranked_ids if pk in registrations_by_id]
     
-    # Use secure serializer (no password)
-    serializer = StudentRegistrationSerializer(registrations, many=True)
+    # Same fields as StudentRegistrationSerializer (no password)
+    serializer = RegistrationListRows(registrations, many=True, context=list_context(fieldset))
     
     return Response({
         'search_query': search_query,
-        'count': registrations.count(),
+        'count': len(registrations),
         'registrations': serializer.data
     })
 
@@ -867,4 +917,74 @@ def add_payment_installment(request):
     except StudentRegistration.DoesNotExist:
         return Response({
             'error': 'Registration not found'
-        }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        }, status=status.HTTP_404_NOT_FOUND)
+
+
+def get_export_format(request):
+    """?file_format=csv (default) or xlsx; ?format= is taken by DRF"""
+    file_format = request.GET.get('file_format', 'csv').lower()
+    return file_format if file_format in EXPORT_FORMATS else None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_students(request):
+    """Stream all enquiries matching the list_students filters as CSV or XLSX"""
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    file_format = get_export_format(request)
+    if file_format is None:
+        return Response({
+            'error': 'file_format must be csv or xlsx'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    students = filter_students(Student_api.objects.order_by('created_at', 'id'), request.GET)
+    return export_response(students, 'students', file_format)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_registrations(request):
+    """Stream all registrations matching the list_student_registrations filters as CSV or XLSX"""
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    file_format = get_export_format(request)
+    if file_format is None:
+        return Response({
+            'error': 'file_format must be csv or xlsx'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    registrations = filter_registrations(StudentRegistration.objects.order_by('created_at', 'id'), request.GET)
+    return export_response(registrations, 'registrations', file_format)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_payments(request):
+    """Stream payment transactions (?branch= &course_type= &payment_mode=) as CSV or XLSX"""
+    staff_profile = get_staff_profile(request.user)
+    
+    if not staff_profile:
+        return Response({
+            'error': 'Access denied. Staff privileges required.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    file_format = get_export_format(request)
+    if file_format is None:
+        return Response({
+            'error': 'file_format must be csv or xlsx'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    payments = filter_payments(PaymentTransaction.objects.order_by('payment_date', 'id'), request.GET)
+    return export_response(payments, 'payments', file_format)
+
@@ -4,8 +4,26 @@ from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.conf import settings
+from django.core.cache import cache
 from staff_app.models import StudentRegistration
 import jwt
+import time
+
+STUDENT_PRINCIPAL_CACHE_TIMEOUT = getattr(settings, 'STUDENT_PRINCIPAL_CACHE_TIMEOUT', 60)
+
+
+def _principal_generation_key(student_id):
+    return f'student_principal_generation:{student_id}'
+
+
+def _principal_key(student_id, jti):
+    return f'student_principal:{student_id}:{jti}'
+
+
+def invalidate_student_principal(student_id):
+    """Drop every cached principal of a student (called when the registration changes)"""
+    cache.set(_principal_generation_key(student_id), time.time_ns(), None)
+
 
 class StudentJWTAuthentication(JWTAuthentication):
     """
@@ -41,14 +59,21 @@ class StudentJWTAuthentication(JWTAuthentication):
 
     def get_user(self, validated_token):
         """
-        Override to get student instead of Django User
+        Override to get student instead of Django User.
+        The student (with course and course_type preloaded) is cached per token jti for
+        STUDENT_PRINCIPAL_CACHE_TIMEOUT seconds, so repeat requests with the
+        same token do not touch the database.
         """
         try:
             student_id = validated_token.get('student_id')
             if student_id is None:
                 raise AuthenticationFailed('Token contained no recognizable student identification')
             
-            student = StudentRegistration.objects.get(id=student_id)
+            jti = validated_token.get('jti')
+            if jti is None:
+                student = StudentRegistration.objects.select_related('course', 'course_type').get(id=student_id)
+            else:
+                student = self.get_cached_student(student_id, jti)
             
             # Add a flag to identify this as a student
             student.is_authenticated = True
@@ -59,3 +84,23 @@ class StudentJWTAuthentication(JWTAuthentication):
             raise AuthenticationFailed('Student not found')
         except KeyError:
             raise AuthenticationFailed('Token contained no recognizable student identification')
+
+    def get_cached_student(self, student_id, jti):
+        generation_key = _principal_generation_key(student_id)
+        principal_key = _principal_key(student_id, jti)
+        cached = cache.get_many([generation_key, principal_key])
+        generation = cached.get(generation_key)
+        if generation is None:
+            # Start from the clock so a lost generation never revives old entries
+            generation = time.time_ns()
+            cache.add(generation_key, generation, None)
+            generation = cache.get(generation_key, generation)
+        
+        # Entries written before the last invalidation are ignored
+        entry = cached.get(principal_key)
+        if entry is not None and entry[0] == generation:
+            return entry[1]
+        
+        student = StudentRegistration.objects.select_related('course', 'course_type').get(id=student_id)
+        cache.set(principal_key, (generation, student), STUDENT_PRINCIPAL_CACHE_TIMEOUT)
+        return student
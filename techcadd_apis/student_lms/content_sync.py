@@ -0,0 +1,116 @@
+# student_lms/content_sync.py
+"""
+Delta sync of a course's modules and lessons for the mobile apps.
+
+The client keeps the tree from my_course_detail together with the
+next_cursor of its last sync and asks for my-course/changes/?since=.
+The answer holds the modules and lessons added or edited since then and
+the ids of those removed: deactivated rows (is_active=False) and rows
+deleted outright, which leave a CourseContentTombstone behind.
+
+The cursor encodes the sync time and the course it belongs to; a cursor
+for another course (the student switched course) gets a full snapshot
+with "reset": true, as does a request without ?since=.
+"""
+import base64
+import binascii
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from staff_app.pagination import InvalidCursor
+
+# Rows are stamped with updated_at before their transaction commits, so a
+# write can become visible slightly after a sync already passed its
+# timestamp. Cursors point this far back; re-sent rows are harmless.
+SYNC_CURSOR_OVERLAP = datetime.timedelta(seconds=30)
+
+
+def encode_sync_cursor(synced_at, scope_id):
+    """Opaque token for a sync time within a scope (a course, or a student for notes)"""
+    raw = f"{synced_at.isoformat()}|{scope_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_sync_cursor(token):
+    """Decode a token produced by encode_sync_cursor back to (synced_at, scope_id)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        synced_at, scope_id = raw.rsplit('|', 1)
+        synced_at = parse_datetime(synced_at)
+        scope_id = int(scope_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+    if synced_at is None:
+        raise InvalidCursor('Invalid cursor')
+    return synced_at, scope_id
+
+
+def record_tombstone(instance):
+    """post_delete on CourseModule / Lesson: remember the id for delta sync"""
+    from .models import CourseContentTombstone, CourseModule, Lesson
+
+    if isinstance(instance, Lesson):
+        course_id = CourseModule.objects.filter(
+            id=instance.module_id
+        ).values_list('course_id', flat=True).first()
+        object_type = 'lesson'
+    else:
+        course_id = instance.course_id
+        object_type = 'module'
+    if course_id is not None:
+        CourseContentTombstone.objects.create(
+            course_id=course_id,
+            object_type=object_type,
+            object_id=instance.id,
+        )
+
+
+def get_course_changes(course_id, since, context):
+    """
+    Modules and lessons of a course changed after since (None for everything).
+    Lessons of a changed module are always sent in full, so a module that is
+    reactivated comes back with its lessons.
+    """
+    from .models import CourseContentTombstone, CourseModule, Lesson
+    from .serializers import LessonChangeSerializer, ModuleChangeSerializer
+
+    modules = CourseModule.objects.filter(course_id=course_id)
+    if since is not None:
+        modules = modules.filter(updated_at__gt=since)
+    modules = list(modules.order_by('order', 'id'))
+    active_module_ids = [module.id for module in modules if module.is_active]
+
+    lessons = Lesson.objects.filter(module__course_id=course_id, module__is_active=True)
+    if since is not None:
+        lessons = lessons.filter(updated_at__gt=since) | lessons.filter(module_id__in=active_module_ids)
+    lessons = list(lessons.order_by('module_id', 'order', 'id'))
+
+    removed_modules = [module.id for module in modules if not module.is_active]
+    removed_lessons = [lesson.id for lesson in lessons if not lesson.is_active]
+    if since is not None:
+        for object_type, object_id in CourseContentTombstone.objects.filter(
+            course_id=course_id,
+            deleted_at__gt=since,
+        ).values_list('object_type', 'object_id'):
+            (removed_modules if object_type == 'module' else removed_lessons).append(object_id)
+
+    return {
+        'modules': ModuleChangeSerializer(
+            [module for module in modules if module.is_active], many=True
+        ).data,
+        'lessons': LessonChangeSerializer(
+            [lesson for lesson in lessons if lesson.is_active], many=True, context=context
+        ).data,
+        'removed': {
+            'modules': sorted(set(removed_modules)),
+            'lessons': sorted(set(removed_lessons)),
+        },
+    }
+
+
+def next_sync_cursor(scope_id):
+    """Cursor to hand out with a response built from data read after this call"""
+    return encode_sync_cursor(timezone.now() - SYNC_CURSOR_OVERLAP, scope_id)
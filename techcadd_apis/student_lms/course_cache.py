@@ -0,0 +1,133 @@
+# student_lms/course_cache.py
+"""
+Two-layer cache for the course curriculum tree.
+
+Every student of a course sees the same modules and lessons, so the
+serialized tree (without progress) is cached per course and version:
+
+1. a process-local dict, checked first and free to read, whose entries
+   expire after COURSE_TREE_LOCAL_TIMEOUT seconds;
+2. the shared Django cache, so workers build each version only once.
+
+The version lives in the shared cache and is bumped by the CourseModule,
+Lesson and Course signals in models.py. Every read checks it, so a bump
+made by any worker makes both layers miss in all of them. A bump writes
+a new clock value (incr is not atomic across processes).
+Per-student progress is overlaid on a copy of the tree on each request.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+COURSE_TREE_CACHE_TIMEOUT = getattr(settings, 'COURSE_TREE_CACHE_TIMEOUT', 60 * 60 * 6)
+COURSE_TREE_LOCAL_TIMEOUT = getattr(settings, 'COURSE_TREE_LOCAL_TIMEOUT', 60)
+
+_local_trees = {}
+_local_lock = threading.Lock()
+
+
+def _version_key(course_id):
+    return f'course_tree_version:{course_id}'
+
+
+def _tree_key(course_id, version):
+    return f'course_tree:{course_id}:v{version}'
+
+
+def get_course_tree_version(course_id):
+    version = cache.get(_version_key(course_id))
+    if version is None:
+        # Start from the clock so a lost version key never resurrects an old tree
+        version = time.time_ns()
+        cache.add(_version_key(course_id), version, None)
+        version = cache.get(_version_key(course_id), version)
+    return version
+
+
+def bump_course_tree_version(course_id):
+    """Invalidate every cached tree of a course"""
+    cache.set(_version_key(course_id), time.time_ns(), None)
+
+
+def build_course_tree(course_id):
+    """Serialize a course with all active modules and lessons, progress left blank"""
+    from staff_app.models import Course
+    from .serializers import CourseDetailSerializer
+
+    course = Course.objects.get(id=course_id)
+    # No request in the context: progress fields come out empty
+    return CourseDetailSerializer(course, context={}).data
+
+
+def get_course_tree(course_id):
+    """Shared course tree, served from process memory when the version matches"""
+    version = get_course_tree_version(course_id)
+
+    now = time.monotonic()
+    local = _local_trees.get(course_id)
+    if local is not None and local[0] == version and local[2] > now:
+        return local[1]
+
+    tree = cache.get(_tree_key(course_id, version))
+    if tree is None:
+        tree = build_course_tree(course_id)
+        cache.set(_tree_key(course_id, version), tree, COURSE_TREE_CACHE_TIMEOUT)
+
+    with _local_lock:
+        # Drop expired trees so courses nobody reads do not stay in memory
+        for expired_id in [key for key, entry in _local_trees.items() if entry[2] <= now]:
+            del _local_trees[expired_id]
+        _local_trees[course_id] = (version, tree, now + COURSE_TREE_LOCAL_TIMEOUT)
+    return tree
+
+
+def get_course_lesson_total(course_id):
+    """Number of active lessons in a course, read from the cached tree"""
+    return sum(module['total_lessons'] for module in get_course_tree(course_id)['modules'])
+
+
+def apply_progress_overlay(tree, progress_map):
+    """
+    Return a copy of a cached course tree with the student's progress filled in.
+    The cached tree itself is never modified.
+    """
+    total_lessons = 0
+    completed_lessons = 0
+    modules = []
+    for module in tree['modules']:
+        lessons = []
+        module_completed = 0
+        for lesson in module['lessons']:
+            progress = progress_map.get(lesson['id'])
+            is_completed = progress is not None and progress.status == 'completed'
+            lessons.append({
+                **lesson,
+                'is_completed': is_completed,
+                'progress_percentage': float(progress.completion_percentage) if progress else 0.0,
+            })
+            if is_completed:
+                module_completed += 1
+        total_lessons += len(lessons)
+        completed_lessons += module_completed
+        modules.append({
+            **module,
+            'completed_lessons': module_completed,
+            'lessons': lessons,
+        })
+
+    if total_lessons:
+        progress_percentage = round((completed_lessons / total_lessons) * 100, 2)
+    else:
+        progress_percentage = 0.0
+
+    return {
+        **tree,
+        'course_progress': {
+            'total_lessons': total_lessons,
+            'completed_lessons': completed_lessons,
+            'progress_percentage': progress_percentage,
+        },
+        'modules': modules,
+    }
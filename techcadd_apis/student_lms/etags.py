@@ -0,0 +1,49 @@
+# student_lms/etags.py
+"""
+Conditional GET for the LMS read endpoints.
+
+An ETag is a hash of version numbers that change whenever the response
+would: the course tree version (course_cache.py, bumped by curriculum
+signals) and a per-student version bumped by every write to the
+student's progress, notes or registration. Both live in the shared
+cache (see CACHES in settings), so a bump made by one worker is seen by
+all of them, and a request with a matching If-None-Match gets 304 Not
+Modified without a database query or any serialization.
+
+A bump writes a new clock value rather than incrementing: incr is not
+atomic across processes on the file backend, and two concurrent bumps
+must never end on a version a client has already seen. A version lost
+from the cache restarts from the clock, which only costs clients one
+full response.
+"""
+import time
+
+from django.core.cache import cache
+
+from staff_app.conditional import make_etag
+
+
+def _student_version_key(student_id):
+    return f'student_version:{student_id}'
+
+
+def get_student_version(student_id):
+    version = cache.get(_student_version_key(student_id))
+    if version is None:
+        version = time.time_ns()
+        cache.add(_student_version_key(student_id), version, None)
+        version = cache.get(_student_version_key(student_id), version)
+    return version
+
+
+def bump_student_version(student_id):
+    """Mark everything the LMS shows for a student as changed"""
+    cache.set(_student_version_key(student_id), time.time_ns(), None)
+
+
+def student_etag(student, *parts):
+    """ETag for a view of the student's course, student data and extra parts"""
+    from .course_cache import get_course_tree_version
+
+    course_version = get_course_tree_version(student.course_id) if student.course_id else 0
+    return make_etag(student.id, student.course_id, course_version, get_student_version(student.id), *parts)
@@ -0,0 +1,18 @@
+# student_lms/management/commands/rebuild_progress_counters.py
+#  python manage.py rebuild_progress_counters [--student 12 --student 40]
+from django.core.management.base import BaseCommand
+from student_lms.models import StudentCourseProgress, StudentModuleProgress, StudentProgress
+from student_lms.progress_counters import rebuild_progress_counters
+
+class Command(BaseCommand):
+    help = 'Recompute the per course and per module completed-lesson counters from StudentProgress'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', action='append', type=int, dest='student_ids',
+                            help='Only reconcile this student id (repeatable)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_progress_counters(
+            StudentProgress, StudentCourseProgress, StudentModuleProgress, options['student_ids']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {rows} module progress counters'))
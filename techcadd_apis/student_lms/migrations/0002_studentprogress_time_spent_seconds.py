@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:33
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_seconds(apps, schema_editor):
+    StudentProgress = apps.get_model('student_lms', 'StudentProgress')
+    StudentProgress.objects.update(time_spent_seconds=F('time_spent_minutes') * 60)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_lms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprogress',
+            name='time_spent_seconds',
+            field=models.PositiveIntegerField(default=0, help_text='Exact watch time; time_spent_minutes is derived from it by heartbeats'),
+        ),
+        migrations.RunPython(backfill_seconds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0013_registration_sequences'),
+        ('student_lms', '0002_studentprogress_time_spent_seconds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressDeviceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(blank=True, max_length=64)),
+                ('last_seq', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_device_sequences', to='student_lms.lesson')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_device_sequences', to='staff_app.studentregistration')),
+            ],
+            options={
+                'verbose_name': 'Progress Device Sequence',
+                'verbose_name_plural': 'Progress Device Sequences',
+                'unique_together': {('student', 'lesson', 'device_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from student_lms.progress_counters import rebuild_progress_counters
+
+
+def backfill_counters(apps, schema_editor):
+    rebuild_progress_counters(
+        apps.get_model('student_lms', 'StudentProgress'),
+        apps.get_model('student_lms', 'StudentCourseProgress'),
+        apps.get_model('student_lms', 'StudentModuleProgress'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0013_registration_sequences'),
+        ('student_lms', '0003_progressdevicesequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentModuleProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_lessons', models.IntegerField(default=0)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_progress_counters', to='student_lms.coursemodule')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='module_progress_counters', to='staff_app.studentregistration')),
+            ],
+            options={
+                'verbose_name': 'Student Module Progress',
+                'verbose_name_plural': 'Student Module Progress',
+                'unique_together': {('student', 'module')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentCourseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_lessons', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_progress_counters', to='staff_app.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_progress_counters', to='staff_app.studentregistration')),
+            ],
+            options={
+                'verbose_name': 'Student Course Progress',
+                'verbose_name_plural': 'Student Course Progress',
+                'unique_together': {('student', 'course')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_lms', '0004_progress_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseContentTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course_id', models.PositiveIntegerField()),
+                ('object_type', models.CharField(choices=[('module', 'Module'), ('lesson', 'Lesson')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Course Content Tombstone',
+                'verbose_name_plural': 'Course Content Tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='coursemodule',
+            index=models.Index(fields=['course', 'updated_at'], name='course_modules_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['module', 'updated_at'], name='lessons_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursecontenttombstone',
+            index=models.Index(fields=['course_id', 'deleted_at'], name='content_tombstones_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_app', '0013_registration_sequences'),
+        ('student_lms', '0005_content_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentnote',
+            name='client_id',
+            field=models.UUIDField(blank=True, help_text='Id generated by the app, for notes taken offline', null=True),
+        ),
+        migrations.AddField(
+            model_name='studentnote',
+            name='client_updated_at',
+            field=models.DateTimeField(blank=True, help_text='Last edit time reported by the app; the latest edit wins', null=True),
+        ),
+        migrations.AddField(
+            model_name='studentnote',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, help_text='Set instead of deleting, so other devices learn about it', null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='studentnote',
+            unique_together={('student', 'client_id')},
+        ),
+        migrations.AddIndex(
+            model_name='studentnote',
+            index=models.Index(fields=['student', 'updated_at'], name='student_notes_sync_idx'),
+        ),
+    ]
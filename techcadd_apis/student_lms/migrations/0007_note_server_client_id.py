@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:13
+
+from django.db import migrations, models
+import uuid
+
+
+def backfill_client_ids(apps, schema_editor):
+    # Notes created online before the default existed
+    StudentNote = apps.get_model('student_lms', 'StudentNote')
+    notes = list(StudentNote.objects.filter(client_id__isnull=True).only('id'))
+    for note in notes:
+        note.client_id = uuid.uuid4()
+    StudentNote.objects.bulk_update(notes, ['client_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_lms', '0006_note_sync'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentnote',
+            name='client_id',
+            field=models.UUIDField(blank=True, default=uuid.uuid4, help_text='Id generated by the app for notes taken offline, else by the server', null=True),
+        ),
+        migrations.RunPython(backfill_client_ids, migrations.RunPython.noop),
+    ]
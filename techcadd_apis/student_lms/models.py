@@ -2,7 +2,11 @@ from django.db import models
 
 # Create your models here.
 # student_lms/models.py
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from staff_app.models import Course, StudentRegistration
 
 class CourseModule(models.Model):
@@ -21,6 +25,10 @@ class CourseModule(models.Model):
         ordering = ['order', 'id']
         verbose_name = 'Course Module'
         verbose_name_plural = 'Course Modules'
+        indexes = [
+            # Delta sync: modules of a course changed since a cursor
+            models.Index(fields=['course', 'updated_at'], name='course_modules_sync_idx'),
+        ]
     
     def __str__(self):
         return f"{self.course.name} - {self.title}"
@@ -62,11 +70,41 @@ class Lesson(models.Model):
         ordering = ['order', 'id']
         verbose_name = 'Lesson'
         verbose_name_plural = 'Lessons'
+        indexes = [
+            models.Index(fields=['module', 'updated_at'], name='lessons_sync_idx'),
+        ]
     
     def __str__(self):
         return f"{self.module.title} - {self.title}"
 
 
+class CourseContentTombstone(models.Model):
+    """
+    Id of a module or lesson deleted from a course, so delta sync
+    (content_sync.py) can tell clients to drop it. course_id is a plain
+    column: the tombstone must survive the course's own deletion cascade.
+    """
+    OBJECT_TYPES = (
+        ('module', 'Module'),
+        ('lesson', 'Lesson'),
+    )
+    
+    course_id = models.PositiveIntegerField()
+    object_type = models.CharField(max_length=10, choices=OBJECT_TYPES)
+    object_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['course_id', 'deleted_at'], name='content_tombstones_sync_idx'),
+        ]
+        verbose_name = 'Course Content Tombstone'
+        verbose_name_plural = 'Course Content Tombstones'
+    
+    def __str__(self):
+        return f"{self.object_type} {self.object_id} (course {self.course_id})"
+
+
 class StudentProgress(models.Model):
     """
     Track student's progress through lessons
@@ -83,6 +121,7 @@ class StudentProgress(models.Model):
     
     # Progress tracking
     time_spent_minutes = models.PositiveIntegerField(default=0)
+    time_spent_seconds = models.PositiveIntegerField(default=0, help_text="Exact watch time; time_spent_minutes is derived from it by heartbeats")
     completion_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
     last_accessed = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(blank=True, null=True)
@@ -97,6 +136,68 @@ class StudentProgress(models.Model):
     
     def __str__(self):
         return f"{self.student.student_name} - {self.lesson.title} ({self.status})"
+    
+    def save(self, *args, **kwargs):
+        # Atomic so the completion counters (post_save) commit with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class StudentCourseProgress(models.Model):
+    """
+    Completed lessons per student and course.
+    Maintained on every completion (see progress_counters.py);
+    rebuild with: python manage.py rebuild_progress_counters
+    """
+    student = models.ForeignKey(StudentRegistration, on_delete=models.CASCADE, related_name='course_progress_counters')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='student_progress_counters')
+    completed_lessons = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('student', 'course')
+        verbose_name = 'Student Course Progress'
+        verbose_name_plural = 'Student Course Progress'
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.course_id}: {self.completed_lessons}"
+
+
+class StudentModuleProgress(models.Model):
+    """
+    Completed lessons per student and module (see StudentCourseProgress)
+    """
+    student = models.ForeignKey(StudentRegistration, on_delete=models.CASCADE, related_name='module_progress_counters')
+    module = models.ForeignKey(CourseModule, on_delete=models.CASCADE, related_name='student_progress_counters')
+    completed_lessons = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('student', 'module')
+        verbose_name = 'Student Module Progress'
+        verbose_name_plural = 'Student Module Progress'
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.module_id}: {self.completed_lessons}"
+
+
+class ProgressDeviceSequence(models.Model):
+    """
+    Highest heartbeat sequence number applied per student, lesson and device.
+    Lets update_lesson_progress and update_progress_batch drop retried or
+    out-of-order heartbeats (see progress.claim_sequence).
+    """
+    student = models.ForeignKey(StudentRegistration, on_delete=models.CASCADE, related_name='progress_device_sequences')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='progress_device_sequences')
+    device_id = models.CharField(max_length=64, blank=True)
+    last_seq = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('student', 'lesson', 'device_id')
+        verbose_name = 'Progress Device Sequence'
+        verbose_name_plural = 'Progress Device Sequences'
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.lesson_id} - {self.device_id or 'default'} #{self.last_seq}"
 
 
 class StudentNote(models.Model):
@@ -108,13 +209,115 @@ class StudentNote(models.Model):
     note_text = models.TextField()
     timestamp_seconds = models.PositiveIntegerField(default=0, help_text="Time in lesson when note was taken")
     
+    # Offline sync (see note_sync.py)
+    client_id = models.UUIDField(default=uuid.uuid4, blank=True, null=True, help_text="Id generated by the app for notes taken offline, else by the server")
+    client_updated_at = models.DateTimeField(blank=True, null=True, help_text="Last edit time reported by the app; the latest edit wins")
+    deleted_at = models.DateTimeField(blank=True, null=True, help_text="Set instead of deleting, so other devices learn about it")
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        unique_together = ('student', 'client_id')
+        indexes = [
+            models.Index(fields=['student', 'updated_at'], name='student_notes_sync_idx'),
+        ]
         verbose_name = 'Student Note'
         verbose_name_plural = 'Student Notes'
     
     def __str__(self):
-        return f"{self.student.student_name} - {self.lesson.title}"
\ No newline at end of file
+        return f"{self.student.student_name} - {self.lesson.title}"
+
+
+# Invalidate the cached course tree (see course_cache.py) on curriculum changes
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_tree_for_course(sender, instance, **kwargs):
+    from .course_cache import bump_course_tree_version
+    bump_course_tree_version(instance.id)
+
+
+@receiver(post_save, sender=CourseModule)
+@receiver(post_delete, sender=CourseModule)
+def invalidate_course_tree_for_module(sender, instance, **kwargs):
+    from .course_cache import bump_course_tree_version
+    bump_course_tree_version(instance.course_id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_course_tree_for_lesson(sender, instance, **kwargs):
+    from .course_cache import bump_course_tree_version
+    course_id = CourseModule.objects.filter(
+        id=instance.module_id
+    ).values_list('course_id', flat=True).first()
+    if course_id is not None:
+        bump_course_tree_version(course_id)
+
+
+# Leave a tombstone for delta sync when curriculum rows are deleted
+@receiver(post_delete, sender=CourseModule)
+@receiver(post_delete, sender=Lesson)
+def record_content_tombstone(sender, instance, **kwargs):
+    from .content_sync import record_tombstone
+    record_tombstone(instance)
+
+
+# Drop cached authentication principals when a registration changes
+@receiver(post_save, sender=StudentRegistration)
+@receiver(post_delete, sender=StudentRegistration)
+def invalidate_student_principal_cache(sender, instance, **kwargs):
+    from .authentication import invalidate_student_principal
+    invalidate_student_principal(instance.id)
+
+
+# Keep completion counters in step with StudentProgress
+@receiver(pre_save, sender=StudentProgress)
+def remember_progress_status(sender, instance, **kwargs):
+    from .progress_counters import remember_previous_status
+    remember_previous_status(instance)
+
+
+@receiver(post_save, sender=StudentProgress)
+def update_progress_counters(sender, instance, **kwargs):
+    from .progress_counters import record_save
+    record_save(instance)
+
+
+@receiver(post_delete, sender=StudentProgress)
+def remove_progress_counters(sender, instance, **kwargs):
+    from .progress_counters import record_delete
+    record_delete(instance)
+
+
+# Bump the student's version (see etags.py): it validates ETags and the
+# cached dashboard summary. Curriculum changes bump the course tree version.
+@receiver(post_save, sender=StudentProgress)
+@receiver(post_delete, sender=StudentProgress)
+@receiver(post_save, sender=StudentNote)
+@receiver(post_delete, sender=StudentNote)
+def bump_student_version_for_row(sender, instance, **kwargs):
+    from .etags import bump_student_version
+    bump_student_version(instance.student_id)
+
+
+@receiver(post_save, sender=StudentRegistration)
+@receiver(post_delete, sender=StudentRegistration)
+def bump_student_version_for_registration(sender, instance, **kwargs):
+    from .etags import bump_student_version
+    bump_student_version(instance.id)
+
+
+@receiver(pre_save, sender=CourseModule)
+@receiver(pre_save, sender=Lesson)
+def remember_counted_curriculum(sender, instance, **kwargs):
+    from .progress_counters import remember_curriculum_state
+    remember_curriculum_state(instance)
+
+
+@receiver(post_save, sender=CourseModule)
+@receiver(post_save, sender=Lesson)
+def recount_progress_for_curriculum(sender, instance, **kwargs):
+    from .progress_counters import record_curriculum_change
+    record_curriculum_change(instance)
@@ -0,0 +1,137 @@
+# student_lms/note_sync.py
+"""
+Offline sync of StudentNote.
+
+The app keeps notes locally, each with a client_id (UUID it generates)
+and the time it was last edited on the device. A sync posts every local
+change since the previous sync plus that sync's cursor:
+
+    {"since": "<next_cursor>", "changes": [
+        {"client_id": "…", "lesson": 12, "note_text": "…",
+         "timestamp_seconds": 95, "updated_at": "2026-10-18T09:15:00Z",
+         "deleted": false}]}
+
+A change is applied when it is newer than what the server holds for
+that client_id (last write wins on the device edit time), so replays and
+stale devices never overwrite newer text. Deletes are kept as rows with
+deleted_at set and returned to other devices as tombstones. Everything is
+written in one transaction with one bulk_create and one bulk_update.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .content_sync import next_sync_cursor
+from .etags import bump_student_version
+from .models import StudentNote
+from .progress import get_allowed_lesson_ids
+
+MAX_NOTE_CHANGES = 500
+
+
+def latest_changes(changes):
+    """Keep only the newest change per client_id"""
+    latest = {}
+    for change in changes:
+        current = latest.get(change['client_id'])
+        if current is None or change['updated_at'] > current['updated_at']:
+            latest[change['client_id']] = change
+    return latest
+
+
+def apply_note_changes(student, changes):
+    """
+    Apply validated changes for a student.
+    Returns (applied client_ids, client_ids rejected for lessons outside the course).
+    """
+    latest = latest_changes(changes)
+    allowed_lesson_ids = get_allowed_lesson_ids(
+        student, {change['lesson'] for change in latest.values() if change.get('lesson')}
+    )
+    now = timezone.now()
+    applied = []
+    rejected = []
+
+    with transaction.atomic():
+        existing = {
+            note.client_id: note
+            for note in StudentNote.objects.select_for_update().filter(
+                student=student,
+                client_id__in=latest.keys(),
+            )
+        }
+        to_create = []
+        to_update = []
+        for client_id, change in latest.items():
+            note = existing.get(client_id)
+            if note is None:
+                if change.get('deleted'):
+                    # Created and deleted offline: nothing to keep
+                    continue
+                if change.get('lesson') not in allowed_lesson_ids:
+                    rejected.append(client_id)
+                    continue
+                to_create.append(StudentNote(
+                    student=student,
+                    lesson_id=change['lesson'],
+                    client_id=client_id,
+                    note_text=change.get('note_text', ''),
+                    timestamp_seconds=change.get('timestamp_seconds', 0),
+                    client_updated_at=change['updated_at'],
+                ))
+            elif note.client_updated_at is None or change['updated_at'] > note.client_updated_at:
+                if change.get('deleted'):
+                    note.deleted_at = note.deleted_at or now
+                else:
+                    note.note_text = change.get('note_text', note.note_text)
+                    note.timestamp_seconds = change.get('timestamp_seconds', note.timestamp_seconds)
+                    note.deleted_at = None
+                note.client_updated_at = change['updated_at']
+                # bulk_update() skips auto_now, and the changes feed depends on it
+                note.updated_at = now
+                to_update.append(note)
+            else:
+                # The server copy is newer; it is sent back with the changes
+                continue
+            applied.append(client_id)
+
+        if to_create:
+            StudentNote.objects.bulk_create(to_create)
+        if to_update:
+            StudentNote.objects.bulk_update(to_update, [
+                'note_text', 'timestamp_seconds', 'client_updated_at', 'deleted_at', 'updated_at',
+            ])
+    if applied:
+        bump_student_version(student.id)
+
+    return applied, rejected
+
+
+def get_note_changes(student, since):
+    """Notes changed after since (None for all live notes) and tombstones of deleted ones"""
+    notes = StudentNote.objects.filter(student=student)
+    if since is None:
+        notes = notes.filter(deleted_at__isnull=True)
+    else:
+        notes = notes.filter(updated_at__gt=since)
+    changed = []
+    deleted = []
+    for note in notes.order_by('updated_at', 'id'):
+        if note.deleted_at:
+            deleted.append({'id': note.id, 'client_id': note.client_id})
+        else:
+            changed.append(note)
+    return changed, deleted
+
+
+def sync_notes(student, changes, since):
+    """Apply a sync request; returns the parts of the response"""
+    next_cursor = next_sync_cursor(student.id)
+    applied, rejected = apply_note_changes(student, changes)
+    changed, deleted = get_note_changes(student, since)
+    return {
+        'applied_client_ids': applied,
+        'rejected_client_ids': rejected,
+        'notes': changed,
+        'deleted': deleted,
+        'next_cursor': next_cursor,
+    }
@@ -0,0 +1,309 @@
+# student_lms/progress.py
+"""
+Batched progress heartbeats from the LMS player.
+
+The player queues one event per tick:
+    {"lesson_id": 12, "time_spent_delta_seconds": 5,
+     "completion_percentage": 42.5, "status": "in_progress",
+     "device_id": "a1b2", "seq": 118}
+and posts them in batches. Events at or below the seq already applied for
+their lesson and device (ProgressDeviceSequence) are dropped, so a retried
+batch is not counted twice. Events are merged per lesson in memory and the
+merged result is written with one bulk_update, after an insert-or-ignore
+for lessons the student has not opened before (usually via
+progress_buffer.py).
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Lesson, ProgressDeviceSequence, StudentProgress
+from .progress_counters import record_completions
+from .etags import bump_student_version
+
+MAX_BATCH_EVENTS = 500
+
+
+class MergedProgress:
+    """Everything a batch says about one lesson"""
+
+    def __init__(self, lesson_id):
+        self.lesson_id = lesson_id
+        self.time_spent_seconds = 0
+        self.completion_percentage = None
+        self.completed = False
+        self.last_seq = None
+        self.seen_seqs = set()
+
+    def add(self, event):
+        seq = event.get('seq')
+        if seq is not None:
+            key = (event.get('device_id', ''), seq)
+            if key in self.seen_seqs:
+                # Duplicate of an event already in this batch (client retry)
+                return
+            self.seen_seqs.add(key)
+
+        self.time_spent_seconds += event.get('time_spent_delta_seconds', 0)
+        if event.get('status') == 'completed':
+            self.completed = True
+
+        percentage = event.get('completion_percentage')
+        if percentage is not None:
+            # The newest event (highest seq, else the latest in the list) wins
+            if seq is None or self.last_seq is None or seq >= self.last_seq:
+                self.completion_percentage = percentage
+        if seq is not None and (self.last_seq is None or seq > self.last_seq):
+            self.last_seq = seq
+
+    def merge(self, other):
+        """Fold a later MergedProgress for the same lesson into this one"""
+        self.time_spent_seconds += other.time_spent_seconds
+        self.completed = self.completed or other.completed
+        if other.completion_percentage is not None:
+            if other.last_seq is None or self.last_seq is None or other.last_seq >= self.last_seq:
+                self.completion_percentage = other.completion_percentage
+        if other.last_seq is not None and (self.last_seq is None or other.last_seq > self.last_seq):
+            self.last_seq = other.last_seq
+        self.seen_seqs |= other.seen_seqs
+
+    def to_entry(self):
+        """Plain JSON-serializable dict, as stored by progress buffer backends"""
+        percentage = self.completion_percentage
+        return {
+            'time_spent_seconds': self.time_spent_seconds,
+            'completion_percentage': None if percentage is None else str(percentage),
+            'completed': self.completed,
+            'last_seq': self.last_seq,
+        }
+
+    @classmethod
+    def from_entry(cls, lesson_id, entry):
+        update = cls(lesson_id)
+        update.time_spent_seconds = entry['time_spent_seconds']
+        percentage = entry['completion_percentage']
+        update.completion_percentage = None if percentage is None else Decimal(percentage)
+        update.completed = entry['completed']
+        update.last_seq = entry['last_seq']
+        return update
+
+
+def merge_progress_events(events):
+    """Fold validated events into one MergedProgress per lesson"""
+    merged = {}
+    for event in events:
+        lesson_id = event['lesson_id']
+        if lesson_id not in merged:
+            merged[lesson_id] = MergedProgress(lesson_id)
+        merged[lesson_id].add(event)
+    return merged
+
+
+def apply_merged_progress(progress, update, now):
+    """Apply one lesson's merged update to a StudentProgress instance in memory"""
+    progress.time_spent_seconds += update.time_spent_seconds
+    progress.time_spent_minutes = progress.time_spent_seconds // 60
+    if update.completion_percentage is not None and progress.status != 'completed':
+        progress.completion_percentage = update.completion_percentage
+    if update.completed:
+        progress.status = 'completed'
+        progress.completion_percentage = Decimal('100.00')
+        if not progress.completed_at:
+            progress.completed_at = now
+    elif progress.status == 'not_started':
+        progress.status = 'in_progress'
+    progress.last_accessed = now
+    progress.updated_at = now
+
+
+def get_allowed_lesson_ids(student, lesson_ids):
+    """Subset of lesson_ids that are active lessons of the student's course"""
+    return set(
+        Lesson.objects.filter(
+            id__in=lesson_ids,
+            is_active=True,
+            module__course_id=student.course_id,
+        ).values_list('id', flat=True)
+    )
+
+
+def write_merged_progress(student_id, merged):
+    """
+    Write merged updates (lesson_id -> MergedProgress) for one student in
+    one transaction. Returns the StudentProgress rows written.
+    """
+    if not merged:
+        return []
+    now = timezone.now()
+
+    with transaction.atomic():
+        rows = StudentProgress.objects.select_for_update().filter(student_id=student_id)
+        existing = {progress.lesson_id: progress for progress in rows.filter(lesson_id__in=merged.keys())}
+        missing = [lesson_id for lesson_id in merged if lesson_id not in existing]
+        if missing:
+            # Insert-or-ignore, then lock: a row a concurrent request created
+            # meanwhile is merged into, never overwritten
+            StudentProgress.objects.bulk_create(
+                [StudentProgress(student_id=student_id, lesson_id=lesson_id) for lesson_id in missing],
+                ignore_conflicts=True,
+            )
+            existing.update(
+                (progress.lesson_id, progress) for progress in rows.filter(lesson_id__in=missing)
+            )
+
+        written = []
+        newly_completed = []
+        for lesson_id in sorted(merged):
+            progress = existing[lesson_id]
+            if merged[lesson_id].completed and progress.status != 'completed':
+                newly_completed.append(lesson_id)
+            apply_merged_progress(progress, merged[lesson_id], now)
+            written.append(progress)
+
+        StudentProgress.objects.bulk_update(written, [
+            'status', 'time_spent_seconds', 'time_spent_minutes',
+            'completion_percentage', 'completed_at', 'last_accessed', 'updated_at',
+        ])
+        # bulk_update() sends no signals, so completions are counted here
+        record_completions(student_id, newly_completed)
+    bump_student_version(student_id)
+
+    return written
+
+
+def drop_applied_events(student_id, events):
+    """
+    Drop events whose seq was already applied for their lesson and device,
+    then record the highest seq of each; call inside a transaction.
+    """
+    seqs = {}
+    for event in events:
+        if event.get('seq') is not None:
+            seqs.setdefault((event['lesson_id'], event.get('device_id', '')), []).append(event['seq'])
+    if not seqs:
+        return events
+
+    applied = {
+        (sequence.lesson_id, sequence.device_id): sequence.last_seq
+        for sequence in ProgressDeviceSequence.objects.select_for_update().filter(
+            student_id=student_id,
+            lesson_id__in={lesson_id for lesson_id, device_id in seqs},
+        )
+    }
+    for (lesson_id, device_id), device_seqs in seqs.items():
+        claim_sequence(student_id, lesson_id, device_id, max(device_seqs))
+
+    def is_new(event):
+        last_seq = applied.get((event['lesson_id'], event.get('device_id', '')))
+        return event.get('seq') is None or last_seq is None or event['seq'] > last_seq
+
+    return [event for event in events if is_new(event)]
+
+
+def merge_student_events(student, events):
+    """
+    Merge a batch of heartbeat events for one student; call inside a
+    transaction. Returns (lesson_id -> MergedProgress for the student's
+    lessons, lesson ids rejected as not in the student's course).
+    """
+    allowed_ids = get_allowed_lesson_ids(student, {event['lesson_id'] for event in events})
+    rejected_ids = sorted({event['lesson_id'] for event in events} - allowed_ids)
+    events = [event for event in events if event['lesson_id'] in allowed_ids]
+    return merge_progress_events(drop_applied_events(student.id, events)), rejected_ids
+
+
+def claim_sequence(student_id, lesson_id, device_id, seq):
+    """
+    Record seq as the latest heartbeat of a device; call inside a transaction.
+    Returns False when seq is not newer than what was already applied,
+    meaning the heartbeat is a retry or arrived out of order.
+    """
+    claimed = ProgressDeviceSequence.objects.filter(
+        student_id=student_id,
+        lesson_id=lesson_id,
+        device_id=device_id,
+        last_seq__lt=seq,
+    ).update(last_seq=seq, updated_at=timezone.now())
+    if claimed:
+        return True
+    try:
+        with transaction.atomic():
+            ProgressDeviceSequence.objects.create(
+                student_id=student_id,
+                lesson_id=lesson_id,
+                device_id=device_id,
+                last_seq=seq,
+            )
+        return True
+    except IntegrityError:
+        # A concurrent request created the device row first; claim against it
+        return bool(ProgressDeviceSequence.objects.filter(
+            student_id=student_id,
+            lesson_id=lesson_id,
+            device_id=device_id,
+            last_seq__lt=seq,
+        ).update(last_seq=seq, updated_at=timezone.now()))
+
+
+def record_progress_update(student_id, lesson_id, data):
+    """
+    Apply one progress update with F() expressions instead of a
+    read-modify-write cycle. data may hold time_spent_delta_seconds,
+    time_spent_minutes (absolute, legacy clients: never moves backwards),
+    completion_percentage, status, and device_id + seq for deduplication.
+    Returns (StudentProgress, applied); applied is False for dropped retries.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Insert-or-ignore, so the UPDATE below always has a row to hit. Done
+        # before the seq check: a buffered batch may have claimed the seq
+        # before its row was written, and a dropped retry still returns a row
+        StudentProgress.objects.bulk_create(
+            [StudentProgress(student_id=student_id, lesson_id=lesson_id, status='in_progress')],
+            ignore_conflicts=True,
+        )
+
+        seq = data.get('seq')
+        if seq is not None and not claim_sequence(student_id, lesson_id, data.get('device_id', ''), seq):
+            return StudentProgress.objects.get(student_id=student_id, lesson_id=lesson_id), False
+
+        updates = {'last_accessed': now, 'updated_at': now}
+        delta = data.get('time_spent_delta_seconds')
+        if delta:
+            updates['time_spent_seconds'] = F('time_spent_seconds') + delta
+            # Right-hand sides see the old column values, so this is the new total
+            updates['time_spent_minutes'] = (F('time_spent_seconds') + delta) / 60
+        elif data.get('time_spent_minutes') is not None:
+            minutes = data['time_spent_minutes']
+            updates['time_spent_minutes'] = Greatest(F('time_spent_minutes'), Value(minutes))
+            updates['time_spent_seconds'] = Greatest(F('time_spent_seconds'), Value(minutes * 60))
+
+        if data.get('status') == 'completed':
+            # Separate UPDATE so a transition into 'completed' is counted exactly once
+            newly_completed = StudentProgress.objects.filter(
+                student_id=student_id,
+                lesson_id=lesson_id,
+            ).exclude(status='completed').update(status='completed')
+            if newly_completed:
+                record_completions(student_id, [lesson_id])
+            updates['completion_percentage'] = Decimal('100.00')
+            updates['completed_at'] = Coalesce(F('completed_at'), Value(now))
+        else:
+            # Completion is sticky: later heartbeats cannot undo it
+            updates['status'] = Case(
+                When(status='completed', then=F('status')),
+                default=Value(data.get('status') or 'in_progress'),
+            )
+            if data.get('completion_percentage') is not None:
+                updates['completion_percentage'] = Case(
+                    When(status='completed', then=F('completion_percentage')),
+                    default=Value(data['completion_percentage']),
+                )
+
+        StudentProgress.objects.filter(student_id=student_id, lesson_id=lesson_id).update(**updates)
+    bump_student_version(student_id)
+
+    return StudentProgress.objects.get(student_id=student_id, lesson_id=lesson_id), True
@@ -0,0 +1,210 @@
+# student_lms/progress_buffer.py
+"""
+Write-behind buffer for progress heartbeats.
+
+Heartbeat batches are coalesced per (student, lesson) in a buffer backend
+and written to StudentProgress by flush_progress_buffer(), which runs:
+
+* every PROGRESS_BUFFER_FLUSH_INTERVAL seconds from a daemon thread,
+* immediately for a student whose batch completes a lesson,
+* at interpreter shutdown (atexit), so a graceful worker restart loses
+  nothing. A hard kill can lose at most one interval of heartbeats.
+
+PROGRESS_BUFFER_FLUSH_INTERVAL = 0 turns buffering off (write-through).
+Batches are queued on commit of the request's transaction, so a batch
+whose transaction rolls back is never written. A lesson whose write keeps
+failing (deleted lesson or registration) is retried on the next flushes
+and dropped, with an error log, after PROGRESS_BUFFER_MAX_ATTEMPTS.
+
+The backend is chosen with PROGRESS_BUFFER_BACKEND (dotted path). The
+default LocalProgressBuffer keeps entries in process memory; a shared
+backend (e.g. Redis hashes) only needs the same add() / drain() methods.
+Backends only ever see plain entries (MergedProgress.to_entry()):
+
+    {"time_spent_seconds": 90, "completion_percentage": "42.50",
+     "completed": false, "last_seq": 118}
+
+keyed {student_id: {lesson_id: entry}}, and combine two entries for the
+same lesson with merge_entries(). An entry put back after a failed write
+also carries "attempts".
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from .progress import MergedProgress, write_merged_progress
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'student_lms.progress_buffer.LocalProgressBuffer'
+
+PROGRESS_BUFFER_MAX_ATTEMPTS = getattr(settings, 'PROGRESS_BUFFER_MAX_ATTEMPTS', 5)
+
+
+def merge_entries(entry, later):
+    """Coalesce a later entry for the same lesson into an earlier one"""
+    merged = MergedProgress.from_entry(None, entry)
+    merged.merge(MergedProgress.from_entry(None, later))
+    merged_entry = merged.to_entry()
+    attempts = max(entry.get('attempts', 0), later.get('attempts', 0))
+    if attempts:
+        merged_entry['attempts'] = attempts
+    return merged_entry
+
+
+def to_entries(merged):
+    return {lesson_id: update.to_entry() for lesson_id, update in merged.items()}
+
+
+def from_entries(entries):
+    return {lesson_id: MergedProgress.from_entry(lesson_id, entry) for lesson_id, entry in entries.items()}
+
+
+class LocalProgressBuffer:
+    """In-process buffer: {student_id: {lesson_id: entry}}"""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, student_id, entries):
+        """Coalesce a batch's entries into the pending ones"""
+        with self._lock:
+            pending = self._pending.setdefault(student_id, {})
+            for lesson_id, entry in entries.items():
+                if lesson_id in pending:
+                    pending[lesson_id] = merge_entries(pending[lesson_id], entry)
+                else:
+                    pending[lesson_id] = entry
+
+    def drain(self, student_id=None):
+        """Remove and return pending entries (all students, or just one)"""
+        with self._lock:
+            if student_id is None:
+                pending, self._pending = self._pending, {}
+                return pending
+            if student_id not in self._pending:
+                return {}
+            return {student_id: self._pending.pop(student_id)}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_flusher = None
+
+
+def get_flush_interval():
+    return getattr(settings, 'PROGRESS_BUFFER_FLUSH_INTERVAL', 0)
+
+
+def get_progress_buffer():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_path = getattr(settings, 'PROGRESS_BUFFER_BACKEND', DEFAULT_BACKEND)
+                _backend = import_string(backend_path)()
+    return _backend
+
+
+def flush_progress_buffer(student_id=None):
+    """Write pending updates to the database; returns the number of lessons written"""
+    pending = get_progress_buffer().drain(student_id)
+    written = 0
+    for pending_student_id, entries in pending.items():
+        try:
+            written += len(write_merged_progress(pending_student_id, from_entries(entries)))
+        except Exception:
+            logger.exception('Progress flush failed for student %s', pending_student_id)
+            written += retry_lessons(pending_student_id, entries)
+    return written
+
+
+def retry_lessons(student_id, entries):
+    """
+    Write the lessons of a failed flush one by one, so a single bad lesson
+    does not hold back the others. Failed lessons go back in the buffer
+    until they reach PROGRESS_BUFFER_MAX_ATTEMPTS, then are dropped.
+    """
+    written = 0
+    failed = {}
+    for lesson_id, entry in entries.items():
+        try:
+            written += len(write_merged_progress(student_id, from_entries({lesson_id: entry})))
+        except Exception:
+            attempts = entry.get('attempts', 0) + 1
+            if attempts < PROGRESS_BUFFER_MAX_ATTEMPTS:
+                failed[lesson_id] = {**entry, 'attempts': attempts}
+            else:
+                logger.error(
+                    'Dropping progress of student %s for lesson %s after %s failed flushes: %s',
+                    student_id, lesson_id, attempts, entry,
+                )
+    if failed:
+        get_progress_buffer().add(student_id, failed)
+    return written
+
+
+class ProgressFlusher(threading.Thread):
+    """Daemon thread flushing the buffer every PROGRESS_BUFFER_FLUSH_INTERVAL seconds"""
+
+    def __init__(self):
+        super().__init__(name='progress-buffer-flusher', daemon=True)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(get_flush_interval() or 1):
+            try:
+                flush_progress_buffer()
+            finally:
+                connection.close()
+
+
+def ensure_flusher():
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        with _backend_lock:
+            if _flusher is None or not _flusher.is_alive():
+                _flusher = ProgressFlusher()
+                _flusher.start()
+
+
+def buffer_progress(student_id, merged):
+    """
+    Queue merged updates (lesson_id -> MergedProgress) for a student.
+    Returns True when buffered, False when they were written straight away.
+    """
+    if not merged:
+        return False
+    if not get_flush_interval():
+        write_merged_progress(student_id, merged)
+        return False
+
+    entries = to_entries(merged)
+    completed = any(update.completed for update in merged.values())
+    # Queued only once the caller's transaction (which claimed the seqs) commits
+    transaction.on_commit(lambda: queue_entries(student_id, entries, completed))
+    # Completions are written at once so course progress is never stale
+    return not completed
+
+
+def queue_entries(student_id, entries, completed):
+    get_progress_buffer().add(student_id, entries)
+    if completed:
+        flush_progress_buffer(student_id)
+    else:
+        ensure_flusher()
+
+
+@atexit.register
+def flush_on_shutdown():
+    if _backend is None:
+        return
+    try:
+        flush_progress_buffer()
+    except Exception:
+        logger.exception('Progress flush on shutdown failed')
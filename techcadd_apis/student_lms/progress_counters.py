@@ -0,0 +1,205 @@
+# student_lms/progress_counters.py
+"""
+Completed-lesson counters per student, per course and per module.
+
+A counter counts the student's StudentProgress rows with status
+'completed' on active lessons of active modules, so it matches what the
+course tree shows. It changes only when a row moves into or out of
+'completed', with F() updates in the same transaction as the write:
+
+* StudentProgress.save() / delete() through the signals in models.py,
+* record_progress_update() and write_merged_progress() in progress.py,
+  which write with update() / bulk_update() and report transitions here.
+
+Curriculum changes that hide or move lessons recount the affected students.
+rebuild_progress_counters recomputes everything from StudentProgress.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+
+def counted_lessons(lesson_ids):
+    """{lesson_id: (module_id, course_id)} for lessons that count towards progress"""
+    from .models import Lesson
+
+    return {
+        row['id']: (row['module_id'], row['module__course_id'])
+        for row in Lesson.objects.filter(
+            id__in=lesson_ids,
+            is_active=True,
+            module__is_active=True,
+        ).values('id', 'module_id', 'module__course_id')
+    }
+
+
+def record_completions(student_id, lesson_ids, sign=1):
+    """
+    Count lessons that moved into (sign=1) or out of (sign=-1) 'completed'.
+    Decrements never create rows, so cascading deletes cannot resurrect
+    counters of a student or course that is being deleted.
+    """
+    from .models import StudentCourseProgress, StudentModuleProgress
+
+    if not lesson_ids:
+        return
+    lessons = counted_lessons(lesson_ids)
+    if not lessons:
+        return
+    per_module = Counter(lessons.values())
+    per_course = Counter(course_id for module_id, course_id in lessons.values())
+
+    with transaction.atomic():
+        for course_id, count in per_course.items():
+            apply_change(StudentCourseProgress, sign * count, student_id=student_id, course_id=course_id)
+        for (module_id, course_id), count in per_module.items():
+            apply_change(StudentModuleProgress, sign * count, student_id=student_id, module_id=module_id)
+
+
+def apply_change(model, change, **key):
+    if change > 0:
+        model.objects.get_or_create(**key)
+    model.objects.filter(**key).update(completed_lessons=F('completed_lessons') + change)
+
+
+def get_completed_lessons(student_id, course_id):
+    """Completed lessons of a student in a course: one indexed lookup"""
+    from .models import StudentCourseProgress
+
+    return StudentCourseProgress.objects.filter(
+        student_id=student_id,
+        course_id=course_id,
+    ).values_list('completed_lessons', flat=True).first() or 0
+
+
+def get_module_completed_lessons(student_id):
+    """{module_id: completed lessons} for a student, from the module counters"""
+    from .models import StudentModuleProgress
+
+    return dict(
+        StudentModuleProgress.objects.filter(student_id=student_id).values_list('module_id', 'completed_lessons')
+    )
+
+
+def get_course_completion(student_id, course_id, total_lessons):
+    """course_progress block for a student, read from the counter row"""
+    completed_lessons = get_completed_lessons(student_id, course_id)
+    if total_lessons:
+        progress_percentage = round((completed_lessons / total_lessons) * 100, 2)
+    else:
+        progress_percentage = 0.0
+    return {
+        'total_lessons': total_lessons,
+        'completed_lessons': completed_lessons,
+        'progress_percentage': progress_percentage,
+    }
+
+
+def remember_previous_status(instance):
+    """pre_save: keep the status of the row as currently stored"""
+    instance._previous_status = None
+    if instance.pk is None or instance._state.adding:
+        return
+    instance._previous_status = type(instance).objects.filter(
+        pk=instance.pk
+    ).values_list('status', flat=True).first()
+
+
+def record_save(instance):
+    """post_save: count a transition into or out of 'completed'"""
+    was_completed = getattr(instance, '_previous_status', None) == 'completed'
+    is_completed = instance.status == 'completed'
+    if is_completed != was_completed:
+        record_completions(instance.student_id, [instance.lesson_id], 1 if is_completed else -1)
+    instance._previous_status = instance.status
+
+
+def record_delete(instance):
+    """post_delete: uncount a completed row"""
+    if instance.status == 'completed':
+        record_completions(instance.student_id, [instance.lesson_id], -1)
+
+
+def rebuild_progress_counters(StudentProgress, StudentCourseProgress, StudentModuleProgress, student_ids=None):
+    """
+    Recompute counters from StudentProgress, for every student or only the given ones.
+    Takes the model classes so data migrations can pass historical models.
+    """
+    completed = StudentProgress.objects.filter(
+        status='completed',
+        lesson__is_active=True,
+        lesson__module__is_active=True,
+    )
+    course_counters = StudentCourseProgress.objects.all()
+    module_counters = StudentModuleProgress.objects.all()
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        completed = completed.filter(student_id__in=student_ids)
+        course_counters = course_counters.filter(student_id__in=student_ids)
+        module_counters = module_counters.filter(student_id__in=student_ids)
+
+    per_module = completed.values(
+        'student_id', 'lesson__module_id', 'lesson__module__course_id'
+    ).annotate(total=Count('id')).order_by()
+    per_course = Counter()
+    module_rows = []
+    for row in per_module:
+        per_course[(row['student_id'], row['lesson__module__course_id'])] += row['total']
+        module_rows.append(StudentModuleProgress(
+            student_id=row['student_id'],
+            module_id=row['lesson__module_id'],
+            completed_lessons=row['total'],
+        ))
+
+    with transaction.atomic():
+        course_counters.delete()
+        module_counters.delete()
+        StudentCourseProgress.objects.bulk_create([
+            StudentCourseProgress(student_id=student_id, course_id=course_id, completed_lessons=total)
+            for (student_id, course_id), total in per_course.items()
+        ], batch_size=500)
+        StudentModuleProgress.objects.bulk_create(module_rows, batch_size=500)
+    return len(module_rows)
+
+
+def recount_students_for_lessons(lesson_ids):
+    """Recount every student with a completed row on the given lessons"""
+    from .models import StudentCourseProgress, StudentModuleProgress, StudentProgress
+
+    student_ids = set(StudentProgress.objects.filter(
+        lesson_id__in=lesson_ids,
+        status='completed',
+    ).values_list('student_id', flat=True))
+    if student_ids:
+        rebuild_progress_counters(StudentProgress, StudentCourseProgress, StudentModuleProgress, student_ids)
+
+
+def remember_curriculum_state(instance):
+    """pre_save on Lesson / CourseModule: keep the fields that decide what is counted"""
+    instance._counted_state = None
+    if instance.pk is None or instance._state.adding:
+        return
+    parent_field = 'module_id' if hasattr(instance, 'module_id') else 'course_id'
+    instance._counted_state = type(instance).objects.filter(
+        pk=instance.pk
+    ).values_list('is_active', parent_field).first()
+
+
+def record_curriculum_change(instance):
+    """post_save on Lesson / CourseModule: recount when lessons were hidden, shown or moved"""
+    from .models import Lesson
+
+    previous = getattr(instance, '_counted_state', None)
+    instance._counted_state = None
+    if previous is None:
+        # New lessons have no progress yet
+        return
+    parent_id = instance.module_id if isinstance(instance, Lesson) else instance.course_id
+    if previous == (instance.is_active, parent_id):
+        return
+    if isinstance(instance, Lesson):
+        lesson_ids = [instance.id]
+    else:
+        lesson_ids = list(Lesson.objects.filter(module_id=instance.id).values_list('id', flat=True))
+    recount_students_for_lessons(lesson_ids)
@@ -1,5 +1,6 @@
 # student_lms/serializers.py
 from rest_framework import serializers
+from staff_app.fieldsets import SparseFieldsMixin
 from staff_app.models import StudentRegistration
 
 class StudentLoginSerializer(serializers.Serializer):
@@ -91,9 +92,39 @@ class StudentDashboardSerializer(serializers.ModelSerializer):
     
 # student_lms/course_serializers.py
 from rest_framework import serializers
+from django.db.models import Prefetch
 from .models import CourseModule, Lesson, StudentProgress, StudentNote
+from .progress import MAX_BATCH_EVENTS
+from .note_sync import MAX_NOTE_CHANGES
+from .progress_counters import get_course_completion, get_module_completed_lessons
 from staff_app.models import Course
 
+
+def get_progress_map(context):
+    """
+    Map of lesson_id -> StudentProgress for the requesting student.
+    Loaded with one query the first time it is needed and kept in the
+    serializer context, which nested serializers share.
+    """
+    if 'progress_map' not in context:
+        request = context.get('request')
+        if request and hasattr(request, 'user'):
+            context['progress_map'] = {
+                progress.lesson_id: progress
+                for progress in StudentProgress.objects.filter(student=request.user)
+            }
+        else:
+            context['progress_map'] = {}
+    return context['progress_map']
+
+
+def get_active_lessons(module):
+    """Active lessons of a module, using the prefetched list when available"""
+    if not hasattr(module, 'active_lessons'):
+        module.active_lessons = list(module.lessons.filter(is_active=True))
+    return module.active_lessons
+
+
 class LessonListSerializer(serializers.ModelSerializer):
     """
     Serializer for listing lessons with basic info
@@ -116,34 +147,40 @@ class LessonListSerializer(serializers.ModelSerializer):
     
     def get_is_completed(self, obj):
         """Check if student has completed this lesson"""
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            try:
-                progress = StudentProgress.objects.get(
-                    student=request.user,
-                    lesson=obj
-                )
-                return progress.status == 'completed'
-            except StudentProgress.DoesNotExist:
-                return False
-        return False
+        progress = get_progress_map(self.context).get(obj.id)
+        return progress is not None and progress.status == 'completed'
     
     def get_progress_percentage(self, obj):
         """Get student's progress percentage for this lesson"""
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            try:
-                progress = StudentProgress.objects.get(
-                    student=request.user,
-                    lesson=obj
-                )
-                return float(progress.completion_percentage)
-            except StudentProgress.DoesNotExist:
-                return 0.0
-        return 0.0
+        progress = get_progress_map(self.context).get(obj.id)
+        if progress is None:
+            return 0.0
+        return float(progress.completion_percentage)
+
+
+class LessonChangeSerializer(LessonListSerializer):
+    """
+    Lesson entry of a delta sync response; carries its module id
+    """
+    class Meta(LessonListSerializer.Meta):
+        fields = ('module',) + LessonListSerializer.Meta.fields
 
 
-class LessonDetailSerializer(serializers.ModelSerializer):
+class ModuleChangeSerializer(serializers.ModelSerializer):
+    """
+    Module entry of a delta sync response (lessons are sent separately)
+    """
+    class Meta:
+        model = CourseModule
+        fields = (
+            'id',
+            'title',
+            'description',
+            'order',
+        )
+
+
+class LessonDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Detailed serializer for individual lesson view
     """
@@ -167,6 +204,11 @@ class LessonDetailSerializer(serializers.ModelSerializer):
             'progress',
             'my_notes',
         )
+        # Both run their own queries and read only the lesson id
+        fieldset_columns = {
+            'progress': (),
+            'my_notes': (),
+        }
     
     def get_progress(self, obj):
         """Get student's progress for this lesson"""
@@ -198,13 +240,14 @@ class LessonDetailSerializer(serializers.ModelSerializer):
         if request and hasattr(request, 'user'):
             notes = StudentNote.objects.filter(
                 student=request.user,
-                lesson=obj
+                lesson=obj,
+                deleted_at__isnull=True
             ).order_by('timestamp_seconds')
             return StudentNoteSerializer(notes, many=True).data
         return []
 
 
-class CourseModuleSerializer(serializers.ModelSerializer):
+class CourseModuleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for course modules with lessons
     """
@@ -225,36 +268,41 @@ class CourseModuleSerializer(serializers.ModelSerializer):
             'total_duration_minutes',
             'lessons',
         )
+        # Computed from the module's lessons, looked up by its id
+        fieldset_columns = {
+            'total_lessons': (),
+            'completed_lessons': (),
+            'total_duration_minutes': (),
+            'lessons': (),
+        }
     
     def get_lessons(self, obj):
         """Get all lessons in this module"""
-        lessons = obj.lessons.filter(is_active=True)
         return LessonListSerializer(
-            lessons, 
+            get_active_lessons(obj), 
             many=True, 
             context=self.context
         ).data
     
     def get_total_lessons(self, obj):
         """Count total lessons in module"""
-        return obj.lessons.filter(is_active=True).count()
+        return len(get_active_lessons(obj))
     
     def get_completed_lessons(self, obj):
-        """Count completed lessons by student"""
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            return StudentProgress.objects.filter(
-                student=request.user,
-                lesson__module=obj,
-                status='completed'
-            ).count()
-        return 0
+        """Completed lessons by student, from the module's completion counter"""
+        if 'module_completion' not in self.context:
+            request = self.context.get('request')
+            if request and hasattr(request, 'user'):
+                self.context['module_completion'] = get_module_completed_lessons(request.user.id)
+            else:
+                self.context['module_completion'] = {}
+        return self.context['module_completion'].get(obj.id, 0)
     
     def get_total_duration_minutes(self, obj):
         """Calculate total duration of all lessons"""
         return sum(
             lesson.duration_minutes 
-            for lesson in obj.lessons.filter(is_active=True)
+            for lesson in get_active_lessons(obj)
         )
 
 
@@ -271,50 +319,40 @@ class CourseDetailSerializer(serializers.ModelSerializer):
             'modules',
         )
     
+    def get_active_modules(self, obj):
+        """Active modules with their active lessons, loaded once per serializer"""
+        if not hasattr(self, '_active_modules'):
+            self._active_modules = list(
+                CourseModule.objects.filter(
+                    course=obj,
+                    is_active=True
+                ).order_by('order').prefetch_related(
+                    Prefetch(
+                        'lessons',
+                        queryset=Lesson.objects.filter(is_active=True),
+                        to_attr='active_lessons'
+                    )
+                )
+            )
+        return self._active_modules
+    
     def get_modules(self, obj):
         """Get all modules in this course"""
-        modules = CourseModule.objects.filter(
-            course=obj,
-            is_active=True
-        ).order_by('order')
         return CourseModuleSerializer(
-            modules,
+            self.get_active_modules(obj),
             many=True,
             context=self.context
         ).data
     
     def get_course_progress(self, obj):
-        """Calculate overall course progress"""
+        """Overall course progress from the student's completion counter"""
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
-            # Get all lessons in this course
-            total_lessons = Lesson.objects.filter(
-                module__course=obj,
-                module__is_active=True,
-                is_active=True
-            ).count()
-            
-            if total_lessons == 0:
-                return {
-                    'total_lessons': 0,
-                    'completed_lessons': 0,
-                    'progress_percentage': 0.0
-                }
-            
-            # Count completed lessons
-            completed_lessons = StudentProgress.objects.filter(
-                student=request.user,
-                lesson__module__course=obj,
-                status='completed'
-            ).count()
-            
-            progress_percentage = (completed_lessons / total_lessons) * 100
-            
-            return {
-                'total_lessons': total_lessons,
-                'completed_lessons': completed_lessons,
-                'progress_percentage': round(progress_percentage, 2)
-            }
+            total_lessons = sum(
+                len(module.active_lessons)
+                for module in self.get_active_modules(obj)
+            )
+            return get_course_completion(request.user.id, obj.id, total_lessons)
         return None
 
 
@@ -333,7 +371,42 @@ class StudentProgressSerializer(serializers.ModelSerializer):
         read_only_fields = ('lesson',)
 
 
-class StudentNoteSerializer(serializers.ModelSerializer):
+class ProgressUpdateSerializer(serializers.Serializer):
+    """
+    Input for update_lesson_progress
+    """
+    time_spent_delta_seconds = serializers.IntegerField(min_value=0, max_value=3600, required=False)
+    time_spent_minutes = serializers.IntegerField(min_value=0, required=False)
+    completion_percentage = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=0, max_value=100, required=False
+    )
+    status = serializers.ChoiceField(choices=StudentProgress.STATUS_CHOICES, required=False)
+    device_id = serializers.CharField(max_length=64, required=False, allow_blank=True, default='')
+    seq = serializers.IntegerField(min_value=0, required=False)
+
+
+class ProgressEventSerializer(serializers.Serializer):
+    """
+    One heartbeat from the LMS player
+    """
+    lesson_id = serializers.IntegerField(min_value=1)
+    time_spent_delta_seconds = serializers.IntegerField(min_value=0, max_value=3600, default=0)
+    completion_percentage = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=0, max_value=100, required=False
+    )
+    status = serializers.ChoiceField(choices=StudentProgress.STATUS_CHOICES, required=False)
+    device_id = serializers.CharField(max_length=64, required=False, allow_blank=True, default='')
+    seq = serializers.IntegerField(min_value=0, required=False)
+
+
+class ProgressBatchSerializer(serializers.Serializer):
+    """
+    A batch of heartbeats posted in one request
+    """
+    events = ProgressEventSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_EVENTS)
+
+
+class StudentNoteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for student notes
     """
@@ -344,7 +417,33 @@ class StudentNoteSerializer(serializers.ModelSerializer):
             'lesson',
             'note_text',
             'timestamp_seconds',
+            'client_id',
             'created_at',
             'updated_at',
         )
-        read_only_fields = ('id', 'created_at', 'updated_at')
\ No newline at end of file
+        read_only_fields = ('id', 'client_id', 'created_at', 'updated_at')
+
+
+class NoteChangeSerializer(serializers.Serializer):
+    """
+    One offline note change: create, edit or delete (deleted=true)
+    """
+    client_id = serializers.UUIDField()
+    lesson = serializers.IntegerField(min_value=1, required=False)
+    note_text = serializers.CharField(required=False, allow_blank=True)
+    timestamp_seconds = serializers.IntegerField(min_value=0, required=False)
+    updated_at = serializers.DateTimeField()
+    deleted = serializers.BooleanField(default=False)
+    
+    def validate(self, data):
+        if not data['deleted'] and ('lesson' not in data or 'note_text' not in data):
+            raise serializers.ValidationError("'lesson' and 'note_text' are required unless 'deleted' is true")
+        return data
+
+
+class NoteSyncSerializer(serializers.Serializer):
+    """
+    Local note changes since the last sync, and that sync's cursor
+    """
+    since = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    changes = NoteChangeSerializer(many=True, max_length=MAX_NOTE_CHANGES, required=False, default=list)
\ No newline at end of file
@@ -0,0 +1,88 @@
+# student_lms/student_summary.py
+"""
+Per-student numbers behind the dashboard's quick_stats.
+
+The summary is cached per student together with the course it was built
+for, that course's tree version (course_cache.py) and the student's
+version (etags.py). Curriculum changes, a change of course and any write
+to the student's progress therefore make it stale without deleting keys.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+
+from .course_cache import get_course_tree_version
+from .etags import get_student_version
+
+STUDENT_SUMMARY_CACHE_TIMEOUT = getattr(settings, 'STUDENT_SUMMARY_CACHE_TIMEOUT', 60 * 5)
+
+
+def _summary_key(student_id):
+    return f'student_summary:{student_id}'
+
+
+def build_student_summary(student):
+    """Compute the summary with three aggregate queries"""
+    from .models import Lesson, StudentProgress
+    from .progress_counters import get_completed_lessons
+
+    progress = StudentProgress.objects.filter(student_id=student.id).aggregate(
+        in_progress=Count('id', filter=Q(
+            status='in_progress',
+            lesson__is_active=True,
+            lesson__module__is_active=True,
+            lesson__module__course_id=student.course_id,
+        )),
+        time_spent_seconds=Sum('time_spent_seconds'),
+    )
+
+    # Live classes and assignments of the course the student has not completed yet
+    open_lessons = Lesson.objects.filter(
+        module__course_id=student.course_id,
+        module__is_active=True,
+        is_active=True,
+        lesson_type__in=['live_class', 'assignment'],
+    ).exclude(
+        Exists(StudentProgress.objects.filter(
+            student_id=student.id,
+            lesson_id=OuterRef('pk'),
+            status='completed',
+        ))
+    ).aggregate(
+        live_classes=Count('id', filter=Q(lesson_type='live_class')),
+        assignments=Count('id', filter=Q(lesson_type='assignment')),
+    )
+
+    time_spent_seconds = progress['time_spent_seconds'] or 0
+    return {
+        'completed_lessons': get_completed_lessons(student.id, student.course_id),
+        'in_progress_lessons': progress['in_progress'],
+        'time_spent_minutes': time_spent_seconds // 60,
+        'upcoming_classes': open_lessons['live_classes'],
+        'pending_assignments': open_lessons['assignments'],
+    }
+
+
+def get_student_summary(student):
+    """Cached summary for a student; rebuilt when stale"""
+    if not student.course_id:
+        return {
+            'completed_lessons': 0,
+            'in_progress_lessons': 0,
+            'time_spent_minutes': 0,
+            'upcoming_classes': 0,
+            'pending_assignments': 0,
+        }
+
+    versions = (
+        student.course_id,
+        get_course_tree_version(student.course_id),
+        get_student_version(student.id),
+    )
+    cached = cache.get(_summary_key(student.id))
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+
+    summary = build_student_summary(student)
+    cache.set(_summary_key(student.id), (versions, summary), STUDENT_SUMMARY_CACHE_TIMEOUT)
+    return summary
@@ -1,3 +1,707 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import time
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from staff_app.models import Course, CourseType, StaffProfile, StudentRegistration
+from .models import CourseModule, Lesson, ProgressDeviceSequence, StudentCourseProgress, StudentNote, StudentModuleProgress, StudentProgress
+from .authentication import StudentJWTAuthentication
+from .content_sync import encode_sync_cursor
+from .etags import bump_student_version
+from .progress import claim_sequence, merge_progress_events, write_merged_progress
+from . import course_cache, progress_buffer
+from .progress_buffer import flush_progress_buffer
+from .progress_counters import rebuild_progress_counters
+
+
+class LMSTestCase(TestCase):
+    """Builds a student enrolled in a course of generated modules and lessons"""
+
+    def setUp(self):
+        # The shared cache outlives the test database
+        cache.clear()
+        user = User.objects.create_user(username='counselor', password='secret')
+        staff = StaffProfile.objects.create(user=user, role='counselor')
+        self.course_type = CourseType.objects.create(name='IT')
+        self.client = APIClient()
+        self.staff = staff
+
+    def create_student(self, modules, lessons_per_module):
+        course = Course.objects.create(
+            course_type=self.course_type,
+            name=f'Course {modules}x{lessons_per_module}',
+            duration_months='3_months',
+            duration_hours=120,
+            course_fee=15000,
+        )
+        student = StudentRegistration.objects.create(
+            branch='mohali',
+            joining_date=datetime.date(2025, 1, 1),
+            student_name='Test Student',
+            father_name='Father',
+            date_of_birth=datetime.date(2000, 1, 1),
+            email=f'student{modules}x{lessons_per_module}@example.com',
+            qualification='B.Tech',
+            work_college='College',
+            contact_address='Address',
+            phone_no='9876543210',
+            course_type=self.course_type,
+            course=course,
+            duration_months='3_months',
+            duration_hours=120,
+            total_course_fee=15000,
+            created_by=self.staff,
+        )
+        for module_order in range(modules):
+            module = CourseModule.objects.create(course=course, title=f'Module {module_order}', order=module_order)
+            for lesson_order in range(lessons_per_module):
+                lesson = Lesson.objects.create(
+                    module=module,
+                    title=f'Lesson {lesson_order}',
+                    order=lesson_order,
+                    duration_minutes=10,
+                )
+                if lesson_order % 2 == 0:
+                    StudentProgress.objects.create(student=student, lesson=lesson, status='completed', completion_percentage=100)
+        return student
+
+
+class JSONProgressBuffer:
+    """Progress buffer storing entries as JSON strings, like a Redis hash per student"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def add(self, student_id, entries):
+        pending = self.hashes.setdefault(student_id, {})
+        for lesson_id, entry in entries.items():
+            if lesson_id in pending:
+                entry = progress_buffer.merge_entries(json.loads(pending[lesson_id]), entry)
+            pending[lesson_id] = json.dumps(entry)
+
+    def drain(self, student_id=None):
+        student_ids = list(self.hashes) if student_id is None else [student_id]
+        return {
+            pending_student_id: {
+                lesson_id: json.loads(entry)
+                for lesson_id, entry in self.hashes.pop(pending_student_id).items()
+            }
+            for pending_student_id in student_ids if pending_student_id in self.hashes
+        }
+
+
+class CourseDetailQueryCountTests(LMSTestCase):
+    """my_course_detail must cost the same number of queries for any course size"""
+
+    def fetch_course(self, student):
+        self.client.force_authenticate(user=student)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/student/lms/my-course/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['course'], len(queries)
+
+    def test_query_count_is_constant_in_lesson_count(self):
+        small_course, small_queries = self.fetch_course(self.create_student(modules=1, lessons_per_module=2))
+        large_course, large_queries = self.fetch_course(self.create_student(modules=6, lessons_per_module=10))
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(large_course['course_progress']['total_lessons'], 60)
+        self.assertEqual(large_course['course_progress']['completed_lessons'], 30)
+        self.assertEqual(large_course['modules'][0]['total_lessons'], 10)
+        self.assertEqual(large_course['modules'][0]['completed_lessons'], 5)
+        self.assertEqual(large_course['modules'][0]['total_duration_minutes'], 100)
+        self.assertTrue(large_course['modules'][0]['lessons'][0]['is_completed'])
+        self.assertEqual(large_course['modules'][0]['lessons'][1]['progress_percentage'], 0.0)
+
+    def test_course_tree_cache_is_invalidated_by_lesson_changes(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        first_course, first_queries = self.fetch_course(student)
+        cached_course, cached_queries = self.fetch_course(student)
+        self.assertLess(cached_queries, first_queries)
+        self.assertEqual(cached_course, first_course)
+
+        module = CourseModule.objects.get(course=student.course)
+        Lesson.objects.create(module=module, title='New lesson', order=5, duration_minutes=10)
+        updated_course, _ = self.fetch_course(student)
+        self.assertEqual(updated_course['course_progress']['total_lessons'], 3)
+        self.assertEqual(updated_course['modules'][0]['lessons'][-1]['title'], 'New lesson')
+
+    def test_other_workers_see_the_new_tree(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        self.fetch_course(student)
+
+        # A lesson edited in another worker bumps the version through its own connection
+        other_worker = caches.create_connection('default')
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[0]
+        with mock.patch('student_lms.course_cache.cache', other_worker):
+            lesson.title = 'Renamed elsewhere'
+            lesson.save()
+        course, _ = self.fetch_course(student)
+        self.assertEqual(course['modules'][0]['lessons'][0]['title'], 'Renamed elsewhere')
+
+    def test_local_trees_expire(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        tree = course_cache.get_course_tree(student.course_id)
+        self.assertIs(course_cache.get_course_tree(student.course_id), tree)
+
+        expired = time.monotonic() + course_cache.COURSE_TREE_LOCAL_TIMEOUT + 1
+        with mock.patch('student_lms.course_cache.time.monotonic', return_value=expired):
+            # Served again from the shared cache, not the expired process copy
+            self.assertIsNot(course_cache.get_course_tree(student.course_id), tree)
+            self.assertEqual(course_cache.get_course_tree(student.course_id), tree)
+
+
+class StudentPrincipalCacheTests(LMSTestCase):
+    """Repeat requests with the same token are authenticated from the cache"""
+
+    def authenticate(self, token):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with CaptureQueriesContext(connection) as queries:
+            student, _ = StudentJWTAuthentication().authenticate(request)
+        return student, len(queries)
+
+    def student_token(self, student):
+        # Same claims as student_login
+        refresh = RefreshToken()
+        refresh['student_id'] = student.id
+        return str(refresh.access_token)
+
+    def test_cache_hit_costs_no_queries(self):
+        student = self.create_student(modules=1, lessons_per_module=1)
+        token = self.student_token(student)
+        self.assertEqual(self.authenticate(token)[1], 1)
+
+        cached, queries = self.authenticate(token)
+        self.assertEqual(queries, 0)
+        self.assertEqual(cached.pk, student.pk)
+        # The course came preloaded
+        with self.assertNumQueries(0):
+            self.assertEqual(cached.course.name, student.course.name)
+
+    def test_entries_are_per_token(self):
+        student = self.create_student(modules=1, lessons_per_module=1)
+        self.authenticate(self.student_token(student))
+        self.assertEqual(self.authenticate(self.student_token(student))[1], 1)
+
+    def test_saving_the_registration_invalidates(self):
+        student = self.create_student(modules=1, lessons_per_module=1)
+        token = self.student_token(student)
+        self.authenticate(token)
+
+        student.student_name = 'Renamed Student'
+        student.save()
+        cached, queries = self.authenticate(token)
+        self.assertEqual(queries, 1)
+        self.assertEqual(cached.student_name, 'Renamed Student')
+
+    def test_lost_generation_does_not_revive_old_entries(self):
+        student = self.create_student(modules=1, lessons_per_module=1)
+        token = self.student_token(student)
+        generation_key = f'student_principal_generation:{student.id}'
+        # Cached while the generation key is missing, then culled again after the save
+        cache.delete(generation_key)
+        self.authenticate(token)
+        student.student_name = 'Renamed Student'
+        student.save()
+        cache.delete(generation_key)
+
+        cached, queries = self.authenticate(token)
+        self.assertEqual(queries, 1)
+        self.assertEqual(cached.student_name, 'Renamed Student')
+
+
+class ProgressBatchTests(LMSTestCase):
+
+    @override_settings(PROGRESS_BUFFER_FLUSH_INTERVAL=0)
+    def test_batch_merges_events_per_lesson(self):
+        student = self.create_student(modules=1, lessons_per_module=3)
+        second, third = Lesson.objects.filter(module__course=student.course).order_by('order')[1:3]
+        self.client.force_authenticate(user=student)
+
+        response = self.client.post('/api/student/lms/progress/batch/', {'events': [
+            {'lesson_id': second.id, 'time_spent_delta_seconds': 40, 'completion_percentage': 20, 'seq': 1},
+            {'lesson_id': second.id, 'time_spent_delta_seconds': 40, 'completion_percentage': 35, 'seq': 2},
+            {'lesson_id': second.id, 'time_spent_delta_seconds': 40, 'completion_percentage': 35, 'seq': 2},
+            {'lesson_id': third.id, 'time_spent_delta_seconds': 30, 'status': 'completed', 'seq': 3},
+            {'lesson_id': 999999, 'time_spent_delta_seconds': 5},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['rejected_lesson_ids'], [999999])
+        second_progress = StudentProgress.objects.get(student=student, lesson=second)
+        self.assertEqual(second_progress.time_spent_seconds, 80)
+        self.assertEqual(second_progress.time_spent_minutes, 1)
+        self.assertEqual(float(second_progress.completion_percentage), 35.0)
+        third_progress = StudentProgress.objects.get(student=student, lesson=third)
+        self.assertEqual(third_progress.status, 'completed')
+        self.assertIsNotNone(third_progress.completed_at)
+
+    @override_settings(PROGRESS_BUFFER_FLUSH_INTERVAL=3600)
+    def test_buffered_batches_are_coalesced_until_flush(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[1]
+        self.client.force_authenticate(user=student)
+
+        for seq in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/student/lms/progress/batch/', {'events': [
+                    {'lesson_id': lesson.id, 'time_spent_delta_seconds': 30, 'completion_percentage': 10 * seq, 'seq': seq},
+                ]}, format='json')
+            self.assertEqual(response.status_code, 202, response.data)
+        self.assertFalse(StudentProgress.objects.filter(student=student, lesson=lesson).exists())
+
+        self.assertEqual(flush_progress_buffer(), 1)
+        progress = StudentProgress.objects.get(student=student, lesson=lesson)
+        self.assertEqual(progress.time_spent_seconds, 90)
+        self.assertEqual(float(progress.completion_percentage), 20.0)
+
+
+    @override_settings(PROGRESS_BUFFER_FLUSH_INTERVAL=0)
+    def test_retried_batches_are_not_counted_twice(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[1]
+        self.client.force_authenticate(user=student)
+
+        def post(device_id, seqs):
+            response = self.client.post('/api/student/lms/progress/batch/', {'events': [
+                {'lesson_id': lesson.id, 'time_spent_delta_seconds': 10, 'device_id': device_id, 'seq': seq}
+                for seq in seqs
+            ]}, format='json')
+            self.assertEqual(response.status_code, 200, response.data)
+            return StudentProgress.objects.get(student=student, lesson=lesson).time_spent_seconds
+
+        self.assertEqual(post('phone', [1, 2]), 20)
+        self.assertEqual(post('phone', [1, 2]), 20)
+        self.assertEqual(post('phone', [2, 3]), 30)
+        # Sequences are per device
+        self.assertEqual(post('laptop', [1, 2]), 50)
+
+    def test_sequence_claim_after_losing_the_insert_race(self):
+        student = self.create_student(modules=1, lessons_per_module=1)
+        lesson = Lesson.objects.get(module__course=student.course)
+        filter_sequences = ProgressDeviceSequence.objects.filter
+        calls = []
+
+        def first_update_misses(*args, **kwargs):
+            queryset = filter_sequences(*args, **kwargs)
+            calls.append(kwargs)
+            if len(calls) == 1:
+                # Another request inserts seq 3 before our insert
+                ProgressDeviceSequence.objects.create(student=student, lesson=lesson, device_id='phone', last_seq=3)
+                return queryset.none()
+            return queryset
+
+        with mock.patch.object(ProgressDeviceSequence.objects, 'filter', side_effect=first_update_misses):
+            self.assertTrue(claim_sequence(student.id, lesson.id, 'phone', 5))
+        self.assertEqual(ProgressDeviceSequence.objects.get(student=student, lesson=lesson).last_seq, 5)
+
+    def test_batch_merges_into_a_row_created_concurrently(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[1]
+        merged = merge_progress_events([
+            {'lesson_id': lesson.id, 'time_spent_delta_seconds': 30, 'completion_percentage': 40, 'seq': 1},
+            {'lesson_id': lesson.id, 'status': 'completed', 'seq': 2},
+        ])
+        bulk_create = StudentProgress.objects.bulk_create
+
+        def create_concurrently(objs, **kwargs):
+            # Another request inserts and completes the row first
+            StudentProgress.objects.create(
+                student=student, lesson=lesson, status='completed', completion_percentage=100,
+                time_spent_seconds=600, time_spent_minutes=10,
+            )
+            return bulk_create(objs, **kwargs)
+
+        completed_before = StudentCourseProgress.objects.get(student=student).completed_lessons
+        with mock.patch.object(StudentProgress.objects, 'bulk_create', side_effect=create_concurrently):
+            write_merged_progress(student.id, merged)
+
+        progress = StudentProgress.objects.get(student=student, lesson=lesson)
+        self.assertEqual(progress.status, 'completed')
+        self.assertEqual(progress.time_spent_seconds, 630)
+        self.assertEqual(float(progress.completion_percentage), 100.0)
+        self.assertEqual(StudentCourseProgress.objects.get(student=student).completed_lessons, completed_before + 1)
+
+
+    @override_settings(PROGRESS_BUFFER_FLUSH_INTERVAL=3600)
+    def test_backends_only_store_json_entries(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[1]
+        self.client.force_authenticate(user=student)
+
+        backend = JSONProgressBuffer()
+        with mock.patch.object(progress_buffer, '_backend', backend):
+            for seq in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.post('/api/student/lms/progress/batch/', {'events': [
+                        {'lesson_id': lesson.id, 'time_spent_delta_seconds': 30, 'completion_percentage': 12.5 + seq, 'seq': seq},
+                    ]}, format='json')
+                self.assertEqual(response.status_code, 202, response.data)
+            self.assertEqual(json.loads(backend.hashes[student.id][lesson.id]), {
+                'time_spent_seconds': 60,
+                'completion_percentage': '13.50',
+                'completed': False,
+                'last_seq': 1,
+            })
+            self.assertEqual(flush_progress_buffer(), 1)
+
+        progress = StudentProgress.objects.get(student=student, lesson=lesson)
+        self.assertEqual(progress.time_spent_seconds, 60)
+        self.assertEqual(float(progress.completion_percentage), 13.5)
+
+    @override_settings(PROGRESS_BUFFER_FLUSH_INTERVAL=3600)
+    def test_rolled_back_batches_are_not_buffered(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[1]
+        merged = merge_progress_events([{'lesson_id': lesson.id, 'time_spent_delta_seconds': 30}])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    progress_buffer.buffer_progress(student.id, merged)
+                    raise DatabaseError('request failed after buffering')
+            except DatabaseError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(flush_progress_buffer(), 0)
+
+    @override_settings(PROGRESS_BUFFER_FLUSH_INTERVAL=3600)
+    def test_failing_lessons_are_dropped_after_max_attempts(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        first, second = Lesson.objects.filter(module__course=student.course).order_by('order')
+        merged = merge_progress_events([
+            {'lesson_id': first.id, 'time_spent_delta_seconds': 30},
+            {'lesson_id': second.id, 'time_spent_delta_seconds': 30},
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            progress_buffer.buffer_progress(student.id, merged)
+
+        write = progress_buffer.write_merged_progress
+
+        def write_failing_for_second(student_id, lessons):
+            # As for a lesson deleted in the meantime (FK checks only fail on commit)
+            if second.id in lessons:
+                raise IntegrityError('FOREIGN KEY constraint failed')
+            return write(student_id, lessons)
+
+        with mock.patch.object(progress_buffer, 'write_merged_progress', write_failing_for_second), \
+                self.assertLogs('student_lms.progress_buffer', 'ERROR') as logs:
+            # The good lesson is written on the first flush, the failing one retried
+            self.assertEqual(flush_progress_buffer(), 1)
+            for _ in range(progress_buffer.PROGRESS_BUFFER_MAX_ATTEMPTS - 1):
+                self.assertEqual(flush_progress_buffer(), 0)
+        self.assertIn(f'for lesson {second.id} after', logs.output[-1])
+        self.assertEqual(progress_buffer.get_progress_buffer().drain(), {})
+        self.assertEqual(StudentProgress.objects.get(student=student, lesson=first).time_spent_seconds, 30)
+
+
+class LessonProgressUpdateTests(LMSTestCase):
+
+    def test_deltas_accumulate_and_retries_are_ignored(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[1]
+        self.client.force_authenticate(user=student)
+        url = f'/api/student/lms/lessons/{lesson.id}/progress/'
+
+        for seq, device_id in [(1, 'phone'), (2, 'phone'), (2, 'phone'), (1, 'phone'), (1, 'laptop')]:
+            response = self.client.post(url, {
+                'time_spent_delta_seconds': 45,
+                'completion_percentage': 10 * seq,
+                'device_id': device_id,
+                'seq': seq,
+            }, format='json')
+            self.assertEqual(response.status_code, 200, response.data)
+
+        progress = StudentProgress.objects.get(student=student, lesson=lesson)
+        self.assertEqual(progress.time_spent_seconds, 135)
+        self.assertEqual(progress.time_spent_minutes, 2)
+        self.assertEqual(progress.status, 'in_progress')
+
+        response = self.client.post(url, {'status': 'completed', 'time_spent_minutes': 1}, format='json')
+        self.assertTrue(response.data['applied'])
+        response = self.client.post(url, {'status': 'in_progress', 'completion_percentage': 30}, format='json')
+        progress.refresh_from_db()
+        self.assertEqual(progress.status, 'completed')
+        self.assertEqual(float(progress.completion_percentage), 100.0)
+        self.assertEqual(progress.time_spent_minutes, 2)
+
+    def test_stale_seq_without_a_progress_row(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[1]
+        # Claimed by a buffered batch whose progress row is not written yet
+        ProgressDeviceSequence.objects.create(student=student, lesson=lesson, device_id='phone', last_seq=5)
+        self.client.force_authenticate(user=student)
+
+        response = self.client.post(f'/api/student/lms/lessons/{lesson.id}/progress/', {
+            'time_spent_delta_seconds': 45, 'device_id': 'phone', 'seq': 3,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse(response.data['applied'])
+        self.assertEqual(StudentProgress.objects.get(student=student, lesson=lesson).time_spent_seconds, 0)
+
+
+class ProgressCounterTests(LMSTestCase):
+
+    def counters(self, student):
+        course = StudentCourseProgress.objects.get(student=student, course=student.course).completed_lessons
+        modules = dict(StudentModuleProgress.objects.filter(student=student).values_list('module_id', 'completed_lessons'))
+        return course, modules
+
+    @override_settings(PROGRESS_BUFFER_FLUSH_INTERVAL=0)
+    def test_counters_follow_every_write_path(self):
+        student = self.create_student(modules=2, lessons_per_module=4)
+        lessons = list(Lesson.objects.filter(module__course=student.course).order_by('module__order', 'order'))
+        self.assertEqual(self.counters(student)[0], 4)
+        self.client.force_authenticate(user=student)
+
+        self.client.post(f'/api/student/lms/lessons/{lessons[1].id}/progress/', {'status': 'completed'}, format='json')
+        self.client.post(f'/api/student/lms/lessons/{lessons[1].id}/progress/', {'status': 'completed'}, format='json')
+        self.client.post('/api/student/lms/progress/batch/', {'events': [
+            {'lesson_id': lessons[3].id, 'status': 'completed'},
+            {'lesson_id': lessons[0].id, 'status': 'completed'},
+        ]}, format='json')
+        StudentProgress.objects.get(student=student, lesson=lessons[4]).delete()
+        lessons[6].is_active = False
+        lessons[6].save()
+
+        course_total, per_module = self.counters(student)
+        self.assertEqual(course_total, 4)
+        self.assertEqual(per_module, {lessons[0].module_id: 4})
+
+        response = self.client.get(f'/api/student/lms/modules/{lessons[0].module_id}/')
+        self.assertEqual(response.data['module']['completed_lessons'], 4)
+        response = self.client.get(f'/api/student/lms/modules/{lessons[4].module_id}/')
+        self.assertEqual(response.data['module']['completed_lessons'], 0)
+
+        response = self.client.get('/api/student/lms/dashboard/')
+        self.assertEqual(response.data['dashboard']['quick_stats']['completed_lessons'], 4)
+        self.assertEqual(response.data['dashboard']['course_progress']['total_lessons'], 7)
+
+        StudentCourseProgress.objects.update(completed_lessons=0)
+        rebuild_progress_counters(StudentProgress, StudentCourseProgress, StudentModuleProgress)
+        self.assertEqual(self.counters(student), (course_total, per_module))
+
+
+class DashboardSummaryTests(LMSTestCase):
+
+    def fetch_dashboard(self, student):
+        self.client.force_authenticate(user=student)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/student/lms/dashboard/')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['dashboard']['quick_stats'], len(queries)
+
+    def test_quick_stats_are_cached_and_invalidated(self):
+        cache.clear()
+        student = self.create_student(modules=1, lessons_per_module=4)
+        module = CourseModule.objects.get(course=student.course)
+        live_class = Lesson.objects.create(module=module, title='Live', order=10, lesson_type='live_class')
+        StudentProgress.objects.create(student=student, lesson=live_class, status='in_progress', time_spent_seconds=600)
+
+        stats, cold_queries = self.fetch_dashboard(student)
+        self.assertEqual(stats['completed_lessons'], 2)
+        self.assertEqual(stats['in_progress_lessons'], 1)
+        self.assertEqual(stats['time_spent_minutes'], 10)
+        self.assertEqual(stats['upcoming_classes'], 1)
+        self.assertEqual(stats['pending_assignments'], 0)
+
+        stats, warm_queries = self.fetch_dashboard(student)
+        self.assertEqual(warm_queries, 0)
+
+        self.client.post(f'/api/student/lms/lessons/{live_class.id}/progress/', {'status': 'completed'}, format='json')
+        Lesson.objects.create(module=module, title='Homework', order=11, lesson_type='assignment')
+        stats, _ = self.fetch_dashboard(student)
+        self.assertEqual(stats['completed_lessons'], 3)
+        self.assertEqual(stats['upcoming_classes'], 0)
+        self.assertEqual(stats['pending_assignments'], 1)
+
+
+class CourseChangesTests(LMSTestCase):
+
+    def test_changes_since_cursor_include_edits_and_tombstones(self):
+        student = self.create_student(modules=2, lessons_per_module=3)
+        first_module, second_module = CourseModule.objects.filter(course=student.course).order_by('order')
+        edited, hidden, deleted = Lesson.objects.filter(module=first_module).order_by('order')
+        self.client.force_authenticate(user=student)
+
+        response = self.client.get('/api/student/lms/my-course/changes/')
+        self.assertTrue(response.data['reset'])
+        self.assertEqual(len(response.data['lessons']), 6)
+
+        since = encode_sync_cursor(timezone.now(), student.course_id)
+        edited.title = 'Edited'
+        edited.save()
+        hidden.is_active = False
+        hidden.save()
+        deleted_id = deleted.id
+        deleted.delete()
+        added = Lesson.objects.create(module=first_module, title='New', order=5)
+
+        response = self.client.get('/api/student/lms/my-course/changes/', {'since': since})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse(response.data['reset'])
+        self.assertEqual(response.data['modules'], [])
+        self.assertEqual([lesson['id'] for lesson in response.data['lessons']], [edited.id, added.id])
+        self.assertEqual(response.data['removed']['lessons'], sorted([hidden.id, deleted_id]))
+
+        second_module.is_active = False
+        second_module.save()
+        response = self.client.get('/api/student/lms/my-course/changes/', {'since': since})
+        self.assertEqual(response.data['removed']['modules'], [second_module.id])
+
+        response = self.client.get('/api/student/lms/my-course/changes/', {'since': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class NoteSyncTests(LMSTestCase):
+
+    def sync(self, since, changes):
+        response = self.client.post('/api/student/lms/notes/sync/', {'since': since, 'changes': changes}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_last_write_wins_and_deletes_reach_other_devices(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).first()
+        self.client.force_authenticate(user=student)
+        kept, removed = str(uuid.uuid4()), str(uuid.uuid4())
+
+        first = self.sync(None, [
+            {'client_id': kept, 'lesson': lesson.id, 'note_text': 'v1', 'updated_at': '2026-01-01T10:00:00Z'},
+            {'client_id': kept, 'lesson': lesson.id, 'note_text': 'v2', 'updated_at': '2026-01-01T10:05:00Z'},
+            {'client_id': removed, 'lesson': lesson.id, 'note_text': 'gone soon', 'updated_at': '2026-01-01T10:00:00Z'},
+            {'client_id': str(uuid.uuid4()), 'lesson': 999999, 'note_text': 'other course', 'updated_at': '2026-01-01T10:00:00Z'},
+        ])
+        self.assertEqual(len(first['applied_client_ids']), 2)
+        self.assertEqual(len(first['rejected_client_ids']), 1)
+        self.assertEqual(sorted(note['note_text'] for note in first['notes']), ['gone soon', 'v2'])
+
+        self.sync(first['next_cursor'], [
+            {'client_id': kept, 'note_text': 'stale edit', 'lesson': lesson.id, 'updated_at': '2026-01-01T09:00:00Z'},
+            {'client_id': removed, 'deleted': True, 'updated_at': '2026-01-01T11:00:00Z'},
+        ])
+        self.assertEqual(StudentNote.objects.get(client_id=kept).note_text, 'v2')
+
+        other_device = self.sync(first['next_cursor'], [])
+        self.assertEqual([note['client_id'] for note in other_device['deleted']], [uuid.UUID(removed)])
+        response = self.client.get(f'/api/student/lms/lessons/{lesson.id}/notes/')
+        self.assertEqual([note['note_text'] for note in response.data['notes']], ['v2'])
+
+
+    def test_notes_created_online_sync_by_client_id(self):
+        student = self.create_student(modules=1, lessons_per_module=1)
+        lesson = Lesson.objects.filter(module__course=student.course).first()
+        self.client.force_authenticate(user=student)
+
+        response = self.client.post(f'/api/student/lms/lessons/{lesson.id}/notes/', {'note_text': 'online'}, format='json')
+        client_id = response.data['note']['client_id']
+        self.assertIsNotNone(client_id)
+
+        synced = self.sync(None, [])
+        self.assertEqual([str(note['client_id']) for note in synced['notes']], [client_id])
+        self.sync(synced['next_cursor'], [
+            {'client_id': client_id, 'lesson': lesson.id, 'note_text': 'edited offline', 'updated_at': timezone.now().isoformat()},
+        ])
+        self.assertEqual(list(StudentNote.objects.filter(student=student).values_list('note_text', flat=True)), ['edited offline'])
+
+class ConditionalGetTests(LMSTestCase):
+
+    def test_unchanged_course_is_not_modified(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[1]
+        self.client.force_authenticate(user=student)
+
+        response = self.client.get('/api/student/lms/my-course/')
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/student/lms/my-course/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        self.client.post(f'/api/student/lms/lessons/{lesson.id}/progress/', {'status': 'completed'}, format='json')
+        response = self.client.get('/api/student/lms/my-course/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        lesson.title = 'Renamed'
+        lesson.save()
+        response = self.client.get('/api/student/lms/my-course/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(f'/api/student/lms/lessons/{lesson.id}/')
+        response = self.client.get(f'/api/student/lms/lessons/{lesson.id}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_versions_are_shared_between_workers(self):
+        # A process-local cache would keep answering 304 in the other workers
+        self.assertNotIsInstance(caches['default'], LocMemCache)
+
+        student = self.create_student(modules=1, lessons_per_module=2)
+        self.client.force_authenticate(user=student)
+        etag = self.client.get('/api/student/lms/my-course/')['ETag']
+
+        # Another worker has its own cache connection and bumps the version there
+        other_worker = caches.create_connection('default')
+        with mock.patch('student_lms.etags.cache', other_worker):
+            bump_student_version(student.id)
+        response = self.client.get('/api/student/lms/my-course/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class SparseFieldsetTests(LMSTestCase):
+
+    def test_fields_narrow_lesson_and_module(self):
+        student = self.create_student(modules=1, lessons_per_module=2)
+        lesson = Lesson.objects.filter(module__course=student.course).order_by('order')[0]
+        self.client.force_authenticate(user=student)
+
+        full = self.client.get(f'/api/student/lms/lessons/{lesson.id}/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/student/lms/lessons/{lesson.id}/', {'fields': 'id,title,module_title'})
+        self.assertEqual(response.data['lesson'], {'id': lesson.id, 'title': lesson.title, 'module_title': 'Module 0'})
+        self.assertNotEqual(response['ETag'], full['ETag'])
+        # Neither the notes nor the progress of the lesson are read, nor its text content
+        self.assertFalse(any('student_lms_studentnote' in query['sql'] for query in queries))
+        self.assertFalse(any('text_content' in query['sql'] for query in queries))
+
+        response = self.client.get(f'/api/student/lms/modules/{lesson.module_id}/', {'exclude': 'lessons'})
+        self.assertNotIn('lessons', response.data['module'])
+        self.assertEqual(response.data['module']['total_lessons'], 2)
+
+
+class CompressionTests(LMSTestCase):
+
+    def test_course_tree_is_compressed_per_request(self):
+        student = self.create_student(modules=3, lessons_per_module=5)
+        self.client.force_authenticate(user=student)
+
+        plain = self.client.get('/api/student/lms/my-course/')
+        self.assertNotIn('Content-Encoding', plain)
+
+        response = self.client.get('/api/student/lms/my-course/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+
+        # The body is per student and version: compressed by the middleware, never cached
+        with mock.patch('staff_app.compression.cache') as compressed_cache:
+            self.client.get('/api/student/lms/my-course/', HTTP_ACCEPT_ENCODING='gzip')
+        compressed_cache.set.assert_not_called()
+
+        # Conditional requests still match the (weakened) ETag
+        response = self.client.get(
+            '/api/student/lms/my-course/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
@@ -11,13 +11,16 @@ urlpatterns = [
     
     # Course & Curriculum
     path('my-course/', views.my_course_detail, name='my-course'),
+    path('my-course/changes/', views.my_course_changes, name='my-course-changes'),
     path('modules/<int:module_id>/', views.module_detail, name='module-detail'),
     path('lessons/<int:lesson_id>/', views.lesson_detail, name='lesson-detail'),
     
     # Progress Tracking
     path('lessons/<int:lesson_id>/progress/', views.update_lesson_progress, name='update-progress'),
+    path('progress/batch/', views.update_progress_batch, name='update-progress-batch'),
     
     # Notes
     path('lessons/<int:lesson_id>/notes/', views.lesson_notes, name='lesson-notes'),
     path('notes/<int:note_id>/', views.note_detail, name='note-detail'),
+    path('notes/sync/', views.notes_sync, name='notes-sync'),
 ]
\ No newline at end of file
@@ -3,10 +3,15 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken
 from .serializers import StudentLoginSerializer, StudentDashboardSerializer
 from .authentication import StudentJWTAuthentication
 from .permissions import IsStudentAuthenticated
+from .course_cache import get_course_lesson_total
+from .student_summary import get_student_summary
+from .etags import student_etag
+from staff_app.conditional import etag_matches, not_modified, with_etag
 from staff_app.models import StudentRegistration
 
 @api_view(['POST'])
@@ -63,21 +68,35 @@ def student_dashboard(request):
                 }
             }, status=status.HTTP_401_UNAUTHORIZED)
         
+        # days_remaining_to_complete changes daily, so the date is part of the ETag
+        etag = student_etag(student, 'dashboard', timezone.localdate())
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
         serializer = StudentDashboardSerializer(student)
         
         # Add some quick stats
         dashboard_data = serializer.data
+        summary = get_student_summary(student)
+        total_lessons = get_course_lesson_total(student.course_id) if student.course_id else 0
+        if total_lessons:
+            progress_percentage = round((summary['completed_lessons'] / total_lessons) * 100, 2)
+        else:
+            progress_percentage = 0.0
+        dashboard_data['course_progress'] = {
+            'total_lessons': total_lessons,
+            'completed_lessons': summary['completed_lessons'],
+            'progress_percentage': progress_percentage,
+        }
         dashboard_data['quick_stats'] = {
-            'total_courses': 1,
-            'completed_lessons': 0,
-            'upcoming_classes': 0,
-            'pending_assignments': 0,
+            'total_courses': 1 if student.course_id else 0,
+            **summary,
         }
         
-        return Response({
+        return with_etag(Response({
             'message': 'Dashboard data retrieved successfully',
             'dashboard': dashboard_data
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_200_OK), etag)
         
     except Exception as e:
         import traceback
@@ -92,6 +111,7 @@ def student_dashboard(request):
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
@@ -99,12 +119,22 @@ from .authentication import StudentJWTAuthentication
 from .permissions import IsStudentAuthenticated
 from .models import CourseModule, Lesson, StudentProgress, StudentNote
 from .serializers import (
-    CourseDetailSerializer,
     CourseModuleSerializer,
     LessonDetailSerializer,
     StudentProgressSerializer,
-    StudentNoteSerializer
+    StudentNoteSerializer,
+    ProgressBatchSerializer,
+    ProgressUpdateSerializer,
+    NoteSyncSerializer,
+    get_progress_map
 )
+from .progress import merge_student_events, record_progress_update
+from .progress_buffer import buffer_progress
+from .course_cache import apply_progress_overlay, get_course_lesson_total, get_course_tree
+from .content_sync import decode_sync_cursor, get_course_changes, next_sync_cursor
+from .note_sync import sync_notes
+from staff_app.pagination import InvalidCursor
+from staff_app.fieldsets import fieldset_key, get_fieldset, narrow_queryset
 
 
 @api_view(['GET'])
@@ -116,20 +146,72 @@ def my_course_detail(request):
     """
     try:
         student = request.user
-        print('=====',student)
-        if not student.course:
+        if not student.course_id:
             return Response({
                 'error': 'You are not enrolled in any course'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        serializer = CourseDetailSerializer(
-            student.course,
-            context={'request': request}
-        )
+        etag = student_etag(student, 'course')
+        if etag_matches(request, etag):
+            return not_modified(etag)
         
-        return Response({
+        # Shared curriculum tree from cache, student's progress overlaid per request
+        course_tree = get_course_tree(student.course_id)
+        progress_map = get_progress_map({'request': request})
+        
+        return with_etag(Response({
             'message': 'Course details retrieved successfully',
-            'course': serializer.data
+            'course': apply_progress_overlay(course_tree, progress_map)
+        }, status=status.HTTP_200_OK), etag)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@authentication_classes([StudentJWTAuthentication])
+@permission_classes([IsStudentAuthenticated])
+def my_course_changes(request):
+    """
+    Modules and lessons of the student's course changed since a sync cursor
+    Query params: ?since=<next_cursor from the previous sync>
+    Without ?since= (or with a cursor of another course) the whole course is
+    returned with "reset": true and the client replaces its copy.
+    """
+    try:
+        student = request.user
+        if not student.course_id:
+            return Response({
+                'error': 'You are not enrolled in any course'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        since = None
+        token = request.GET.get('since')
+        if token:
+            try:
+                since, cursor_course_id = decode_sync_cursor(token)
+            except InvalidCursor:
+                return Response({
+                    'error': 'Invalid since cursor'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if cursor_course_id != student.course_id:
+                since = None
+        
+        # Taken before reading, so nothing written meanwhile is skipped next time
+        next_cursor = next_sync_cursor(student.course_id)
+        changes = get_course_changes(student.course_id, since, {'request': request})
+        
+        return Response({
+            'message': 'Course changes retrieved successfully',
+            'course': {
+                'id': student.course_id,
+                'name': student.course.name,
+            },
+            'reset': since is None,
+            'next_cursor': next_cursor,
+            **changes
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -147,23 +229,33 @@ def module_detail(request, module_id):
     """
     try:
         student = request.user
-        module = get_object_or_404(CourseModule, id=module_id, is_active=True)
+        # ?fields= / ?exclude= pick the keys sent and the columns read
+        fieldset = get_fieldset(request)
+        module = get_object_or_404(
+            narrow_queryset(CourseModule.objects.all(), CourseModuleSerializer, fieldset, extra=('course',)),
+            id=module_id,
+            is_active=True
+        )
         
         # Check if module belongs to student's course
-        if student.course != module.course:
+        if student.course_id != module.course_id:
             return Response({
                 'error': 'You do not have access to this module'
             }, status=status.HTTP_403_FORBIDDEN)
         
+        etag = student_etag(student, 'module', module.id, fieldset_key(fieldset))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
         serializer = CourseModuleSerializer(
             module,
-            context={'request': request}
+            context={'request': request, 'fieldset': fieldset}
         )
         
-        return Response({
+        return with_etag(Response({
             'message': 'Module details retrieved successfully',
             'module': serializer.data
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_200_OK), etag)
         
     except Exception as e:
         return Response({
@@ -180,19 +272,18 @@ def lesson_detail(request, lesson_id):
     """
     try:
         student = request.user
-        lesson = get_object_or_404(Lesson, id=lesson_id, is_active=True)
+        fieldset = get_fieldset(request)
+        lessons = narrow_queryset(
+            Lesson.objects.select_related('module'), LessonDetailSerializer, fieldset, extra=('module__course',)
+        )
+        lesson = get_object_or_404(lessons, id=lesson_id, is_active=True)
         
         # Check if lesson belongs to student's course
-        if student.course != lesson.module.course:
+        if student.course_id != lesson.module.course_id:
             return Response({
                 'error': 'You do not have access to this lesson'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        serializer = LessonDetailSerializer(
-            lesson,
-            context={'request': request}
-        )
-        
         # Create or update progress entry (mark as accessed)
         progress, created = StudentProgress.objects.get_or_create(
             student=student,
@@ -204,10 +295,20 @@ def lesson_detail(request, lesson_id):
             progress.status = 'in_progress'
             progress.save()
         
-        return Response({
+        # After the progress write, so its version bump is already included
+        etag = student_etag(student, 'lesson', lesson.id, fieldset_key(fieldset))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        serializer = LessonDetailSerializer(
+            lesson,
+            context={'request': request, 'fieldset': fieldset}
+        )
+        
+        return with_etag(Response({
             'message': 'Lesson details retrieved successfully',
             'lesson': serializer.data
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_200_OK), etag)
         
     except Exception as e:
         return Response({
@@ -224,47 +325,36 @@ def update_lesson_progress(request, lesson_id):
     Expected data:
     {
         "completion_percentage": 75.5,
-        "time_spent_minutes": 15,
-        "status": "in_progress" or "completed"
+        "time_spent_delta_seconds": 30,
+        "status": "in_progress" or "completed",
+        "device_id": "android-3f2a",
+        "seq": 118
     }
+    time_spent_delta_seconds is added to the stored time. Heartbeats whose seq
+    is not newer than the last one applied for the device are ignored.
+    Older clients may still send an absolute "time_spent_minutes".
     """
     try:
         student = request.user
-        lesson = get_object_or_404(Lesson, id=lesson_id, is_active=True)
+        lesson = get_object_or_404(Lesson.objects.select_related('module'), id=lesson_id, is_active=True)
         
         # Check access
-        if student.course != lesson.module.course:
+        if student.course_id != lesson.module.course_id:
             return Response({
                 'error': 'You do not have access to this lesson'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        # Get or create progress
-        progress, created = StudentProgress.objects.get_or_create(
-            student=student,
-            lesson=lesson,
-            defaults={'status': 'in_progress'}
-        )
-        
-        # Update progress
-        completion_percentage = request.data.get('completion_percentage', progress.completion_percentage)
-        time_spent = request.data.get('time_spent_minutes', progress.time_spent_minutes)
-        new_status = request.data.get('status', progress.status)
-        
-        progress.completion_percentage = completion_percentage
-        progress.time_spent_minutes = time_spent
-        progress.status = new_status
-        
-        # Mark completed time if status is completed
-        if new_status == 'completed' and not progress.completed_at:
-            progress.completed_at = timezone.now()
-            progress.completion_percentage = 100.00
+        update_serializer = ProgressUpdateSerializer(data=request.data)
+        if not update_serializer.is_valid():
+            return Response(update_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        progress.save()
+        progress, applied = record_progress_update(student.id, lesson.id, update_serializer.validated_data)
         
         serializer = StudentProgressSerializer(progress)
         
         return Response({
-            'message': 'Progress updated successfully',
+            'message': 'Progress updated successfully' if applied else 'Duplicate or out-of-order update ignored',
+            'applied': applied,
             'progress': serializer.data
         }, status=status.HTTP_200_OK)
         
@@ -274,6 +364,54 @@ def update_lesson_progress(request, lesson_id):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@authentication_classes([StudentJWTAuthentication])
+@permission_classes([IsStudentAuthenticated])
+def update_progress_batch(request):
+    """
+    Record a batch of player heartbeats.
+    Updates are coalesced in the progress buffer and written in the background
+    (202), or written at once (200) when buffering is off or a lesson completes.
+    Expected data:
+    {
+        "events": [
+            {
+                "lesson_id": 12,
+                "time_spent_delta_seconds": 5,
+                "completion_percentage": 42.5,
+                "status": "in_progress",
+                "device_id": "a1b2",
+                "seq": 118
+            }
+        ]
+    }
+    """
+    try:
+        student = request.user
+        serializer = ProgressBatchSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        events = serializer.validated_data['events']
+        # Seqs are claimed in the same transaction as a write-through
+        with transaction.atomic():
+            merged, rejected_lesson_ids = merge_student_events(student, events)
+            buffered = buffer_progress(student.id, merged)
+        
+        return Response({
+            'message': 'Progress queued' if buffered else 'Progress updated successfully',
+            'events_received': len(events),
+            'buffered': buffered,
+            'rejected_lesson_ids': rejected_lesson_ids
+        }, status=status.HTTP_202_ACCEPTED if buffered else status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
 @api_view(['GET', 'POST'])
 @authentication_classes([StudentJWTAuthentication])
 @permission_classes([IsStudentAuthenticated])
@@ -289,10 +427,10 @@ def lesson_notes(request, lesson_id):
     """
     try:
         student = request.user
-        lesson = get_object_or_404(Lesson, id=lesson_id, is_active=True)
+        lesson = get_object_or_404(Lesson.objects.select_related('module'), id=lesson_id, is_active=True)
         
         # Check access
-        if student.course != lesson.module.course:
+        if student.course_id != lesson.module.course_id:
             return Response({
                 'error': 'You do not have access to this lesson'
             }, status=status.HTTP_403_FORBIDDEN)
@@ -301,10 +439,13 @@ def lesson_notes(request, lesson_id):
             # Get all notes for this lesson
             notes = StudentNote.objects.filter(
                 student=student,
-                lesson=lesson
+                lesson=lesson,
+                deleted_at__isnull=True
             ).order_by('timestamp_seconds')
+            fieldset = get_fieldset(request)
+            notes = narrow_queryset(notes, StudentNoteSerializer, fieldset)
             
-            serializer = StudentNoteSerializer(notes, many=True)
+            serializer = StudentNoteSerializer(notes, many=True, context={'fieldset': fieldset})
             
             return Response({
                 'message': 'Notes retrieved successfully',
@@ -320,7 +461,7 @@ def lesson_notes(request, lesson_id):
             serializer = StudentNoteSerializer(data=data)
             
             if serializer.is_valid():
-                serializer.save(student=student, lesson=lesson)
+                serializer.save(student=student, lesson=lesson, client_updated_at=timezone.now())
                 return Response({
                     'message': 'Note created successfully',
                     'note': serializer.data
@@ -344,13 +485,14 @@ def note_detail(request, note_id):
     """
     try:
         student = request.user
-        note = get_object_or_404(StudentNote, id=note_id, student=student)
+        note = get_object_or_404(StudentNote, id=note_id, student=student, deleted_at__isnull=True)
         
         if request.method == 'PUT':
             serializer = StudentNoteSerializer(note, data=request.data, partial=True)
             
             if serializer.is_valid():
-                serializer.save()
+                # Stamped as an edit "now", so older offline edits do not win over it
+                serializer.save(client_updated_at=timezone.now())
                 return Response({
                     'message': 'Note updated successfully',
                     'note': serializer.data
@@ -359,7 +501,10 @@ def note_detail(request, note_id):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         elif request.method == 'DELETE':
-            note.delete()
+            # Soft delete: note sync hands the tombstone to the student's other devices
+            note.deleted_at = timezone.now()
+            note.client_updated_at = note.deleted_at
+            note.save(update_fields=['deleted_at', 'client_updated_at', 'updated_at'])
             return Response({
                 'message': 'Note deleted successfully'
             }, status=status.HTTP_200_OK)
@@ -370,6 +515,59 @@ def note_detail(request, note_id):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@authentication_classes([StudentJWTAuthentication])
+@permission_classes([IsStudentAuthenticated])
+def notes_sync(request):
+    """
+    Sync notes taken offline (see note_sync.py)
+    Expected data:
+    {
+        "since": "<next_cursor from the previous sync, or null>",
+        "changes": [
+            {"client_id": "8c1e…", "lesson": 12, "note_text": "…",
+             "timestamp_seconds": 95, "updated_at": "2026-10-18T09:15:00Z", "deleted": false}
+        ]
+    }
+    Returns the notes changed on the server since the cursor (including the
+    ones just applied), tombstones of deleted notes and a new cursor.
+    """
+    try:
+        student = request.user
+        sync_serializer = NoteSyncSerializer(data=request.data)
+        if not sync_serializer.is_valid():
+            return Response(sync_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        since = None
+        token = sync_serializer.validated_data.get('since')
+        if token:
+            try:
+                since, cursor_student_id = decode_sync_cursor(token)
+            except InvalidCursor:
+                return Response({
+                    'error': 'Invalid since cursor'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if cursor_student_id != student.id:
+                since = None
+        
+        result = sync_notes(student, sync_serializer.validated_data['changes'], since)
+        
+        return Response({
+            'message': 'Notes synced successfully',
+            'reset': since is None,
+            'next_cursor': result['next_cursor'],
+            'applied_client_ids': result['applied_client_ids'],
+            'rejected_client_ids': result['rejected_client_ids'],
+            'notes': StudentNoteSerializer(result['notes'], many=True).data,
+            'deleted': result['deleted'],
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
 
 # 
 # Add this temporary debug view to course_views.py
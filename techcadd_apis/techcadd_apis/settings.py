@@ -4,6 +4,8 @@ Django settings for techcadd_apis project.
 Generated by 'django-admin startproject' using Django 5.1.1.
 """
 
+import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
@@ -39,6 +41,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # ✅ ADD THIS AT THE TOP
     'django.middleware.security.SecurityMiddleware',
+    # br/gzip for text responses; runs last on the way out (see staff_app/compression.py)
+    'staff_app.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,6 +80,50 @@ DATABASES = {
     }
 }
 
+# Caches
+# Version stamps (course trees, LMS ETags, form options, student principals)
+# live in the default cache, so it must be shared by every gunicorn worker:
+# a bump made in one worker has to reach the others. The file backend is
+# shared by all workers on the host; use Redis or Memcached when running on
+# several hosts. MAX_ENTRIES leaves room for a few keys per student.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'techcadd_apis_cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    }
+}
+
+# Seconds a serialized course tree version stays in the shared cache
+COURSE_TREE_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Seconds a worker keeps a course tree in its own memory
+COURSE_TREE_LOCAL_TIMEOUT = 60
+
+# Seconds a worker keeps the form dropdown payloads in its own memory
+FORM_OPTIONS_LOCAL_TIMEOUT = 60
+
+# Seconds an authenticated student (per token) is served without a DB lookup
+STUDENT_PRINCIPAL_CACHE_TIMEOUT = 60
+
+# Seconds a student's dashboard summary (quick_stats) may be served from cache
+STUDENT_SUMMARY_CACHE_TIMEOUT = 60 * 5
+
+# Responses smaller than this (bytes) are sent uncompressed
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+
+# Seconds a rendered, compressed course tree / option list stays cached per ETag
+COMPRESSED_RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# Progress heartbeats are coalesced in memory and written every N seconds
+# (0 writes every batch straight away). See student_lms/progress_buffer.py
+PROGRESS_BUFFER_FLUSH_INTERVAL = 5
+PROGRESS_BUFFER_BACKEND = 'student_lms.progress_buffer.LocalProgressBuffer'
+# Failed flushes of a lesson before its buffered progress is dropped
+PROGRESS_BUFFER_MAX_ATTEMPTS = 5
+
 # ✅ ADD CORS SETTINGS
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 CORS_ALLOW_CREDENTIALS = True
@@ -92,12 +140,22 @@ CORS_ALLOWED_ORIGINS = [
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'staff_app.authentication.StaffJWTAuthentication',
         'student_lms.authentication.StudentJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed JSON when installed, same output as DRF's JSONRenderer
+    'DEFAULT_RENDERER_CLASSES': (
+        'staff_app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'staff_app.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 SIMPLE_JWT = {